@@ -0,0 +1,152 @@
+"""
+GET condicional (ETag) para los viewsets de la API.
+
+Cada tabla que expone la API tiene una versión en la caché compartida (Redis)
+bajo ``CLAVE_VERSION``, que se incrementa al confirmarse cualquier
+``save()``/``delete()`` de sus filas (ver ``api/signals.py``). Las operaciones
+masivas que no disparan señales (``QuerySet.update``, ``bulk_create``) deben
+llamar a ``incrementar_version``.
+
+``RespuestaCondicionalMixin`` calcula el ETag de ``list`` y ``retrieve`` con
+las versiones de las tablas de las que depende la respuesta y la URL completa
+(filtros, página, cursor...). Si el cliente ya tiene esa versión se responde
+``304 Not Modified`` sin consultar la base de datos ni serializar nada. No se
+envía ``Last-Modified``: con resolución de segundos, dos cambios en el mismo
+segundo darían un 304 incorrecto con ``If-Modified-Since``.
+"""
+
+import hashlib
+import json
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from dashboard.models import (
+    Equipo,
+    Fase,
+    Miembro,
+    Proyecto,
+    Recurso,
+    Recursohumano,
+    Recursomaterial,
+    Requerimiento,
+    Tarea,
+    TareaComun,
+    Tarearecurso,
+    TipoTarea,
+    Tiporecurso,
+    Usuario,
+)
+
+logger = logging.getLogger(__name__)
+
+CLAVE_VERSION = "api:version:{}"
+
+# Tablas cuyos cambios invalidan las respuestas de la API
+MODELOS_VERSIONADOS = (
+    Equipo,
+    Fase,
+    Miembro,
+    Proyecto,
+    Recurso,
+    Recursohumano,
+    Recursomaterial,
+    Requerimiento,
+    Tarea,
+    TareaComun,
+    Tarearecurso,
+    TipoTarea,
+    Tiporecurso,
+    Usuario,
+)
+
+
+def incrementar_version(modelo):
+    """Marca la tabla de ``modelo`` como modificada al confirmarse la transacción"""
+    tabla = modelo._meta.db_table
+
+    def _incrementar():
+        try:
+            try:
+                cache.incr(CLAVE_VERSION.format(tabla))
+            except ValueError:
+                # La clave no existe todavía (o la caché se vació): se parte de
+                # un valor que no puede repetir una versión anterior
+                cache.set(CLAVE_VERSION.format(tabla), time.time_ns(), timeout=None)
+        except Exception:
+            logger.exception(f"Error al actualizar la versión de la tabla {tabla}")
+
+    transaction.on_commit(_incrementar)
+
+
+def versiones(modelos):
+    """
+    Versiones de las tablas de ``modelos``, o ``None`` si la caché no está
+    disponible.
+    """
+    claves = [CLAVE_VERSION.format(modelo._meta.db_table) for modelo in modelos]
+    try:
+        valores = cache.get_many(claves)
+        # Tablas sin versión todavía (primer uso o caché vaciada): se parte de
+        # un valor que no puede repetir una versión anterior, lo que solo puede
+        # dar respuestas de más, nunca un 304 incorrecto
+        inicial = time.time_ns()
+        for clave in claves:
+            if clave not in valores:
+                cache.add(clave, inicial, timeout=None)
+                valores[clave] = cache.get(clave, inicial)
+    except Exception:
+        logger.exception("Error al leer las versiones de la API")
+        return None
+
+    return [valores[clave] for clave in claves]
+
+
+class RespuestaCondicionalMixin:
+    """
+    ETag en ``list`` y ``retrieve``.
+
+    ``modelos_version`` son los modelos cuyos datos aparecen en la respuesta
+    (incluidos los relacionados que muestran los serializers); por defecto,
+    solo el del queryset.
+    """
+
+    modelos_version = None
+
+    def _etag(self, request):
+        modelos = self.modelos_version or (self.queryset.model,)
+        lista_versiones = versiones(modelos)
+        if lista_versiones is None:
+            return None
+
+        clave = json.dumps(
+            [
+                request.get_full_path(),
+                request.accepted_media_type,
+                request.user.pk,
+                lista_versiones,
+            ]
+        )
+        return quote_etag(hashlib.sha256(clave.encode()).hexdigest()[:32])
+
+    def _respuesta_condicional(self, request, metodo, *args, **kwargs):
+        etag = self._etag(request)
+        if etag is None:
+            return metodo(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = metodo(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_condicional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_condicional(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,135 @@
+"""
+Altas en bloque para la API.
+
+Un cliente que crea el plan de un proyecto con miles de tareas no debería
+hacer una petición (y una actividad de auditoría) por tarea. Los endpoints
+``bulk`` reciben una lista y la validan en una sola pasada:
+
+- ``RelacionPrecargadaField`` resuelve las claves foráneas contra objetos que
+  ``PrecargaListSerializer`` lee con una consulta por relación para toda la
+  lista, en lugar de una consulta por elemento y relación.
+- ``PrecargaListSerializer.create`` inserta con ``bulk_create`` (auditado si
+  el modelo lo permite) en una sola transacción e incrementa la versión de la
+  tabla para el GET condicional.
+
+Si algún elemento no es válido no se inserta ninguno y la respuesta indica
+los errores de cada elemento por su posición en la lista.
+"""
+
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from .condicional import incrementar_version
+
+# Máximo de elementos por petición
+TAMANO_MAXIMO = 5000
+# Filas por INSERT en bulk_create
+TAMANO_LOTE = 500
+
+CONTEXTO_PRECARGA = "precarga_lote"
+
+
+def _pk_entera(valor):
+    if isinstance(valor, bool):
+        raise TypeError
+    return int(valor)
+
+
+class RelacionPrecargadaField(serializers.PrimaryKeyRelatedField):
+    """
+    ``PrimaryKeyRelatedField`` que busca la pk entre los objetos precargados
+    por ``PrecargaListSerializer``; fuera de una lista se comporta como el
+    campo de DRF.
+    """
+
+    def to_internal_value(self, data):
+        precargados = self.context.get(CONTEXTO_PRECARGA, {}).get(self.field_name)
+        if precargados is None:
+            return super().to_internal_value(data)
+
+        try:
+            pk = _pk_entera(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in precargados:
+            self.fail("does_not_exist", pk_value=data)
+        return precargados[pk]
+
+
+class PrecargaListSerializer(serializers.ListSerializer):
+    """
+    Lista que precarga las relaciones de sus elementos y los crea con
+    ``bulk_create`` en una transacción.
+    """
+
+    def _precargar(self, data):
+        precarga = {}
+        for nombre, campo in self.child.fields.items():
+            if not isinstance(campo, RelacionPrecargadaField) or campo.read_only:
+                continue
+            pks = set()
+            for elemento in data:
+                try:
+                    pks.add(_pk_entera(elemento[nombre]))
+                except (KeyError, TypeError, ValueError):
+                    # El campo informará del error al validar el elemento
+                    pass
+            precarga[nombre] = campo.get_queryset().in_bulk(pks) if pks else {}
+        return precarga
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and all(isinstance(e, dict) for e in data):
+            self.context[CONTEXTO_PRECARGA] = self._precargar(data)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.context.pop(CONTEXTO_PRECARGA, None)
+
+    def create(self, validated_data):
+        modelo = self.child.Meta.model
+        objetos = [modelo(**datos) for datos in validated_data]
+        manager = modelo.objects
+        request = self.context.get("request")
+
+        with transaction.atomic():
+            if hasattr(manager, "audited_bulk_create"):
+                creados = manager.audited_bulk_create(
+                    objetos,
+                    user=request.user if request else None,
+                    batch_size=TAMANO_LOTE,
+                )
+            else:
+                creados = manager.bulk_create(objetos, batch_size=TAMANO_LOTE)
+            incrementar_version(modelo)
+        return creados
+
+
+def validar_lista(datos):
+    """``Response`` 400 si ``datos`` no es una lista de tamaño admitido"""
+    if not isinstance(datos, list) or not datos:
+        return Response(
+            {"error": "Se requiere una lista de elementos no vacía"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(datos) > TAMANO_MAXIMO:
+        return Response(
+            {"error": f"Se admiten como máximo {TAMANO_MAXIMO} elementos"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def respuesta_errores(errores):
+    """Respuesta 400 con los errores de cada elemento por su posición"""
+    return Response(
+        {
+            "creados": 0,
+            "errores": [
+                {"indice": indice, "errores": error}
+                for indice, error in enumerate(errores)
+                if error
+            ],
+        },
+        status=status.HTTP_400_BAD_REQUEST,
+    )
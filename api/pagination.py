@@ -1,18 +1,182 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from auditoria.paginacion import KeysetPaginator, estimar_total
+
+# Valores de ?count=
+TOTAL_EXACTO = "true"
+TOTAL_ESTIMADO = "estimado"
+SIN_TOTAL = "false"
+
+
+def _modo_total(request, por_defecto):
+    modo = request.query_params.get("count", por_defecto).lower()
+    return modo if modo in (TOTAL_EXACTO, TOTAL_ESTIMADO, SIN_TOTAL) else por_defecto
+
+
+def _total(queryset, modo):
+    if modo == TOTAL_EXACTO:
+        return queryset.count()
+    if modo == TOTAL_ESTIMADO:
+        return estimar_total(queryset)
+    return None
+
+
+class CursorPagination(BasePagination):
+    """
+    Paginación por cursor (keyset): cada página se pide a partir de la clave
+    de la última fila de la anterior, sin ``OFFSET``, así que recorrer todo el
+    conjunto de datos cuesta lo mismo en la primera página que en la última.
+
+    La clave es ``campos_cursor`` de la vista (por defecto la pk), en orden
+    descendente; ``?ordering=`` no se aplica en este modo. El total no se
+    calcula salvo que se pida con ``?count=true`` o ``?count=estimado``.
+    """
+
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_actual = self.get_page_size(request)
+        paginator = KeysetPaginator(
+            queryset,
+            self.page_size_actual,
+            campos=getattr(view, "campos_cursor", ("pk",)),
+        )
+        self.total = _total(paginator.queryset, _modo_total(request, SIN_TOTAL))
+        self.page = paginator.get_page(
+            request.query_params.get(self.cursor_query_param)
+        )
+        return list(self.page)
+
+    def _enlace(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.total,
+                "page_size": self.page_size_actual,
+                "next": self._enlace(self.page.next_cursor),
+                "previous": self._enlace(self.page.previous_cursor),
+                "next_cursor": self.page.next_cursor,
+                "previous_cursor": self.page.previous_cursor,
+                "has_next": self.page.has_next(),
+                "has_previous": self.page.has_previous(),
+                "results": data,
+            }
+        )
 
 
 class CustomPagination(PageNumberPagination):
     """
     Custom pagination class that provides additional metadata in pagination response
     including total number of items and current page.
+
+    Opciones por petición:
+
+    - ``?count=false`` no calcula el total (``COUNT(*)``): ``count`` y
+      ``total_pages`` son ``null`` y ``has_next`` se obtiene pidiendo una fila
+      de más. ``?count=estimado`` da un total aproximado (ver
+      ``auditoria.paginacion.estimar_total``).
+    - ``?paginacion=cursor`` (o un ``?cursor=``) usa ``CursorPagination``.
     """
 
     page_size = 50
     page_size_query_param = "page_size"
     max_page_size = 1000
 
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = None
+        if (
+            request.query_params.get("paginacion") == "cursor"
+            or CursorPagination.cursor_query_param in request.query_params
+        ):
+            self.cursor = CursorPagination()
+            return self.cursor.paginate_queryset(queryset, request, view)
+
+        self.modo_total = _modo_total(request, TOTAL_EXACTO)
+        if self.modo_total == TOTAL_EXACTO:
+            return super().paginate_queryset(queryset, request, view)
+        return self._paginar_sin_total(queryset, request)
+
+    def _paginar_sin_total(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        numero = request.query_params.get(self.page_query_param, 1)
+        try:
+            numero = int(numero)
+            if numero < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(page_number=numero))
+
+        inicio = (numero - 1) * page_size
+        filas = list(queryset[inicio : inicio + page_size + 1])
+        if not filas and numero > 1:
+            raise NotFound(self.invalid_page_message.format(page_number=numero))
+
+        self.page = None
+        self.numero = numero
+        self.hay_siguiente = len(filas) > page_size
+        self.total = _total(queryset, self.modo_total)
+        return filas[:page_size]
+
+    def _enlace_pagina(self, numero):
+        url = self.request.build_absolute_uri()
+        if numero == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, numero)
+
+    def _respuesta_sin_total(self, data):
+        has_next = self.hay_siguiente
+        has_previous = self.numero > 1
+        next_page = self.numero + 1 if has_next else None
+        previous_page = self.numero - 1 if has_previous else None
+        page_size = self.get_page_size(self.request)
+        total_pages = None
+        if self.total is not None:
+            total_pages = max(-(-self.total // page_size), self.numero)
+
+        return Response(
+            {
+                "count": self.total,
+                "total_pages": total_pages,
+                "current_page": self.numero,
+                "page_size": page_size,
+                "next": self._enlace_pagina(next_page) if has_next else None,
+                "previous": (
+                    self._enlace_pagina(previous_page) if has_previous else None
+                ),
+                "has_next": has_next,
+                "has_previous": has_previous,
+                "next_page": next_page,
+                "previous_page": previous_page,
+                "results": data,
+            }
+        )
+
     def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        if self.page is None:
+            return self._respuesta_sin_total(data)
+
         # Get the total number of pages for the query
         count = self.page.paginator.count
         num_pages = self.page.paginator.num_pages
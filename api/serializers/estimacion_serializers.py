@@ -9,6 +9,67 @@ from dashboard.models import (
 )
 
 
+def datos_tareas(tareas):
+    """
+    Datos para la estimación de cada tarea de ``tareas`` (queryset), con dos
+    consultas en total: ``{idtarea: datos}`` en el orden del queryset.
+
+    Se usa tanto para una tarea (``get_task_data``) como para las
+    estimaciones en bloque, de modo que ambas parten de los mismos datos.
+    """
+    filas = list(
+        tareas.values(
+            "idtarea",
+            "dificultad",
+            "claridad_requisitos",
+            "tamaño_estimado",
+            "tipo_tarea__nombre",
+            "fase__nombre",
+        )
+    )
+
+    # Recursos por tarea: el primero (menor id) es R1
+    recursos = {}
+    for asignacion in (
+        Tarearecurso.objects.filter(idtarea__in=[fila["idtarea"] for fila in filas])
+        .order_by("idtarearecurso")
+        .values("idtarea_id", "experiencia", "idrecurso__carga_trabajo")
+    ):
+        recursos.setdefault(asignacion["idtarea_id"], []).append(asignacion)
+
+    datos = {}
+    for fila in filas:
+        asignaciones = recursos.get(fila["idtarea"], [])
+        carga_trabajo_r1 = 0
+        experiencia_r1 = 0
+        if asignaciones:
+            primer_recurso = asignaciones[0]
+            carga_trabajo_r1 = 0.5  # Valor por defecto
+            if primer_recurso["idrecurso__carga_trabajo"]:
+                carga_trabajo_r1 = (
+                    primer_recurso["idrecurso__carga_trabajo"] / 3.0
+                )  # Normalizamos a 0-1
+            experiencia_r1 = primer_recurso["experiencia"] or 3
+
+        # Construir diccionario con datos de la tarea - usar formato PascalCase para nombres de claves
+        datos[fila["idtarea"]] = {
+            "Complejidad": fila["dificultad"] or 3,
+            "Tipo_Tarea": fila["tipo_tarea__nombre"] or "Backend",
+            "Fase_Tarea": fila["fase__nombre"] or "Construcción/Desarrollo",
+            "Cantidad_Recursos": len(asignaciones) or 1,
+            "Carga_Trabajo_R1": float(carga_trabajo_r1),
+            "Experiencia_R1": int(experiencia_r1),
+            "Carga_Trabajo_R2": 0.0,
+            "Experiencia_R2": 0,
+            "Carga_Trabajo_R3": 0.0,
+            "Experiencia_R3": 0,
+            "Experiencia_Equipo": 3,  # Valor por defecto
+            "Claridad_Requisitos": float(fila["claridad_requisitos"] or 0.7),
+            "Tamaño_Tarea": int(fila["tamaño_estimado"] or 5),
+        }
+    return datos
+
+
 class EstimacionTareaInputSerializer(serializers.Serializer):
     """Serializer para recibir los datos de entrada para estimación de tareas"""
 
@@ -50,55 +111,12 @@ class EstimacionTareaInputSerializer(serializers.Serializer):
         """Extrae datos completos de la tarea para la estimación"""
         if "idtarea" in validated_data and validated_data["idtarea"]:
             # Extraer información de la tarea existente
-            try:
-                tarea = Tarea.objects.get(idtarea=validated_data["idtarea"])
-
-                # Obtener recursos de la tarea
-                recursos = Tarearecurso.objects.filter(idtarea=tarea)
-                cantidad_recursos = recursos.count()
-
-                # Obtener valores de recursos
-                carga_trabajo_r1 = 0
-                experiencia_r1 = 0
-                if recursos.exists():
-                    # Tomamos el primer recurso como R1
-                    primer_recurso = recursos.first()
-                    carga_trabajo_r1 = 0.5  # Valor por defecto
-                    if (
-                        hasattr(primer_recurso.idrecurso, "carga_trabajo")
-                        and primer_recurso.idrecurso.carga_trabajo
-                    ):
-                        carga_trabajo_r1 = (
-                            primer_recurso.idrecurso.carga_trabajo / 3.0
-                        )  # Normalizamos a 0-1
-                    experiencia_r1 = primer_recurso.experiencia or 3
-
-                # Construir diccionario con datos de la tarea - usar formato PascalCase para nombres de claves
-                return {
-                    "Complejidad": tarea.dificultad or 3,
-                    "Tipo_Tarea": (
-                        tarea.tipo_tarea.nombre if tarea.tipo_tarea else "Backend"
-                    ),
-                    "Fase_Tarea": (
-                        tarea.fase.nombre if tarea.fase else "Construcción/Desarrollo"
-                    ),
-                    "Cantidad_Recursos": cantidad_recursos or 1,
-                    "Carga_Trabajo_R1": float(
-                        carga_trabajo_r1
-                    ),  # Convertir explícitamente a float
-                    "Experiencia_R1": int(
-                        experiencia_r1
-                    ),  # Convertir explícitamente a int
-                    "Carga_Trabajo_R2": 0.0,
-                    "Experiencia_R2": 0,
-                    "Carga_Trabajo_R3": 0.0,
-                    "Experiencia_R3": 0,
-                    "Experiencia_Equipo": 3,  # Valor por defecto
-                    "Claridad_Requisitos": float(tarea.claridad_requisitos or 0.7),
-                    "Tamaño_Tarea": int(tarea.tamaño_estimado or 5),
-                }
-            except Tarea.DoesNotExist:
+            datos = datos_tareas(
+                Tarea.objects.filter(idtarea=validated_data["idtarea"])
+            )
+            if not datos:
                 raise serializers.ValidationError("La tarea especificada no existe")
+            return datos[validated_data["idtarea"]]
         else:
             # Usar los datos proporcionados directamente - en formato PascalCase
             return {
@@ -1,14 +1,53 @@
+from django.db.models import F
 from rest_framework import serializers
-from dashboard.models import Tarea, TipoTarea, Fase, Requerimiento, Proyecto
+from dashboard.models import (
+    Fase,
+    Recurso,
+    Requerimiento,
+    Tarea,
+    Tarearecurso,
+    TipoTarea,
+)
+from api.lotes import PrecargaListSerializer, RelacionPrecargadaField
+
+# Relaciones que usa TareaSerializer (para select_related)
+RELACIONES_TAREA = ("tipo_tarea", "fase", "idrequerimiento__idproyecto")
+
+
+def anotar_relaciones(queryset):
+    """
+    Añade al queryset los nombres relacionados que muestra TareaListSerializer,
+    en la misma consulta (``F()`` sobre los JOIN) en lugar de una por tarea.
+    """
+    return queryset.annotate(
+        tipo_tarea_nombre=F("tipo_tarea__nombre"),
+        fase_nombre=F("fase__nombre"),
+        proyecto_nombre=F("idrequerimiento__idproyecto__nombreproyecto"),
+    )
 
 
 class TareaSerializer(serializers.ModelSerializer):
-    """Serializer completo para operaciones CRUD de tareas"""
-
-    tipo_tarea_nombre = serializers.SerializerMethodField()
-    fase_nombre = serializers.SerializerMethodField()
-    requerimiento_descripcion = serializers.SerializerMethodField()
-    proyecto_nombre = serializers.SerializerMethodField()
+    """
+    Serializer completo para operaciones CRUD de tareas.
+
+    Los nombres relacionados se leen de las relaciones: el queryset debe usar
+    ``select_related(*RELACIONES_TAREA)``.
+    """
+
+    tipo_tarea_nombre = serializers.CharField(
+        source="tipo_tarea.nombre", read_only=True, default=None
+    )
+    fase_nombre = serializers.CharField(
+        source="fase.nombre", read_only=True, default=None
+    )
+    requerimiento_descripcion = serializers.CharField(
+        source="idrequerimiento.descripcion", read_only=True, default=None
+    )
+    proyecto_nombre = serializers.CharField(
+        source="idrequerimiento.idproyecto.nombreproyecto",
+        read_only=True,
+        default=None,
+    )
 
     # Useful for state representation in frontends
     estado_display = serializers.SerializerMethodField()
@@ -46,30 +85,6 @@ class TareaSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["fechacreacion", "fechamodificacion"]
 
-    def get_tipo_tarea_nombre(self, obj):
-        """Obtener el nombre del tipo de tarea si existe"""
-        if obj.tipo_tarea:
-            return obj.tipo_tarea.nombre
-        return None
-
-    def get_fase_nombre(self, obj):
-        """Obtener el nombre de la fase si existe"""
-        if obj.fase:
-            return obj.fase.nombre
-        return None
-
-    def get_requerimiento_descripcion(self, obj):
-        """Obtener la descripción del requerimiento"""
-        if obj.idrequerimiento:
-            return obj.idrequerimiento.descripcion
-        return None
-
-    def get_proyecto_nombre(self, obj):
-        """Obtener el nombre del proyecto asociado al requerimiento"""
-        if obj.idrequerimiento and obj.idrequerimiento.idproyecto:
-            return obj.idrequerimiento.idproyecto.nombreproyecto
-        return None
-
     def get_estado_display(self, obj):
         """Proporciona una versión más legible del estado"""
         estados = {
@@ -91,12 +106,19 @@ class TareaSerializer(serializers.ModelSerializer):
 
 
 class TareaListSerializer(serializers.ModelSerializer):
-    """Serializer ligero para listar tareas"""
-
-    tipo_tarea_nombre = serializers.SerializerMethodField()
-    fase_nombre = serializers.SerializerMethodField()
-    requerimiento_id = serializers.SerializerMethodField()
-    proyecto_nombre = serializers.SerializerMethodField()
+    """
+    Serializer ligero para listar tareas.
+
+    Los nombres relacionados vienen de ``anotar_relaciones``: el queryset (o
+    la tarea) debe pasar antes por esa función.
+    """
+
+    tipo_tarea_nombre = serializers.CharField(read_only=True)
+    fase_nombre = serializers.CharField(read_only=True)
+    requerimiento_id = serializers.IntegerField(
+        source="idrequerimiento_id", read_only=True
+    )
+    proyecto_nombre = serializers.CharField(read_only=True)
     estado_display = serializers.SerializerMethodField()
     prioridad_display = serializers.SerializerMethodField()
 
@@ -121,30 +143,6 @@ class TareaListSerializer(serializers.ModelSerializer):
             "proyecto_nombre",
         ]
 
-    def get_tipo_tarea_nombre(self, obj):
-        """Obtener el nombre del tipo de tarea si existe"""
-        if obj.tipo_tarea:
-            return obj.tipo_tarea.nombre
-        return None
-
-    def get_fase_nombre(self, obj):
-        """Obtener el nombre de la fase si existe"""
-        if obj.fase:
-            return obj.fase.nombre
-        return None
-
-    def get_requerimiento_id(self, obj):
-        """Obtener el ID del requerimiento"""
-        if obj.idrequerimiento:
-            return obj.idrequerimiento.idrequerimiento
-        return None
-
-    def get_proyecto_nombre(self, obj):
-        """Obtener el nombre del proyecto asociado al requerimiento"""
-        if obj.idrequerimiento and obj.idrequerimiento.idproyecto:
-            return obj.idrequerimiento.idproyecto.nombreproyecto
-        return None
-
     def get_estado_display(self, obj):
         """Proporciona una versión más legible del estado"""
         estados = {
@@ -163,3 +161,49 @@ class TareaListSerializer(serializers.ModelSerializer):
 
         prioridades = {1: "Baja", 2: "Media", 3: "Alta", 4: "Urgente", 5: "Crítica"}
         return prioridades.get(obj.prioridad, f"Nivel {obj.prioridad}")
+
+
+class TareaBulkSerializer(serializers.ModelSerializer):
+    """Elemento de la lista de ``POST /tareas/bulk/`` (ver ``api.lotes``)"""
+
+    idrequerimiento = RelacionPrecargadaField(queryset=Requerimiento.objects.all())
+    tipo_tarea = RelacionPrecargadaField(
+        queryset=TipoTarea.objects.all(), required=False, allow_null=True
+    )
+    fase = RelacionPrecargadaField(
+        queryset=Fase.objects.all(), required=False, allow_null=True
+    )
+
+    class Meta:
+        model = Tarea
+        list_serializer_class = PrecargaListSerializer
+        fields = [
+            "nombretarea",
+            "descripcion",
+            "tags",
+            "fechainicio",
+            "fechafin",
+            "duracionestimada",
+            "duracionactual",
+            "dificultad",
+            "estado",
+            "prioridad",
+            "tipo_tarea",
+            "fase",
+            "claridad_requisitos",
+            "tamaño_estimado",
+            "costoestimado",
+            "costoactual",
+            "idrequerimiento",
+        ]
+
+
+class TareaRecursoBulkSerializer(serializers.ModelSerializer):
+    """Elemento de la lista de ``POST /tareas/{id}/recursos/bulk/``"""
+
+    idrecurso = RelacionPrecargadaField(queryset=Recurso.objects.all())
+
+    class Meta:
+        model = Tarearecurso
+        list_serializer_class = PrecargaListSerializer
+        fields = ["idrecurso", "cantidad", "experiencia"]
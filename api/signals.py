@@ -0,0 +1,22 @@
+"""
+Señales que incrementan la versión de las tablas expuestas por la API
+(ver ``api/condicional.py``) al guardar o eliminar filas.
+"""
+
+from django.db.models.signals import post_delete, post_save
+
+from .condicional import MODELOS_VERSIONADOS, incrementar_version
+
+
+def _cambio(sender, raw=False, **kwargs):
+    if not raw:
+        incrementar_version(sender)
+
+
+for modelo in MODELOS_VERSIONADOS:
+    post_save.connect(
+        _cambio, sender=modelo, dispatch_uid=f"api_version_save_{modelo.__name__}"
+    )
+    post_delete.connect(
+        _cambio, sender=modelo, dispatch_uid=f"api_version_delete_{modelo.__name__}"
+    )
@@ -1,3 +1,439 @@
-from django.test import TestCase
+import math
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.condicional import incrementar_version
+from api.lotes import TAMANO_LOTE
+from auditoria.config_cache import obtener_config_modelo
+from auditoria.querysets import TAMANO_LOTE_DETALLES
+from api.serializers.estimacion_serializers import (
+    EstimacionTareaInputSerializer,
+    datos_tareas,
+)
+from dashboard import kpi_snapshot
+from dashboard.models import (
+    DetalleActividad,
+    Fase,
+    Proyecto,
+    Recurso,
+    Resultadosrnn,
+    Requerimiento,
+    Tarea,
+    Tiporecurso,
+    TipoTarea,
+    Usuario,
+)
+
+
+class TareasApiTestCase(TestCase):
+    """Datos comunes: un proyecto con ``TOTAL_TAREAS`` tareas y un administrador"""
+
+    TOTAL_TAREAS = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: sin señales de auditoría
+        (cls.usuario, _) = Usuario.objects.bulk_create(
+            [
+                Usuario(
+                    nombreusuario="api-test",
+                    username="api-test",
+                    email="api-test@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                ),
+                # Autor de la auditoría de las operaciones sin usuario en curso
+                Usuario(
+                    nombreusuario="api-admin",
+                    username="api-admin",
+                    email="api-admin@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                    is_superuser=True,
+                ),
+            ]
+        )
+        (proyecto,) = Proyecto.objects.bulk_create(
+            [Proyecto(nombreproyecto="Proyecto API")]
+        )
+        (requerimiento,) = Requerimiento.objects.bulk_create(
+            [Requerimiento(descripcion="Requerimiento API", idproyecto=proyecto)]
+        )
+        (tipo,) = TipoTarea.objects.bulk_create([TipoTarea(nombre="Backend")])
+        (fase,) = Fase.objects.bulk_create([Fase(nombre="Diseño", orden=1)])
+        Tarea.objects.bulk_create(
+            [
+                Tarea(
+                    nombretarea=f"Tarea {i}",
+                    estado="Pendiente",
+                    prioridad=2,
+                    tipo_tarea=tipo if i % 2 else None,
+                    fase=fase if i % 3 else None,
+                    idrequerimiento=requerimiento,
+                )
+                for i in range(cls.TOTAL_TAREAS)
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.usuario)
+
+    def _consultas(self, url, **params):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url, params)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(consultas), respuesta.json()
+
+
+class TareaViewSetConsultasTest(TareasApiTestCase):
+    """
+    El número de consultas de /api/v1/tareas/ no debe depender del número de
+    tareas serializadas (sin consultas por tarea para los nombres relacionados).
+    """
+
+    def test_listado_consultas_constantes(self):
+        consultas_pequena, datos = self._consultas("/api/v1/tareas/", page_size=5)
+        self.assertEqual(len(datos["results"]), 5)
+
+        consultas_grande, datos = self._consultas(
+            "/api/v1/tareas/", page_size=self.TOTAL_TAREAS
+        )
+        self.assertEqual(len(datos["results"]), self.TOTAL_TAREAS)
+        self.assertEqual(consultas_pequena, consultas_grande)
+
+        tarea = next(t for t in datos["results"] if t["nombretarea"] == "Tarea 1")
+        self.assertEqual(tarea["tipo_tarea_nombre"], "Backend")
+        self.assertEqual(tarea["fase_nombre"], "Diseño")
+        self.assertEqual(tarea["proyecto_nombre"], "Proyecto API")
+        tarea = next(t for t in datos["results"] if t["nombretarea"] == "Tarea 0")
+        self.assertIsNone(tarea["tipo_tarea_nombre"])
+        self.assertIsNone(tarea["fase_nombre"])
+
+    def test_detalle_sin_consultas_por_relacion(self):
+        tarea = Tarea.objects.get(nombretarea="Tarea 1")
+        consultas_detalle, datos = self._consultas(f"/api/v1/tareas/{tarea.pk}/")
+        self.assertEqual(datos["tipo_tarea_nombre"], "Backend")
+        self.assertEqual(datos["requerimiento_descripcion"], "Requerimiento API")
+        self.assertEqual(datos["proyecto_nombre"], "Proyecto API")
+
+        # Mismas consultas que una tarea sin tipo ni fase
+        tarea = Tarea.objects.get(nombretarea="Tarea 0")
+        consultas_sin_relaciones, datos = self._consultas(f"/api/v1/tareas/{tarea.pk}/")
+        self.assertIsNone(datos["fase_nombre"])
+        self.assertEqual(consultas_detalle, consultas_sin_relaciones)
+
+
+class PaginacionTareasTest(TareasApiTestCase):
+    """Paginación por cursor y sin total de /api/v1/tareas/"""
+
+    def test_cursor_recorre_todas_las_tareas(self):
+        # Fechas repetidas y nulas en la clave (fechacreacion, idtarea)
+        ids = list(Tarea.objects.order_by("idtarea").values_list("pk", flat=True))
+        Tarea.objects.filter(pk__in=ids[10:]).update(fechacreacion=timezone.now())
+
+        vistas = []
+        _, datos = self._consultas("/api/v1/tareas/", paginacion="cursor", page_size=7)
+        while True:
+            vistas += [t["idtarea"] for t in datos["results"]]
+            if not datos["next"]:
+                break
+            datos = self.client.get(datos["next"]).json()
+
+        self.assertIsNone(datos["count"])
+        # Primero las fechas nulas y después las demás, de la más reciente
+        self.assertEqual(vistas, ids[9::-1] + ids[:9:-1])
+
+    def test_sin_total(self):
+        consultas, datos = self._consultas(
+            "/api/v1/tareas/", count="false", page_size=self.TOTAL_TAREAS - 1
+        )
+        self.assertEqual(consultas, 1)
+        self.assertIsNone(datos["count"])
+        self.assertTrue(datos["has_next"])
+
+        _, datos = self._consultas(
+            "/api/v1/tareas/", count="false", page_size=self.TOTAL_TAREAS - 1, page=2
+        )
+        self.assertEqual(len(datos["results"]), 1)
+        self.assertFalse(datos["has_next"])
+
+
+class ConsultaCondicionalTest(TareasApiTestCase):
+    """ETag / If-None-Match en /api/v1/tareas/"""
+
+    def test_304_hasta_que_cambia_una_tarea(self):
+        respuesta = self.client.get("/api/v1/tareas/", {"page_size": 5})
+        etag = respuesta["ETag"]
+        # Solo ETag: Last-Modified (en segundos) puede dar un 304 incorrecto
+        self.assertFalse(respuesta.has_header("Last-Modified"))
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(
+                "/api/v1/tareas/", {"page_size": 5}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(len(consultas), 0)
+
+        # Otros parámetros, otra respuesta
+        respuesta = self.client.get(
+            "/api/v1/tareas/", {"page_size": 6}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Tarea.objects.filter(nombretarea="Tarea 1").update(estado="Completada")
+            incrementar_version(Tarea)
+
+        respuesta = self.client.get(
+            "/api/v1/tareas/", {"page_size": 5}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta["ETag"], etag)
+
+    def test_if_modified_since_no_valida(self):
+        respuesta = self.client.get(
+            "/api/v1/tareas/",
+            {"page_size": 5},
+            HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT",
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+    def _etag_invalidado(self, url, cambio):
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            cambio()
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta["ETag"], etag)
+
+    def test_save_y_delete_invalidan_el_etag(self):
+        tarea = Tarea.objects.get(nombretarea="Tarea 1")
+
+        def guardar():
+            tarea.estado = "Completada"
+            tarea.save()
+
+        self._etag_invalidado("/api/v1/tareas/", guardar)
+        self._etag_invalidado(f"/api/v1/tareas/{tarea.pk}/", guardar)
+        # Un cambio en una tabla relacionada que muestra el serializer
+        fase = Fase.objects.get()
+
+        def renombrar_fase():
+            fase.nombre = "Análisis"
+            fase.save()
+
+        self._etag_invalidado("/api/v1/tareas/", renombrar_fase)
+        otra = Tarea.objects.get(nombretarea="Tarea 2")
+        self._etag_invalidado("/api/v1/tareas/", otra.delete)
+
+
+class TareasBulkTest(TareasApiTestCase):
+    """POST /api/v1/tareas/bulk/"""
+
+    def _lista(self, total):
+        requerimiento = Requerimiento.objects.get()
+        return [
+            {"nombretarea": f"Bulk {i}", "idrequerimiento": requerimiento.pk}
+            for i in range(total)
+        ]
+
+    def _crear(self, datos):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post("/api/v1/tareas/bulk/", datos, format="json")
+        return len(consultas), respuesta
+
+    def _lotes(self, modelo, total, tamano_lote):
+        """INSERT con los que ``bulk_create`` guarda ``total`` filas en esta base"""
+        campos = [
+            campo for campo in modelo._meta.concrete_fields if not campo.primary_key
+        ]
+        maximo = max(connection.ops.bulk_batch_size(campos, [None] * total), 1)
+        return math.ceil(total / min(tamano_lote, maximo))
+
+    def _inserts(self, total):
+        """INSERT de ``total`` tareas y de sus detalles de auditoría"""
+        inserts = self._lotes(Tarea, total, TAMANO_LOTE)
+        if obtener_config_modelo("Tarea").nivel_detalle > 1:
+            inserts += self._lotes(DetalleActividad, total, TAMANO_LOTE_DETALLES)
+        return inserts
+
+    def test_consultas_constantes(self):
+        self._crear(self._lista(1))  # Carga la configuración de auditoría
+        consultas_pequena, respuesta = self._crear(self._lista(600))
+        self.assertEqual(respuesta.status_code, 201)
+        consultas_grande, respuesta = self._crear(self._lista(1200))
+        self.assertEqual(respuesta.status_code, 201)
+        # Solo cambia el número de INSERT (por lotes de tamaño fijo o por el
+        # máximo de parámetros por consulta de la base de datos)
+        self.assertEqual(
+            consultas_grande - consultas_pequena,
+            self._inserts(1200) - self._inserts(600),
+        )
+
+        resultados = respuesta.json()["resultados"]
+        self.assertEqual(len(resultados), 1200)
+        tarea = Tarea.objects.get(pk=resultados[-1]["idtarea"])
+        self.assertEqual(tarea.nombretarea, "Bulk 1199")
+        self.assertIsNotNone(tarea.fechacreacion)
+
+    def test_errores_por_elemento(self):
+        datos = self._lista(3)
+        datos[1]["idrequerimiento"] = 0
+        del datos[2]["nombretarea"]
+        _, respuesta = self._crear(datos)
+
+        self.assertEqual(respuesta.status_code, 400)
+        errores = respuesta.json()["errores"]
+        self.assertEqual([error["indice"] for error in errores], [1, 2])
+        self.assertIn("idrequerimiento", errores[0]["errores"])
+        self.assertIn("nombretarea", errores[1]["errores"])
+        self.assertFalse(Tarea.objects.filter(nombretarea__startswith="Bulk").exists())
+
+
+@override_settings(DASHBOARD_KPI_SNAPSHOT=True)
+class SnapshotBulkTest(TareasApiTestCase):
+    """Las altas en bloque (sin señales) mantienen el snapshot de KPIs"""
+
+    def _snapshot(self):
+        return sorted(
+            (fila for fila in kpi_snapshot.leer_snapshot() if fila["cantidad"]),
+            key=lambda fila: (fila["entidad"], str(fila["mes"]), fila["estado"]),
+        )
+
+    def _comprobar_snapshot(self):
+        incremental = self._snapshot()
+        kpi_snapshot.reconstruir_snapshot()
+        self.assertEqual(incremental, self._snapshot())
+
+    def test_tareas_bulk(self):
+        kpi_snapshot.reconstruir_snapshot()
+        requerimiento = Requerimiento.objects.get()
+        datos = [
+            {
+                "nombretarea": f"Bulk {i}",
+                "idrequerimiento": requerimiento.pk,
+                "estado": "Completada" if i % 2 else "Pendiente",
+                "costoestimado": "10.00",
+            }
+            for i in range(5)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post("/api/v1/tareas/bulk/", datos, format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        self._comprobar_snapshot()
+
+    def test_recursos_bulk(self):
+        (tipo,) = Tiporecurso.objects.bulk_create(
+            [Tiporecurso(nametiporecurso="Material")]
+        )
+        recursos = Recurso.objects.bulk_create(
+            [
+                Recurso(nombrerecurso=f"Recurso {i}", idtiporecurso=tipo)
+                for i in range(3)
+            ]
+        )
+        kpi_snapshot.reconstruir_snapshot()
+        tarea = Tarea.objects.get(nombretarea="Tarea 0")
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(
+                f"/api/v1/tareas/{tarea.pk}/recursos/bulk/",
+                [{"idrecurso": recurso.pk, "cantidad": 1} for recurso in recursos],
+                format="json",
+            )
+        self.assertEqual(respuesta.status_code, 201)
+        self._comprobar_snapshot()
+
+    def test_estimacion_bulk(self):
+        # Con duración real, la estimación cambia la productividad
+        Tarea.objects.update(duracionactual=4, estado="Completada")
+        kpi_snapshot.reconstruir_snapshot()
+        proyecto = Proyecto.objects.get()
+        estimacion = {
+            "tiempo_estimado": 5.0,
+            "unidad": "horas",
+            "modelo": "RNN básico",
+            "confianza": 0.75,
+        }
+        with mock.patch("api.views.estimacion_views.EstimacionService") as servicio:
+            servicio.return_value.estimar_tiempo_tareas.side_effect = lambda datos: [
+                estimacion for _ in datos
+            ]
+            with self.captureOnCommitCallbacks(execute=True):
+                respuesta = self.client.post(
+                    "/api/v1/estimacion/bulk/",
+                    {"idproyecto": proyecto.pk},
+                    format="json",
+                )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(Tarea.objects.filter(duracionestimada__isnull=True).exists())
+        self._comprobar_snapshot()
+
+
+class DatosEstimacionTest(TareasApiTestCase):
+    """Datos de entrada de la estimación en bloque"""
+
+    def test_datos_tareas_sin_consultas_por_tarea(self):
+        with CaptureQueriesContext(connection) as consultas:
+            datos = datos_tareas(Tarea.objects.order_by("idtarea"))
+        self.assertEqual(len(consultas), 2)
+        self.assertEqual(len(datos), self.TOTAL_TAREAS)
+
+        primera, segunda = list(datos.values())[:2]
+        self.assertEqual(primera["Tipo_Tarea"], "Backend")  # Por defecto
+        self.assertEqual(primera["Fase_Tarea"], "Construcción/Desarrollo")
+        self.assertEqual(segunda["Fase_Tarea"], "Diseño")
+        self.assertEqual(segunda["Cantidad_Recursos"], 1)
+
+        # Una tarea: mismos datos que en bloque
+        idtarea = list(datos)[1]
+        serializer = EstimacionTareaInputSerializer(data={"idtarea": idtarea})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.get_task_data(serializer.validated_data), segunda)
+
+
+class EstimacionBulkTest(TareasApiTestCase):
+    """POST /api/v1/estimacion/bulk/ con errores en algunas tareas"""
+
+    def test_errores_por_tarea(self):
+        def estimar(datos):
+            return [
+                (
+                    {"error": "Tipo de tarea desconocido"}
+                    if indice % 2
+                    else {
+                        "tiempo_estimado": 5.0,
+                        "unidad": "horas",
+                        "modelo": "RNN básico",
+                        "confianza": 0.75,
+                    }
+                )
+                for indice, _ in enumerate(datos)
+            ]
+
+        proyecto = Proyecto.objects.get()
+        with mock.patch("api.views.estimacion_views.EstimacionService") as servicio:
+            servicio.return_value.estimar_tiempo_tareas.side_effect = estimar
+            respuesta = self.client.post(
+                "/api/v1/estimacion/bulk/",
+                {"idproyecto": proyecto.pk},
+                format="json",
+            )
+
+        self.assertEqual(respuesta.status_code, 200)
+        resultados = respuesta.json()["resultados"]
+        self.assertEqual(len(resultados), self.TOTAL_TAREAS)
+        correctas = [r["idtarea"] for r in resultados if "estimacion" in r]
+        errores = [r for r in resultados if "error" in r]
+        self.assertEqual(len(correctas), self.TOTAL_TAREAS // 2)
+        self.assertEqual(errores[0]["error"], "Tipo de tarea desconocido")
+        # Solo se guardan las estimaciones correctas
+        self.assertEqual(
+            sorted(Resultadosrnn.objects.values_list("idtarea", flat=True)),
+            sorted(correctas),
+        )
@@ -3,18 +3,28 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
-from dashboard.models import Equipo, Miembro, Recurso, HistorialEquipo
+from dashboard.models import (
+    Equipo,
+    Miembro,
+    Recurso,
+    HistorialEquipo,
+    Recursohumano,
+    Usuario,
+)
 from api.permissions import IsAdminOrReadOnly
+from api.condicional import RespuestaCondicionalMixin
 from api.serializers.equipo_serializers import EquipoSerializer, EquipoDetailSerializer
 
 
-class EquipoViewSet(viewsets.ModelViewSet):
+class EquipoViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     """
     API endpoint para equipos que permite CRUD completo.
     Solo admin puede crear/actualizar/eliminar equipos.
     """
 
     queryset = Equipo.objects.all().order_by("-fechacreacion")
+    # Tablas que aparecen en las respuestas (ETag)
+    modelos_version = (Equipo, Miembro, Recurso, Recursohumano, Usuario)
     serializer_class = EquipoSerializer
     permission_classes = [IsAdminOrReadOnly]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
@@ -7,12 +7,19 @@ from rest_framework.decorators import (
 )
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 import logging
 
+from api.condicional import incrementar_version
+from api.lotes import TAMANO_LOTE
 from api.serializers.estimacion_serializers import (
     EstimacionTareaInputSerializer,
     EstimacionResultadoSerializer,
+    datos_tareas,
 )
+from dashboard import kpi_snapshot
 from dashboard.models import Tarea, Resultadosrnn, Modeloestimacionrnn
 from redes_neuronales.services import EstimacionService
 
@@ -93,6 +100,60 @@ class EstimacionTareaView(views.APIView):
             )
 
 
+def _guardar_estimaciones(estimaciones, datos):
+    """
+    Guarda las estimaciones de ``estimar_tiempo_bulk`` como
+    ``EstimacionTareaView``: el resultado de cada tarea en ``Resultadosrnn``
+    (un único upsert) y la duración estimada de las tareas que no la tienen.
+    """
+    ahora = timezone.now()
+    primera = next(iter(estimaciones.values()))
+
+    with transaction.atomic():
+        modelo, _ = Modeloestimacionrnn.objects.get_or_create(
+            nombremodelo=primera["modelo"],
+            defaults={
+                "descripcionmodelo": "Modelo de estimación de tiempo con red neuronal",
+                "precision": primera["confianza"],
+            },
+        )
+
+        Resultadosrnn.objects.bulk_create(
+            [
+                Resultadosrnn(
+                    idtarea_id=idtarea,
+                    idmodelo=modelo.idmodelo,
+                    duracionestimada=resultado["tiempo_estimado"],
+                    timestamp=ahora,
+                    recursos=str(datos[idtarea].get("Cantidad_Recursos")),
+                )
+                for idtarea, resultado in estimaciones.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["idtarea"],
+            update_fields=["idmodelo", "duracionestimada", "timestamp", "recursos"],
+            batch_size=TAMANO_LOTE,
+        )
+
+        sin_duracion = Tarea.objects.filter(idtarea__in=list(estimaciones)).filter(
+            Q(duracionestimada__isnull=True) | Q(duracionestimada=0)
+        )
+        tareas = [
+            Tarea(
+                idtarea=idtarea,
+                duracionestimada=int(estimaciones[idtarea]["tiempo_estimado"]),
+            )
+            for idtarea in sin_duracion.values_list("idtarea", flat=True)
+        ]
+        if tareas:
+            # bulk_update no dispara las señales del snapshot de KPIs
+            kpi_snapshot.registrar_cambio_tareas([tarea.idtarea for tarea in tareas])
+            Tarea.objects.bulk_update(
+                tareas, ["duracionestimada"], batch_size=TAMANO_LOTE
+            )
+            incrementar_version(Tarea)
+
+
 @api_view(["POST"])
 @authentication_classes([TokenAuthentication, SessionAuthentication])
 @permission_classes([IsAuthenticated])
@@ -117,50 +178,48 @@ def estimar_tiempo_bulk(request):
             )
         else:
             tareas = Tarea.objects.filter(idrequerimiento=id_requerimiento)
+        tareas = tareas.order_by("idtarea")
 
-        if not tareas.exists():
+        # Datos de todas las tareas con unas pocas consultas
+        datos = datos_tareas(tareas)
+        if not datos:
             return Response(
                 {"mensaje": "No hay tareas para estimar"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        nombres = dict(tareas.values_list("idtarea", "nombretarea"))
 
         # Obtener servicio de estimación
         estimacion_service = EstimacionService()
 
-        resultados = []
-        for tarea in tareas:
-            # Obtener datos serializados de la tarea
-            input_serializer = EstimacionTareaInputSerializer(
-                data={"idtarea": tarea.idtarea}
-            )
-            if input_serializer.is_valid():
-                try:
-                    # Realizar estimación
-                    tarea_data = input_serializer.get_task_data(
-                        {"idtarea": tarea.idtarea}
-                    )
-                    resultado = estimacion_service.estimar_tiempo_tarea(tarea_data)
-
-                    # Crear objeto de resultado
-                    resultado_item = {
-                        "idtarea": tarea.idtarea,
-                        "nombretarea": tarea.nombretarea,
-                        "estimacion": resultado,
-                    }
-                    resultados.append(resultado_item)
-
-                    # Opcionalmente guardar resultados en BD
-                    # Código similar al anterior endpoint
+        try:
+            # Una sola pasada del modelo para todas las tareas
+            resultados_modelo = estimacion_service.estimar_tiempo_tareas(datos.values())
+        except Exception as e:
+            # Error del lote completo: afecta a todas las tareas
+            logger.error(f"Error estimando las tareas: {e}")
+            resultados_modelo = [{"error": str(e)}] * len(datos)
 
-                except Exception as e:
-                    logger.error(f"Error estimando tarea {tarea.idtarea}: {e}")
-                    resultados.append(
-                        {
-                            "idtarea": tarea.idtarea,
-                            "nombretarea": tarea.nombretarea,
-                            "error": str(e),
-                        }
-                    )
+        estimaciones = {}
+        resultados = []
+        for idtarea, resultado in zip(datos, resultados_modelo):
+            resultado_item = {"idtarea": idtarea, "nombretarea": nombres[idtarea]}
+            if "error" in resultado:
+                logger.error(
+                    f"Error estimando la tarea {idtarea}: {resultado['error']}"
+                )
+                resultado_item["error"] = resultado["error"]
+            else:
+                resultado_item["estimacion"] = resultado
+                estimaciones[idtarea] = resultado
+            resultados.append(resultado_item)
+
+        if estimaciones:
+            try:
+                _guardar_estimaciones(estimaciones, datos)
+            except Exception as e:
+                logger.error(f"Error al guardar resultados de estimación: {e}")
+                # No interrumpir el flujo si falla el guardado
 
         return Response({"tareas_estimadas": len(resultados), "resultados": resultados})
 
@@ -3,8 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
-from dashboard.models import Proyecto
+from dashboard.models import Proyecto, Equipo
 from api.permissions import IsAdminOrReadOnly
+from api.condicional import RespuestaCondicionalMixin
 from api.serializers.proyecto_serializers import (
     ProyectoSerializer,
     ProyectoListSerializer,
@@ -12,13 +13,15 @@ from api.serializers.proyecto_serializers import (
 from api.pagination import CustomPagination
 
 
-class ProyectoViewSet(viewsets.ModelViewSet):
+class ProyectoViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     """
     API endpoint para proyectos que permite CRUD completo.
     Solo admin puede crear/actualizar/eliminar proyectos.
     """
 
     queryset = Proyecto.objects.all().order_by("-fechacreacion")
+    # Tablas que aparecen en las respuestas (ETag)
+    modelos_version = (Proyecto, Equipo)
     serializer_class = ProyectoSerializer
     permission_classes = [IsAdminOrReadOnly]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
@@ -59,10 +62,15 @@ class ProyectoViewSet(viewsets.ModelViewSet):
                 )
 
             # Get tasks associated with these requirements
-            tareas = Tarea.objects.filter(idrequerimiento__in=requerimientos).order_by(
-                "-fechacreacion"
+            from api.serializers.tarea_serializers import (
+                TareaListSerializer,
+                anotar_relaciones,
             )
 
+            tareas = anotar_relaciones(
+                Tarea.objects.filter(idrequerimiento__in=requerimientos)
+            ).order_by("-fechacreacion")
+
             # Apply filters from query params if they exist
             estado = request.query_params.get("estado")
             if estado:
@@ -75,8 +83,6 @@ class ProyectoViewSet(viewsets.ModelViewSet):
             # Use pagination if available
             page = self.paginate_queryset(tareas)
 
-            from api.serializers.tarea_serializers import TareaListSerializer
-
             if page is not None:
                 serializer = TareaListSerializer(page, many=True)
                 return self.get_paginated_response(serializer.data)
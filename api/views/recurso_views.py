@@ -17,12 +17,13 @@ from dashboard.models import (
     Actividad,
 )
 from api.permissions import IsAdminOrReadOnly
+from api.condicional import RespuestaCondicionalMixin
 from api.serializers.recurso_serializers import RecursoSerializer, RecursoListSerializer
 from api.pagination import CustomPagination
 from api.filters import RecursoFilter  # Importar el filtro personalizado
 
 
-class RecursoViewSet(viewsets.ModelViewSet):
+class RecursoViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     """
     API endpoint para recursos que permite CRUD completo.
     Solo admin puede crear/actualizar/eliminar recursos.
@@ -34,6 +35,8 @@ class RecursoViewSet(viewsets.ModelViewSet):
     """
 
     queryset = Recurso.objects.all().order_by("-fechacreacion")
+    # Tablas que aparecen en las respuestas (ETag)
+    modelos_version = (Recurso, Tiporecurso, Recursohumano, Recursomaterial, Usuario)
     serializer_class = RecursoSerializer
     permission_classes = [IsAdminOrReadOnly]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
@@ -6,6 +6,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count
 from dashboard.models import Requerimiento, Tarea, Proyecto, Actividad
 from api.permissions import IsAdminOrReadOnly
+from api.condicional import RespuestaCondicionalMixin
 from api.serializers.requerimiento_serializers import (
     RequerimientoSerializer,
     RequerimientoListSerializer,
@@ -13,13 +14,15 @@ from api.serializers.requerimiento_serializers import (
 from api.pagination import CustomPagination
 
 
-class RequerimientoViewSet(viewsets.ModelViewSet):
+class RequerimientoViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     """
     API endpoint para requerimientos que permite CRUD completo.
     Solo admin puede crear/actualizar/eliminar requerimientos.
     """
 
     queryset = Requerimiento.objects.all().order_by("-fechacreacion")
+    # Tablas que aparecen en las respuestas (ETag)
+    modelos_version = (Requerimiento, Proyecto, Tarea)
     serializer_class = RequerimientoSerializer
     permission_classes = [IsAdminOrReadOnly]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
@@ -103,9 +106,12 @@ class RequerimientoViewSet(viewsets.ModelViewSet):
     def tareas(self, request, pk=None):
         """Get all tasks related to this requirement"""
         requerimiento = self.get_object()
-        tareas = Tarea.objects.filter(idrequerimiento=requerimiento)
+        from api.serializers.tarea_serializers import (
+            TareaListSerializer,
+            anotar_relaciones,
+        )
 
-        from api.serializers.tarea_serializers import TareaListSerializer
+        tareas = anotar_relaciones(Tarea.objects.filter(idrequerimiento=requerimiento))
 
         serializer = TareaListSerializer(tareas, many=True)
         return Response(serializer.data)
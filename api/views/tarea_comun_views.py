@@ -5,10 +5,11 @@ from rest_framework.authentication import TokenAuthentication, SessionAuthentica
 from django_filters.rest_framework import DjangoFilterBackend
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
-from django.db.models import Count, Avg
+from django.db.models import Count, Avg, F
 
-from dashboard.models import TareaComun, TipoTarea, TareaTareaComun
+from dashboard.models import Tarea, TareaComun, TipoTarea
 from api.permissions import IsAdminOrReadOnly
+from api.condicional import RespuestaCondicionalMixin
 from api.serializers.tarea_comun_serializers import (
     TareaComunSerializer,
     TareaComunListSerializer,
@@ -16,13 +17,15 @@ from api.serializers.tarea_comun_serializers import (
 from api.pagination import CustomPagination
 
 
-class TareaComunViewSet(viewsets.ModelViewSet):
+class TareaComunViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     """
     API endpoint para tareas comunes que permite CRUD completo.
     Solo admin puede crear/actualizar/eliminar tareas comunes.
     """
 
     queryset = TareaComun.objects.all().order_by("-fechacreacion")
+    # Tablas que aparecen en las respuestas (ETag)
+    modelos_version = (TareaComun, TipoTarea)
     serializer_class = TareaComunSerializer
     permission_classes = [IsAdminOrReadOnly]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
@@ -36,11 +39,6 @@ class TareaComunViewSet(viewsets.ModelViewSet):
     search_fields = ["nombre", "descripcion"]
     ordering_fields = ["nombre", "fechacreacion"]
 
-    # Cache the list view for 15 minutes
-    @method_decorator(cache_page(60 * 15))
-    def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
-
     def get_serializer_class(self):
         """Use different serializers based on action"""
         if self.action == "list":
@@ -71,16 +69,20 @@ class TareaComunViewSet(viewsets.ModelViewSet):
     def tareas_relacionadas(self, request, pk=None):
         """Get tasks related to this common task"""
         tarea_comun = self.get_object()
-        relaciones = TareaTareaComun.objects.filter(idtareacomun=tarea_comun)
+        from api.serializers.tarea_serializers import (
+            TareaListSerializer,
+            anotar_relaciones,
+        )
 
-        from api.serializers.tarea_serializers import TareaListSerializer
+        # Tareas relacionadas con el porcentaje de similitud, en una consulta
+        tareas = anotar_relaciones(
+            Tarea.objects.filter(tareatareacomun__idtareacomun=tarea_comun)
+        ).annotate(similitud=F("tareatareacomun__similitud"))
 
         tareas_relacionadas = []
-        for rel in relaciones:
-            tarea = rel.idtarea
-            # Agregar la tarea y el porcentaje de similitud
+        for tarea in tareas:
             tarea_data = TareaListSerializer(tarea).data
-            tarea_data["similitud"] = rel.similitud
+            tarea_data["similitud"] = tarea.similitud
             tareas_relacionadas.append(tarea_data)
 
         return Response(tareas_relacionadas)
@@ -3,6 +3,9 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication, SessionAuthentication
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.utils import timezone
+from dashboard import kpi_snapshot
 from dashboard.models import (
     Tarea,
     TareaComun,
@@ -14,9 +17,19 @@ from dashboard.models import (
     Proyecto,
     Usuario,
     TipoTarea,
+    Fase,
 )
 from api.permissions import IsAdminOrReadOnly
-from api.serializers.tarea_serializers import TareaSerializer, TareaListSerializer
+from api.condicional import RespuestaCondicionalMixin
+from api.lotes import respuesta_errores, validar_lista
+from api.serializers.tarea_serializers import (
+    RELACIONES_TAREA,
+    TareaBulkSerializer,
+    TareaRecursoBulkSerializer,
+    TareaSerializer,
+    TareaListSerializer,
+    anotar_relaciones,
+)
 from api.pagination import CustomPagination
 import requests
 import logging
@@ -27,17 +40,21 @@ import os  # Add this import
 logger = logging.getLogger(__name__)
 
 
-class TareaViewSet(viewsets.ModelViewSet):
+class TareaViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     """
     API endpoint para tareas que permite CRUD completo.
     Solo admin puede crear/actualizar/eliminar tareas.
     """
 
     queryset = Tarea.objects.all().order_by("-fechacreacion")
+    # Tablas que aparecen en las respuestas (ETag)
+    modelos_version = (Tarea, TipoTarea, Fase, Requerimiento, Proyecto)
     serializer_class = TareaSerializer
     permission_classes = [IsAdminOrReadOnly]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
     pagination_class = CustomPagination
+    # Clave de la paginación por cursor (índice tarea_fecha_id_idx)
+    campos_cursor = ("fechacreacion", "idtarea")
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -54,6 +71,17 @@ class TareaViewSet(viewsets.ModelViewSet):
         "fechacreacion",
     ]
 
+    def get_queryset(self):
+        """
+        Queryset por acción: los listados anotan los nombres relacionados y el
+        resto de acciones trae las relaciones con select_related, de modo que
+        serializar no hace consultas por tarea.
+        """
+        queryset = super().get_queryset()
+        if self.action == "list":
+            return anotar_relaciones(queryset)
+        return queryset.select_related(*RELACIONES_TAREA)
+
     def get_serializer_class(self):
         """Use different serializers based on action"""
         if self.action == "list":
@@ -64,11 +92,96 @@ class TareaViewSet(viewsets.ModelViewSet):
         """Custom create logic if needed"""
         serializer.save()
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        Crea varias tareas en una petición: valida la lista completa y, si no
+        hay errores, las inserta en una sola transacción (ver ``api.lotes``).
+        """
+        error = validar_lista(request.data)
+        if error:
+            return error
+
+        serializer = TareaBulkSerializer(
+            data=request.data, many=True, context=self.get_serializer_context()
+        )
+        if not serializer.is_valid():
+            return respuesta_errores(serializer.errors)
+
+        ahora = timezone.now()
+        with transaction.atomic():
+            tareas = serializer.save(fechacreacion=ahora, fechamodificacion=ahora)
+            # bulk_create no dispara las señales que mantienen el snapshot
+            kpi_snapshot.registrar_altas_tareas([tarea.idtarea for tarea in tareas])
+        return Response(
+            {
+                "creados": len(tareas),
+                "resultados": [
+                    {"indice": indice, "idtarea": tarea.idtarea}
+                    for indice, tarea in enumerate(tareas)
+                ],
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=True, methods=["post"], url_path="recursos/bulk")
+    def recursos_bulk(self, request, pk=None):
+        """Asigna varios recursos a la tarea en una petición (ver ``bulk``)"""
+        tarea = self.get_object()
+        error = validar_lista(request.data)
+        if error:
+            return error
+
+        serializer = TareaRecursoBulkSerializer(
+            data=request.data, many=True, context=self.get_serializer_context()
+        )
+        if not serializer.is_valid():
+            return respuesta_errores(serializer.errors)
+
+        # Un recurso solo se asigna una vez a cada tarea (unique_together)
+        asignados = set(
+            Tarearecurso.objects.filter(idtarea=tarea).values_list(
+                "idrecurso_id", flat=True
+            )
+        )
+        errores = []
+        for datos in serializer.validated_data:
+            idrecurso = datos["idrecurso"].pk
+            errores.append(
+                {"idrecurso": [f"El recurso {idrecurso} ya está asignado a la tarea"]}
+                if idrecurso in asignados
+                else {}
+            )
+            asignados.add(idrecurso)
+        if any(errores):
+            return respuesta_errores(errores)
+
+        with transaction.atomic():
+            # bulk_create no dispara las señales que mantienen el snapshot
+            kpi_snapshot.registrar_cambio_tareas([tarea.pk])
+            asignaciones = serializer.save(idtarea=tarea)
+        return Response(
+            {
+                "creados": len(asignaciones),
+                "resultados": [
+                    {
+                        "indice": indice,
+                        "idtarearecurso": asignacion.idtarearecurso,
+                        "idrecurso": asignacion.idrecurso_id,
+                    }
+                    for indice, asignacion in enumerate(asignaciones)
+                ],
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
     @action(detail=True, methods=["get"])
     def recursos(self, request, pk=None):
         """Get all resources assigned to a specific task"""
         tarea = self.get_object()
-        tarea_recursos = Tarearecurso.objects.filter(idtarea=tarea)
+        tarea_recursos = Tarearecurso.objects.filter(idtarea=tarea).select_related(
+            "idrecurso__idtiporecurso"
+        )
 
         recursos_data = []
         for tr in tarea_recursos:
@@ -108,7 +221,9 @@ class TareaViewSet(viewsets.ModelViewSet):
     def tareas_comunes(self, request, pk=None):
         """Get common tasks related to this task"""
         tarea = self.get_object()
-        relaciones = TareaTareaComun.objects.filter(idtarea=tarea)
+        relaciones = TareaTareaComun.objects.filter(idtarea=tarea).select_related(
+            "idtareacomun"
+        )
 
         tareas_comunes = []
         for rel in relaciones:
@@ -148,7 +263,9 @@ class TareaViewSet(viewsets.ModelViewSet):
                 )
 
             # Get tasks for these requirements
-            tareas = Tarea.objects.filter(idrequerimiento__in=requerimientos)
+            tareas = anotar_relaciones(
+                Tarea.objects.filter(idrequerimiento__in=requerimientos)
+            )
 
             # Apply additional filters if provided
             estado = request.query_params.get("estado")
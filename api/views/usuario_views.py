@@ -6,15 +6,17 @@ from django_filters.rest_framework import DjangoFilterBackend
 from dashboard.models import Usuario
 from api.serializers.usuario_serializers import UsuarioSerializer, UsuarioListSerializer
 from api.permissions import IsAdminOrReadOnly
+from api.condicional import RespuestaCondicionalMixin
 
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     """
     API endpoint para usuarios que permite CRUD completo.
     Solo admin puede crear/actualizar/eliminar usuarios.
     """
 
     queryset = Usuario.objects.all().order_by("-fechacreacion")
+    modelos_version = (Usuario,)
     serializer_class = UsuarioSerializer
     permission_classes = [IsAdminOrReadOnly]
     authentication_classes = [TokenAuthentication, SessionAuthentication]
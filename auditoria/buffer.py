@@ -0,0 +1,210 @@
+"""
+Escritura asíncrona y por lotes de registros de auditoría.
+
+Las vistas encolan instancias de ``Actividad`` sin tocar la base de datos; un
+hilo en segundo plano las inserta con ``bulk_create`` cuando se acumulan
+``AUDITORIA_BUFFER_LOTE`` registros o han pasado ``AUDITORIA_BUFFER_INTERVALO_MS``
+milisegundos desde el último volcado. La cola es acotada: al llenarse se
+descartan los registros (modo ``drop``) o se bloquea al productor hasta que haya
+espacio (modo ``block``). Al terminar el proceso se vacía lo pendiente; si el
+hilo se detuvo o murió, la siguiente actividad encolada arranca otro.
+
+``fechacreacion`` es ``auto_now_add`` y se asigna en el momento del volcado, por
+lo que puede diferir de la hora del acceso en como máximo el intervalo de
+volcado.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from dashboard.models import Actividad
+
+logger = logging.getLogger(__name__)
+
+MODO_DESCARTAR = "drop"
+MODO_BLOQUEAR = "block"
+
+
+class BufferAuditoria:
+    """Cola acotada de actividades con un hilo que las persiste por lotes"""
+
+    def __init__(
+        self,
+        capacidad=10000,
+        tamano_lote=100,
+        intervalo_ms=1000,
+        modo=MODO_DESCARTAR,
+        timeout_bloqueo_ms=100,
+    ):
+        self.capacidad = capacidad
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo_ms / 1000
+        self.modo = modo
+        self.timeout_bloqueo = timeout_bloqueo_ms / 1000
+
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._pid = None
+
+        self.escritos = 0
+        self.descartados = 0
+        self.fallidos = 0
+
+    def estadisticas(self):
+        """Contadores del buffer para monitoreo"""
+        return {
+            "pendientes": self._cola.qsize(),
+            "escritos": self.escritos,
+            "descartados": self.descartados,
+            "fallidos": self.fallidos,
+        }
+
+    def encolar(self, actividad):
+        """
+        Añade una actividad sin esperar a la base de datos.
+
+        Devuelve ``False`` si la actividad se descartó por falta de espacio.
+        """
+        self._asegurar_hilo()
+        try:
+            if self.modo == MODO_BLOQUEAR:
+                self._cola.put(actividad, timeout=self.timeout_bloqueo)
+            else:
+                self._cola.put_nowait(actividad)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            return False
+
+    def vaciar(self):
+        """Persiste todo lo pendiente en el hilo actual"""
+        while self._volcar_lote():
+            pass
+
+    def detener(self, timeout=5):
+        """
+        Detiene el hilo de volcado y escribe los registros pendientes. Si
+        después se encola otra actividad se arranca un hilo nuevo.
+        """
+        with self._lock:
+            hilo = self._hilo
+            self._detener.set()
+        if hilo and hilo.is_alive() and hilo is not threading.current_thread():
+            hilo.join(timeout)
+        self.vaciar()
+
+    def _hilo_activo(self):
+        # Tras un fork (p. ej. workers de gunicorn) el hilo del padre no existe
+        return (
+            self._hilo is not None
+            and self._pid == os.getpid()
+            and self._hilo.is_alive()
+            and not self._detener.is_set()
+        )
+
+    def _asegurar_hilo(self):
+        if self._hilo_activo():
+            return
+        with self._lock:
+            if self._hilo_activo():
+                return
+            self._pid = os.getpid()
+            # Evento propio de cada hilo: uno detenido que aún está terminando
+            # no vuelve a arrancar al crear el siguiente
+            self._detener = threading.Event()
+            self._hilo = threading.Thread(
+                target=self._ejecutar,
+                args=(self._detener,),
+                name="auditoria-buffer",
+                daemon=True,
+            )
+            self._hilo.start()
+
+    def _ejecutar(self, detener):
+        try:
+            while not detener.is_set():
+                try:
+                    primera = self._cola.get(timeout=self.intervalo)
+                except queue.Empty:
+                    continue
+                lote = [primera]
+                self._completar_lote(lote)
+                self._escribir(lote)
+        finally:
+            close_old_connections()
+
+    def _completar_lote(self, lote):
+        """Espera hasta completar el lote o agotar el intervalo de volcado"""
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamano_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+
+    def _volcar_lote(self):
+        lote = []
+        while len(lote) < self.tamano_lote:
+            try:
+                lote.append(self._cola.get_nowait())
+            except queue.Empty:
+                break
+        if lote:
+            self._escribir(lote)
+        return bool(lote)
+
+    def _escribir(self, lote):
+        close_old_connections()
+        try:
+            Actividad.objects.bulk_create(lote, batch_size=self.tamano_lote)
+            with self._lock:
+                self.escritos += len(lote)
+        except Exception:
+            with self._lock:
+                self.fallidos += len(lote)
+            logger.exception(
+                f"Error al escribir {len(lote)} actividades de auditoría en lote"
+            )
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """Devuelve el buffer del proceso, creándolo con la configuración actual"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BufferAuditoria(
+                    capacidad=getattr(settings, "AUDITORIA_BUFFER_CAPACIDAD", 10000),
+                    tamano_lote=getattr(settings, "AUDITORIA_BUFFER_LOTE", 100),
+                    intervalo_ms=getattr(
+                        settings, "AUDITORIA_BUFFER_INTERVALO_MS", 1000
+                    ),
+                    modo=getattr(settings, "AUDITORIA_BUFFER_MODO", MODO_DESCARTAR),
+                    timeout_bloqueo_ms=getattr(
+                        settings, "AUDITORIA_BUFFER_TIMEOUT_BLOQUEO_MS", 100
+                    ),
+                )
+                atexit.register(_buffer.detener)
+    return _buffer
+
+
+def buffer_habilitado():
+    """Indica si la auditoría de navegación se escribe de forma asíncrona"""
+    return getattr(settings, "AUDITORIA_BUFFER_HABILITADO", True)
@@ -0,0 +1,99 @@
+"""
+Búsqueda de texto en el registro de actividades.
+
+En PostgreSQL se busca con texto completo sobre ``nombre``, ``descripcion`` y
+``accion`` usando el índice GIN ``actividad_busqueda_gin``; la expresión del
+vector se toma del propio índice para que la consulta coincida con él y el
+planificador pueda usarlo. El índice se mantiene solo al insertar, no hace
+falta columna ni disparador.
+
+Los nombres de usuario se resuelven antes a una lista de ids, de modo que la
+condición sobre ``idusuario`` también usa su índice en lugar de un ``JOIN``
+con ``ILIKE``. En otras bases de datos se mantiene el filtro con
+``icontains``.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+
+from dashboard.models import Actividad, Usuario
+
+NOMBRE_INDICE = "actividad_busqueda_gin"
+CONFIG_BUSQUEDA = "spanish"
+LIMITE_RESULTADOS = 50
+
+
+def busqueda_texto_completo():
+    return connection.vendor == "postgresql"
+
+
+def _vector_actividad():
+    for indice in Actividad._meta.indexes:
+        if indice.name == NOMBRE_INDICE:
+            return indice.expressions[0]
+    raise LookupError(f"Actividad no define el índice {NOMBRE_INDICE}")
+
+
+def _usuarios_coincidentes(texto):
+    return list(
+        Usuario.objects.filter(nombreusuario__icontains=texto).values_list(
+            "pk", flat=True
+        )
+    )
+
+
+def filtrar_por_texto(queryset, texto):
+    """
+    Filtra ``queryset`` por ``texto`` sin cambiar su orden.
+
+    En PostgreSQL se define el alias ``busqueda`` (el vector) y se acepta la
+    sintaxis de buscador web: palabras, ``"frase exacta"``, ``-excluir`` y
+    ``or``.
+    """
+    texto = (texto or "").strip()
+    if not texto:
+        return queryset
+
+    usuarios = _usuarios_coincidentes(texto)
+    if not busqueda_texto_completo():
+        return queryset.filter(
+            Q(idusuario__in=usuarios)
+            | Q(descripcion__icontains=texto)
+            | Q(accion__icontains=texto)
+        )
+
+    consulta = SearchQuery(texto, config=CONFIG_BUSQUEDA, search_type="websearch")
+    condicion = Q(busqueda=consulta)
+    if usuarios:
+        condicion |= Q(idusuario__in=usuarios)
+    return queryset.alias(busqueda=_vector_actividad()).filter(condicion)
+
+
+def buscar_por_relevancia(texto, queryset=None, limite=LIMITE_RESULTADOS):
+    """
+    Actividades que coinciden con ``texto`` ordenadas por relevancia.
+
+    Devuelve una lista de actividades con el atributo ``relevancia`` (``None``
+    fuera de PostgreSQL, donde se ordenan solo por fecha).
+    """
+    queryset = (
+        Actividad.objects.select_related("idusuario") if queryset is None else queryset
+    )
+    texto = (texto or "").strip()
+    if not texto:
+        return []
+
+    actividades = filtrar_por_texto(queryset, texto)
+    if not busqueda_texto_completo():
+        resultados = list(actividades.order_by("-fechacreacion")[:limite])
+        for actividad in resultados:
+            actividad.relevancia = None
+        return resultados
+
+    consulta = SearchQuery(texto, config=CONFIG_BUSQUEDA, search_type="websearch")
+    return list(
+        actividades.annotate(relevancia=SearchRank(F("busqueda"), consulta)).order_by(
+            "-relevancia", "-fechacreacion"
+        )[:limite]
+    )
@@ -0,0 +1,189 @@
+"""
+Caché local al proceso de la configuración de auditoría.
+
+Las señales consultan la configuración en cada ``pre_save``/``post_save`` y el
+middleware en cada solicitud. En lugar de ir a la base de datos cada vez, las
+tablas ``configuracion_auditoria`` y ``configuracion_general_auditoria`` se
+cargan completas una vez y se sirven desde memoria.
+
+Cada carga queda marcada con la versión guardada en la caché compartida
+(Redis) bajo ``CLAVE_VERSION``. Al modificar cualquiera de las dos tablas se
+incrementa esa versión; los demás procesos la comparan como mucho cada
+``AUDITORIA_CONFIG_INTERVALO_VERSION`` segundos y recargan si ha cambiado.
+"""
+
+import logging
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from dashboard.models import ConfiguracionAuditoria, ConfiguracionGeneralAuditoria
+
+logger = logging.getLogger(__name__)
+
+CLAVE_VERSION = "auditoria:config_version"
+
+_EN_MIGRACION = "migrate" in sys.argv
+
+_lock = threading.RLock()
+_estado = {
+    "cargado": False,
+    "version": None,
+    "comprobado_en": 0.0,
+    "modelos": {},
+    "campos": {},
+    "general": {},
+}
+
+
+def _intervalo_version():
+    return getattr(settings, "AUDITORIA_CONFIG_INTERVALO_VERSION", 5)
+
+
+def _leer_version():
+    try:
+        return cache.get(CLAVE_VERSION, 0)
+    except Exception:
+        logger.exception("Error al leer la versión de configuración de auditoría")
+        return None
+
+
+def _tablas_disponibles():
+    with connection.cursor() as cursor:
+        tablas = connection.introspection.table_names(cursor)
+    return (
+        "configuracion_auditoria" in tablas
+        and "configuracion_general_auditoria" in tablas
+    )
+
+
+def _cargar(version):
+    """Lee ambas tablas de configuración y reemplaza el estado en memoria"""
+    if not _tablas_disponibles():
+        print(
+            "Tabla configuracion_auditoria no existe todavía, saltando configuración de auditoría"
+        )
+        return False
+
+    modelos = {}
+    campos = {}
+    for config in ConfiguracionAuditoria.objects.order_by("idconfiguracion"):
+        if config.campo is None:
+            # Si hay duplicados se usa la primera, como cleanup_audit_configs
+            modelos.setdefault(config.modelo, config)
+        else:
+            campos.setdefault((config.modelo, config.campo), config)
+
+    general = dict(ConfiguracionGeneralAuditoria.objects.values_list("nombre", "valor"))
+
+    _estado.update(
+        cargado=True,
+        version=version,
+        comprobado_en=time.monotonic(),
+        modelos=modelos,
+        campos=campos,
+        general=general,
+    )
+    return True
+
+
+def _asegurar_cargado():
+    """Carga la configuración si no está en memoria o si su versión cambió"""
+    ahora = time.monotonic()
+    if _estado["cargado"] and ahora - _estado["comprobado_en"] < _intervalo_version():
+        return True
+
+    with _lock:
+        ahora = time.monotonic()
+        if (
+            _estado["cargado"]
+            and ahora - _estado["comprobado_en"] < _intervalo_version()
+        ):
+            return True
+
+        version = _leer_version()
+        if _estado["cargado"] and version == _estado["version"]:
+            _estado["comprobado_en"] = ahora
+            return True
+        return _cargar(version)
+
+
+def obtener_config_modelo(model_name):
+    """
+    Configuración general (``campo`` nulo) de un modelo.
+
+    Si no existe se crea con los valores por defecto. Devuelve ``None`` durante
+    las migraciones o si las tablas aún no existen.
+    """
+    if _EN_MIGRACION or not _asegurar_cargado():
+        return None
+
+    config = _estado["modelos"].get(model_name)
+    if config is not None:
+        return config
+
+    with _lock:
+        config = _estado["modelos"].get(model_name)
+        if config is None:
+            config = (
+                ConfiguracionAuditoria.objects.filter(
+                    modelo=model_name, campo__isnull=True
+                )
+                .order_by("idconfiguracion")
+                .first()
+            )
+            if config is None:
+                config = ConfiguracionAuditoria.objects.create(
+                    modelo=model_name,
+                    campo=None,  # Configuración para todo el modelo (no un campo específico)
+                    auditar_crear=True,
+                    auditar_modificar=True,
+                    auditar_eliminar=True,
+                    nivel_detalle=2,  # Nivel detallado por defecto
+                )
+            # Una fila creada dentro de una transacción aún puede revertirse
+            if not connection.in_atomic_block:
+                _estado["modelos"][model_name] = config
+    return config
+
+
+def obtener_config_campo(model_name, campo):
+    """Configuración específica de un campo, o ``None`` si no existe"""
+    if _EN_MIGRACION or not _asegurar_cargado():
+        return None
+    return _estado["campos"].get((model_name, campo))
+
+
+def obtener_config_general(nombre, default=None):
+    """Valor de una configuración general de auditoría"""
+    if _EN_MIGRACION or not _asegurar_cargado():
+        return default
+    return _estado["general"].get(nombre, default)
+
+
+def invalidar_configuracion():
+    """
+    Descarta la configuración en memoria e incrementa la versión compartida.
+
+    La recarga ocurre en el siguiente acceso, una vez confirmada la transacción.
+    """
+
+    def _invalidar():
+        with _lock:
+            _estado["cargado"] = False
+        try:
+            try:
+                cache.incr(CLAVE_VERSION)
+            except ValueError:
+                # La clave no existe todavía
+                cache.set(CLAVE_VERSION, 1, timeout=None)
+        except Exception:
+            logger.exception(
+                "Error al actualizar la versión de configuración de auditoría"
+            )
+
+    transaction.on_commit(_invalidar)
@@ -3,6 +3,8 @@ from django.db.models import Count
 from dashboard.models import ConfiguracionAuditoria
 from django.db import transaction
 
+from auditoria.config_cache import invalidar_configuracion
+
 
 class Command(BaseCommand):
     help = "Limpia configuraciones de auditoría duplicadas dejando solo una por modelo"
@@ -52,6 +54,8 @@ class Command(BaseCommand):
                     idconfiguracion__in=eliminar_ids
                 ).delete()
 
+            invalidar_configuracion()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"Limpieza completada: {total_duplicados} modelos con duplicados, {total_eliminados} configuraciones eliminadas"
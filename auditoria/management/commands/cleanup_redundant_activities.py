@@ -2,11 +2,19 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction
 from datetime import timedelta
-from dashboard.models import Actividad
+from dashboard.models import Actividad, DetalleActividad
+
+from auditoria import particiones
+from auditoria.resumen import actualizar_resumen, resumen_habilitado
+
+TAMANO_LOTE_RETENCION = 10000
 
 
 class Command(BaseCommand):
-    help = "Elimina actividades redundantes en la base de datos"
+    help = (
+        "Elimina actividades redundantes y aplica la política de retención "
+        "(particiones mensuales y resumen diario)"
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -26,12 +34,121 @@ class Command(BaseCommand):
             action="store_true",
             help="Solo mostrar qué se eliminaría sin realizar cambios",
         )
+        parser.add_argument(
+            "--skip-redundant",
+            action="store_true",
+            help="No buscar actividades redundantes (solo retención/resumen)",
+        )
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            help="Eliminar las actividades de los meses anteriores a los últimos N",
+        )
+        parser.add_argument(
+            "--create-partitions",
+            type=int,
+            nargs="?",
+            const=2,
+            help="Crear las particiones del mes actual y de los N siguientes (default: 2)",
+        )
+        parser.add_argument(
+            "--rollup",
+            action="store_true",
+            help="Actualizar el resumen diario de actividades por usuario y acción",
+        )
 
     def handle(self, *args, **options):
-        days = options["days"]
-        window = options["window"]
         dry_run = options["dry_run"]
 
+        if not options["skip_redundant"]:
+            self.limpiar_redundantes(options["days"], options["window"], dry_run)
+
+        if options["create_partitions"] is not None:
+            self.crear_particiones(options["create_partitions"], dry_run)
+
+        if options["rollup"] or (
+            options["retention_months"] is not None and resumen_habilitado()
+        ):
+            # El resumen se actualiza antes de eliminar para conservar los conteos
+            if dry_run:
+                self.stdout.write(
+                    self.style.NOTICE("Modo simulación: no se actualiza el resumen")
+                )
+            else:
+                filas = actualizar_resumen()
+                self.stdout.write(
+                    self.style.SUCCESS(f"Resumen diario actualizado: {filas} filas")
+                )
+
+        if options["retention_months"] is not None:
+            self.aplicar_retencion(options["retention_months"], dry_run)
+
+    def crear_particiones(self, meses_adelante, dry_run):
+        if not particiones.esta_particionada():
+            self.stdout.write(
+                self.style.WARNING(
+                    "La tabla actividad no está particionada "
+                    "(ejecutar particionar_actividad)"
+                )
+            )
+            return
+        if dry_run:
+            self.stdout.write(
+                self.style.NOTICE("Modo simulación: no se crean particiones")
+            )
+            return
+        creadas = particiones.asegurar_particiones(meses_adelante)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Particiones creadas: {', '.join(creadas) if creadas else 'ninguna'}"
+            )
+        )
+
+    def aplicar_retencion(self, meses, dry_run):
+        """Elimina lo anterior al primer día (UTC) del mes de hace ``meses`` meses"""
+        limite = particiones.limite_retencion(meses)
+
+        self.stdout.write(
+            self.style.NOTICE(f"Aplicando retención: actividades anteriores a {limite}")
+        )
+
+        if particiones.esta_particionada():
+            eliminadas = particiones.eliminar_particiones_antiguas(limite, dry_run)
+            accion = "Se eliminarían" if dry_run else "Eliminadas"
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{accion} {len(eliminadas)} particiones: {', '.join(eliminadas)}"
+                )
+            )
+            return
+
+        # Sin particionado: borrado por lotes de la clave primaria
+        antiguas = Actividad.objects.filter(
+            fechacreacion__lt=particiones.inicio_dia_utc(limite)
+        )
+        if dry_run:
+            self.stdout.write(
+                self.style.NOTICE(
+                    f"Modo simulación: se eliminarían {antiguas.count()} actividades"
+                )
+            )
+            return
+
+        total = 0
+        while True:
+            ids = list(
+                antiguas.values_list("idactividad", flat=True)[:TAMANO_LOTE_RETENCION]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                DetalleActividad.objects.filter(idactividad__in=ids).delete()
+                total += Actividad.objects.filter(idactividad__in=ids).delete()[0]
+        self.stdout.write(
+            self.style.SUCCESS(f"Eliminadas {total} actividades por retención")
+        )
+
+    def limpiar_redundantes(self, days, window, dry_run):
         self.stdout.write(
             self.style.NOTICE(
                 f"Buscando actividades redundantes en los últimos {days} días..."
@@ -92,8 +209,6 @@ class Command(BaseCommand):
             if not dry_run:
                 with transaction.atomic():
                     # Primero eliminar detalles
-                    from dashboard.models import DetalleActividad
-
                     DetalleActividad.objects.filter(
                         idactividad__idactividad__in=redundant_ids
                     ).delete()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auditoria import particiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Convierte la tabla actividad en una tabla particionada por mes "
+        "(solo PostgreSQL)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=2,
+            help="Meses futuros para los que crear partición (default: 2)",
+        )
+        parser.add_argument(
+            "--keep-old",
+            action="store_true",
+            help=f"Conservar la tabla original como {particiones.TABLA_ANTERIOR}",
+        )
+
+    def handle(self, *args, **options):
+        if not particiones.es_postgresql():
+            raise CommandError("El particionado de actividad requiere PostgreSQL")
+
+        if particiones.esta_particionada():
+            self.stdout.write(
+                self.style.NOTICE("La tabla actividad ya está particionada")
+            )
+            return
+
+        self.stdout.write(
+            self.style.NOTICE(
+                "Convirtiendo actividad en tabla particionada (la tabla queda "
+                "bloqueada mientras se copian los datos)..."
+            )
+        )
+        creadas = particiones.convertir_a_particionada(
+            meses_adelante=options["months_ahead"],
+            conservar_anterior=options["keep_old"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Tabla actividad particionada: {creadas} particiones mensuales creadas"
+            )
+        )
@@ -8,12 +8,46 @@ from django.contrib.auth.signals import (
 from django.dispatch import receiver
 from django.conf import settings
 from dashboard.models import Actividad, Usuario
+from .buffer import buffer_habilitado, get_buffer
+from .config_cache import obtener_config_general
 from .signals import set_current_user, get_current_user
+from functools import lru_cache
 import ipaddress
 import socket
 import platform
 
 
+@lru_cache(maxsize=1)
+def _ip_local():
+    """IP local de la máquina (no cambia durante la vida del proceso)"""
+    try:
+        return socket.gethostbyname(socket.gethostname())
+    except Exception:
+        return "127.0.0.1"
+
+
+@lru_cache(maxsize=1)
+def _info_sistema():
+    """Nombre del host y plataforma, calculados una sola vez por proceso"""
+    try:
+        hostname = socket.gethostname()
+        return f"{hostname} - {platform.system()} {platform.release()}"
+    except Exception:
+        return "Unknown system"
+
+
+@lru_cache(maxsize=2048)
+def _nombre_vista(url):
+    """Nombre "app:vista" de una ruta, o la propia ruta si no tiene nombre"""
+    return _nombre_desde_match(resolve(url), url)
+
+
+def _nombre_desde_match(resolver_match, url):
+    if resolver_match and resolver_match.url_name:
+        return f"{resolver_match.app_name}:{resolver_match.url_name}"
+    return url
+
+
 class AuditoriaMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -59,6 +93,7 @@ class AuditoriaMiddleware:
                     tiempo_respuesta,
                     codigo_respuesta,
                     ip_cliente,
+                    resolver_match=getattr(request, "resolver_match", None),
                 )
 
         return response
@@ -76,28 +111,16 @@ class AuditoriaMiddleware:
                 if ip:
                     break
 
-            # Si no se encuentra ninguna IP o es localhost
+            # Si no se encuentra ninguna IP o es localhost, usar la IP local
+            # real de la máquina
             if not ip or ip == "127.0.0.1" or ip == "localhost":
-                # Intentar obtener la IP local real de la máquina
-                try:
-                    # Obtener el nombre del host
-                    hostname = socket.gethostname()
-                    # Obtener la dirección IP local (solo la IP, sin información adicional)
-                    local_ip = socket.gethostbyname(hostname)
-                    return local_ip
-                except Exception:
-                    # Si todo falla, devolver una IP válida
-                    return "127.0.0.1"
+                return _ip_local()
 
         return ip
 
     def get_system_info(self):
         """Obtener información adicional del sistema para enriquecer los registros"""
-        try:
-            hostname = socket.gethostname()
-            return f"{hostname} - {platform.system()} {platform.release()}"
-        except:
-            return "Unknown system"
+        return _info_sistema()
 
     def should_skip_audit(self, request):
         """Determinar si se debe omitir la auditoría para esta solicitud"""
@@ -140,44 +163,47 @@ class AuditoriaMiddleware:
         return False
 
     def registrar_actividad_navegacion(
-        self, usuario, url, metodo, tiempo_respuesta, codigo, ip
+        self, usuario, url, metodo, tiempo_respuesta, codigo, ip, resolver_match=None
     ):
-        """Registrar actividad de navegación en la base de datos"""
+        """
+        Registrar actividad de navegación en la base de datos.
+
+        Con ``AUDITORIA_BUFFER_HABILITADO`` la actividad se encola y la escribe por
+        lotes el hilo de ``auditoria.buffer``, sin añadir latencia a la respuesta.
+        """
         try:
-            # Resolver la URL para obtener más información
-            resolver_match = resolve(url)
-            vista_nombre = (
-                f"{resolver_match.app_name}:{resolver_match.url_name}"
-                if resolver_match.url_name
-                else url
-            )
+            # Reutilizar la resolución hecha por Django para esta solicitud
+            if resolver_match is not None:
+                vista_nombre = _nombre_desde_match(resolver_match, url)
+            else:
+                vista_nombre = _nombre_vista(url)
 
             # Obtener información adicional del sistema
             sistema_info = self.get_system_info()
 
-            Actividad.objects.create(
+            actividad = Actividad(
                 nombre=f"Acceso a {vista_nombre}",
                 descripcion=f"Usuario accedió a la ruta {url} mediante método {metodo}. Sistema: {sistema_info}",
-                idusuario=usuario,
+                idusuario_id=usuario.pk,
                 accion="NAVEGACION",
                 entidad_tipo="Sistema",
                 ip_address=ip,  # Ahora solo contiene la IP válida
                 es_automatica=True,
             )
+            if buffer_habilitado():
+                get_buffer().encolar(actividad)
+            else:
+                actividad.save()
         except Exception as e:
             # Manejar cualquier error sin interrumpir la respuesta
             print(f"Error al registrar actividad de navegación: {e}")
 
     def is_navigation_audit_enabled(self):
         """Verifica si el registro de navegación está habilitado globalmente"""
-        from dashboard.models import ConfiguracionGeneralAuditoria
-
         try:
-            config = ConfiguracionGeneralAuditoria.objects.filter(
-                nombre="registrar_navegacion"
-            ).first()
-            if config:
-                return config.valor.lower() in ("true", "1", "yes", "si")
+            valor = obtener_config_general("registrar_navegacion")
+            if valor is not None:
+                return valor.lower() in ("true", "1", "yes", "si")
             return True  # Por defecto habilitado si no existe configuración
         except:
             return True  # En caso de error, habilitarlo por defecto
@@ -0,0 +1,245 @@
+"""
+Paginación por clave (keyset) para el registro de actividades y la API.
+
+En lugar de ``OFFSET`` cada página se pide a partir de la última fila vista,
+``WHERE fechacreacion <= :fecha AND (fechacreacion < :fecha OR
+(fechacreacion = :fecha AND idactividad < :id))``: la primera condición es la
+cota con la que PostgreSQL empieza a recorrer el índice
+``actividad_fecha_id_idx`` en el cursor, así que la página 10.000 cuesta lo
+mismo que la 1. Las filas con fecha nula se piden en una consulta aparte
+(``fechacreacion IS NULL``), también acotada por el índice.
+La posición viaja en un cursor opaco (JSON en base64) que también guarda el
+número de página solo para mostrarlo.
+
+Contar todas las filas es igual de caro que recorrerlas, así que el total puede
+pedirse exacto o estimado con las estadísticas del planificador de PostgreSQL.
+"""
+
+import base64
+import binascii
+import json
+import math
+
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+
+SIGUIENTE = "n"
+ANTERIOR = "p"
+
+
+def codificar_cursor(valores, direccion, numero):
+    fecha, pk = valores
+    datos = {
+        "f": fecha.isoformat() if fecha is not None else None,
+        "i": pk,
+        "d": direccion,
+        "n": numero,
+    }
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """
+    Devuelve ``((fecha, id), direccion, numero)`` o ``None`` si no es válido.
+    La fecha es ``None`` si la fila no tenía o la clave es solo el id.
+    """
+    if not cursor:
+        return None
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        fecha = datos.get("f")
+        if fecha is not None:
+            fecha = parse_datetime(fecha)
+            if fecha is None:
+                return None
+        if datos["d"] not in (SIGUIENTE, ANTERIOR):
+            return None
+        return (fecha, int(datos["i"])), datos["d"], max(int(datos["n"]), 1)
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+
+
+def estimar_total(queryset):
+    """
+    Número aproximado de filas de un queryset sin recorrerlas.
+
+    Sin filtros se usan las estadísticas de la tabla (``pg_class.reltuples``,
+    sumando sus particiones); con filtros, la estimación del planificador. En
+    bases de datos que no son PostgreSQL se cuenta de forma exacta.
+    """
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    if not queryset.query.where:
+        tabla = queryset.model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+                FROM pg_class c
+                WHERE c.oid = %s::regclass
+                   OR c.oid IN (
+                       SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass
+                   )
+                """,
+                [tabla, tabla],
+            )
+            estimado = cursor.fetchone()[0]
+        # Tablas recién creadas aún sin ANALYZE
+        return estimado if estimado > 0 else queryset.count()
+
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class PaginaKeyset:
+    """Página de resultados con cursores hacia la anterior y la siguiente"""
+
+    def __init__(self, object_list, numero, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.number = numero
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pagina un queryset en orden descendente por ``campos``: ``(fecha, id)``
+    (por defecto ``(fechacreacion, idactividad)``) o solo ``(id,)``.
+
+    Las filas con fecha nula van primero, el mismo orden que da en PostgreSQL
+    un índice ``(fecha, id)`` recorrido hacia atrás.
+    """
+
+    campos = ("fechacreacion", "idactividad")
+
+    def __init__(self, queryset, per_page, estimar=True, campos=None):
+        campos = campos or self.campos
+        self.campo_fecha = campos[0] if len(campos) == 2 else None
+        self.campo_id = campos[-1]
+        orden = [F(self.campo_id).desc()]
+        if self.campo_fecha:
+            orden.insert(0, F(self.campo_fecha).desc(nulls_first=True))
+        self.queryset = queryset.order_by(*orden)
+        self.per_page = per_page
+        self.estimar = estimar
+
+    def _valores(self, obj):
+        fecha = getattr(obj, self.campo_fecha) if self.campo_fecha else None
+        return fecha, getattr(obj, self.campo_id)
+
+    def _despues_de(self, fecha, pk):
+        """
+        Tramos de filas posteriores a ``(fecha, pk)``, en el orden en que se
+        recorren. Cada tramo tiene una cota sobre la primera columna del índice
+        (``fecha <= :fecha``, ``fecha IS NULL``...) para que PostgreSQL empiece
+        a recorrer el índice en el cursor en lugar de filtrar desde el principio.
+        """
+        id_menor = Q(**{f"{self.campo_id}__lt": pk})
+        if not self.campo_fecha:
+            return [id_menor]
+        if fecha is None:
+            # Tras las fechas nulas vienen todas las demás
+            return [
+                Q(**{f"{self.campo_fecha}__isnull": True}) & id_menor,
+                Q(**{f"{self.campo_fecha}__isnull": False}),
+            ]
+        return [
+            Q(**{f"{self.campo_fecha}__lte": fecha})
+            & (
+                Q(**{f"{self.campo_fecha}__lt": fecha})
+                | (Q(**{self.campo_fecha: fecha}) & id_menor)
+            )
+        ]
+
+    def _antes_de(self, fecha, pk):
+        """Tramos de filas anteriores a ``(fecha, pk)``, en orden ascendente"""
+        id_mayor = Q(**{f"{self.campo_id}__gt": pk})
+        if not self.campo_fecha:
+            return [id_mayor]
+        fecha_nula = Q(**{f"{self.campo_fecha}__isnull": True})
+        if fecha is None:
+            return [fecha_nula & id_mayor]
+        return [
+            Q(**{f"{self.campo_fecha}__gte": fecha})
+            & (
+                Q(**{f"{self.campo_fecha}__gt": fecha})
+                | (Q(**{self.campo_fecha: fecha}) & id_mayor)
+            ),
+            fecha_nula,
+        ]
+
+    @staticmethod
+    def _filas(queryset, tramos, limite):
+        """Hasta ``limite`` filas recorriendo los tramos en orden"""
+        filas = []
+        for tramo in tramos:
+            filas += list(queryset.filter(tramo)[: limite - len(filas)])
+            if len(filas) >= limite:
+                break
+        return filas
+
+    def get_page(self, cursor=None):
+        """Página indicada por el cursor; un cursor ausente o inválido da la primera"""
+        posicion = decodificar_cursor(cursor)
+        if posicion is None:
+            filas = list(self.queryset[: self.per_page + 1])
+            hay_mas = len(filas) > self.per_page
+            return self._pagina(filas[: self.per_page], 1, hay_mas, False)
+
+        (fecha, pk), direccion, numero = posicion
+        if direccion == SIGUIENTE:
+            filas = self._filas(
+                self.queryset, self._despues_de(fecha, pk), self.per_page + 1
+            )
+            hay_mas = len(filas) > self.per_page
+            return self._pagina(filas[: self.per_page], numero, hay_mas, True)
+
+        # Hacia atrás se recorre en orden ascendente y se invierte el resultado
+        filas = self._filas(
+            self.queryset.reverse(), self._antes_de(fecha, pk), self.per_page + 1
+        )
+        hay_anteriores = len(filas) > self.per_page
+        filas = list(reversed(filas[: self.per_page]))
+        if not filas:
+            return self.get_page(None)
+        return self._pagina(filas, numero, True, hay_anteriores)
+
+    def _pagina(self, filas, numero, hay_siguiente, hay_anterior):
+        siguiente = anterior = None
+        if filas and hay_siguiente:
+            siguiente = codificar_cursor(
+                self._valores(filas[-1]), SIGUIENTE, numero + 1
+            )
+        if filas and hay_anterior:
+            anterior = codificar_cursor(
+                self._valores(filas[0]), ANTERIOR, max(numero - 1, 1)
+            )
+        return PaginaKeyset(filas, numero, siguiente, anterior)
+
+    def count(self):
+        """Total de filas (estimado en PostgreSQL si ``estimar``)"""
+        if self.estimar:
+            return estimar_total(self.queryset)
+        return self.queryset.count()
+
+    def num_pages(self, total=None):
+        total = self.count() if total is None else total
+        return max(math.ceil(total / self.per_page), 1)
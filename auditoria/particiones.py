@@ -0,0 +1,309 @@
+"""
+Particionado mensual de la tabla ``actividad`` (solo PostgreSQL).
+
+``actividad`` se convierte en una tabla particionada por rango de
+``fechacreacion`` con una partición por mes (``actividad_AAAA_MM``) y una
+partición por defecto para fechas fuera de rango. Así la retención elimina un
+mes completo con ``DETACH PARTITION`` + ``DROP TABLE`` en lugar de borrar fila a
+fila.
+
+La conversión se hace una vez con ``python manage.py particionar_actividad``.
+Las particiones futuras se crean con ``cleanup_redundant_activities
+--create-partitions`` (conviene programarlo) y las antiguas se eliminan con
+``--retention-months``.
+
+Los límites de las particiones están en UTC, así que los meses (particiones
+a crear, retención) se calculan siempre a partir de ``timezone.now()`` en UTC
+y no de la fecha local. Si la partición por defecto ya tiene filas de un mes
+cuya partición se va a crear (porque el mantenimiento no se ejecutó a tiempo),
+se trasladan a la partición nueva en la misma transacción.
+
+Las claves primarias de una tabla particionada deben incluir la columna de
+partición, por eso la PK pasa a ser ``(idactividad, fechacreacion)`` y
+``detalle_actividad`` referencia a ``actividad`` sin restricción en la base de
+datos.
+"""
+
+import datetime
+import re
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABLA = "actividad"
+TABLA_ANTERIOR = "actividad_sin_particionar"
+PARTICION_DEFECTO = "actividad_default"
+SECUENCIA = "actividad_idactividad_part_seq"
+
+_PATRON_PARTICION = re.compile(r"^actividad_(\d{4})_(\d{2})$")
+
+
+def es_postgresql():
+    return connection.vendor == "postgresql"
+
+
+def esta_particionada():
+    """Indica si ``actividad`` ya es una tabla particionada"""
+    if not es_postgresql():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABLA],
+        )
+        return cursor.fetchone() is not None
+
+
+def hoy_utc():
+    """Fecha actual en UTC, la zona de los límites de las particiones"""
+    return timezone.now().astimezone(datetime.timezone.utc).date()
+
+
+def inicio_dia_utc(fecha):
+    """Medianoche UTC de ``fecha`` (como los límites de las particiones)"""
+    return datetime.datetime.combine(
+        fecha, datetime.time.min, tzinfo=datetime.timezone.utc
+    )
+
+
+def inicio_mes(fecha):
+    return datetime.date(fecha.year, fecha.month, 1)
+
+
+def mes_siguiente(mes):
+    return datetime.date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def nombre_particion(mes):
+    return f"{TABLA}_{mes.year:04d}_{mes.month:02d}"
+
+
+def limite_retencion(meses, hoy=None):
+    """Primer día (UTC) del mes de hace ``meses`` meses: se elimina lo anterior"""
+    limite = inicio_mes(hoy or hoy_utc())
+    for _ in range(meses):
+        limite = inicio_mes(limite - datetime.timedelta(days=1))
+    return limite
+
+
+def _limites(mes):
+    return (
+        f"'{mes.isoformat()} 00:00:00+00'",
+        f"'{mes_siguiente(mes).isoformat()} 00:00:00+00'",
+    )
+
+
+def _sql_crear_particion(mes):
+    desde, hasta = _limites(mes)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {nombre_particion(mes)} PARTITION OF {TABLA} "
+        f"FOR VALUES FROM ({desde}) TO ({hasta})"
+    )
+
+
+def _crear_particion(cursor, mes):
+    """
+    Crea la partición de ``mes`` trasladando antes las filas de ese mes que
+    estén en la partición por defecto (si no, PostgreSQL rechaza la partición).
+    Debe ejecutarse dentro de una transacción.
+    """
+    desde, hasta = _limites(mes)
+    # Sin escrituras concurrentes hasta crear la partición
+    cursor.execute(f"LOCK TABLE {TABLA} IN SHARE ROW EXCLUSIVE MODE")
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [PARTICION_DEFECTO])
+    hay_defecto = cursor.fetchone()[0]
+    condicion = f"fechacreacion >= {desde} AND fechacreacion < {hasta}"
+    if hay_defecto:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {PARTICION_DEFECTO} WHERE {condicion})"
+        )
+        hay_defecto = cursor.fetchone()[0]
+    if not hay_defecto:
+        cursor.execute(_sql_crear_particion(mes))
+        return 0
+
+    cursor.execute(
+        f"CREATE TEMPORARY TABLE {TABLA}_trasladar (LIKE {TABLA}) ON COMMIT DROP"
+    )
+    cursor.execute(
+        f"WITH movidas AS (DELETE FROM {PARTICION_DEFECTO} WHERE {condicion} "
+        f"RETURNING *) INSERT INTO {TABLA}_trasladar SELECT * FROM movidas"
+    )
+    trasladadas = cursor.rowcount
+    cursor.execute(_sql_crear_particion(mes))
+    cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM {TABLA}_trasladar")
+    cursor.execute(f"DROP TABLE {TABLA}_trasladar")
+    return trasladadas
+
+
+def listar_particiones():
+    """Particiones mensuales existentes como lista ordenada de ``(mes, nombre)``"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            """,
+            [TABLA],
+        )
+        nombres = [fila[0] for fila in cursor.fetchall()]
+
+    particiones = []
+    for nombre in nombres:
+        coincidencia = _PATRON_PARTICION.match(nombre)
+        if coincidencia:
+            mes = datetime.date(int(coincidencia[1]), int(coincidencia[2]), 1)
+            particiones.append((mes, nombre))
+    return sorted(particiones)
+
+
+def asegurar_particiones(meses_adelante=2, hoy=None):
+    """
+    Crea las particiones del mes actual (en UTC) y de los ``meses_adelante``
+    siguientes, con las filas de esos meses que hubiera en la partición por
+    defecto.
+
+    Devuelve los nombres de las particiones creadas.
+    """
+    existentes = {nombre for _, nombre in listar_particiones()}
+    mes = inicio_mes(hoy or hoy_utc())
+    creadas = []
+    for _ in range(meses_adelante + 1):
+        if nombre_particion(mes) not in existentes:
+            with transaction.atomic(), connection.cursor() as cursor:
+                _crear_particion(cursor, mes)
+            creadas.append(nombre_particion(mes))
+        mes = mes_siguiente(mes)
+    return creadas
+
+
+def eliminar_particiones_antiguas(antes_de, dry_run=False):
+    """
+    Desvincula y elimina las particiones cuyo mes termina antes de ``antes_de``.
+
+    Los detalles de esas actividades se borran por su clave foránea (las
+    actividades de navegación, que son la mayoría, no tienen detalles).
+    Devuelve los nombres de las particiones eliminadas.
+    """
+    eliminadas = []
+    for mes, nombre in listar_particiones():
+        if mes_siguiente(mes) > antes_de:
+            continue
+        eliminadas.append(nombre)
+        if dry_run:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM detalle_actividad d USING {nombre} a "
+                f"WHERE d.idactividad_id = a.idactividad"
+            )
+            cursor.execute(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}")
+            cursor.execute(f"DROP TABLE {nombre}")
+    return eliminadas
+
+
+def _restricciones_hacia(cursor, tabla_origen, tabla_destino):
+    cursor.execute(
+        """
+        SELECT conname FROM pg_constraint
+        WHERE contype = 'f'
+          AND conrelid = %s::regclass
+          AND confrelid = %s::regclass
+        """,
+        [tabla_origen, tabla_destino],
+    )
+    return [fila[0] for fila in cursor.fetchall()]
+
+
+def _indices_secundarios(cursor, tabla):
+    """Nombre y definición de los índices no únicos de ``tabla``"""
+    cursor.execute(
+        """
+        SELECT c.relname, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass AND NOT i.indisunique
+        """,
+        [tabla],
+    )
+    return cursor.fetchall()
+
+
+def convertir_a_particionada(meses_adelante=2, conservar_anterior=False):
+    """
+    Convierte ``actividad`` en una tabla particionada por mes y copia sus datos.
+
+    Se ejecuta en una transacción con la tabla bloqueada; en tablas grandes
+    conviene hacerlo en una ventana de mantenimiento. Devuelve el número de
+    particiones mensuales creadas.
+    """
+    if not es_postgresql():
+        raise RuntimeError("El particionado de actividad requiere PostgreSQL")
+    if esta_particionada():
+        return 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {TABLA} IN ACCESS EXCLUSIVE MODE")
+
+        for restriccion in _restricciones_hacia(cursor, "detalle_actividad", TABLA):
+            cursor.execute(
+                f"ALTER TABLE detalle_actividad DROP CONSTRAINT {restriccion}"
+            )
+
+        # Los índices secundarios (usuario, paginación, búsqueda) se recrean
+        # sobre la tabla nueva con su misma definición una vez copiados los datos
+        indices = _indices_secundarios(cursor, TABLA)
+        for nombre, _ in indices:
+            cursor.execute(f"ALTER INDEX {nombre} RENAME TO {nombre[:50]}_anterior")
+
+        cursor.execute(f"ALTER TABLE {TABLA} RENAME TO {TABLA_ANTERIOR}")
+        cursor.execute(
+            f"ALTER INDEX IF EXISTS {TABLA}_pkey RENAME TO {TABLA_ANTERIOR}_pkey"
+        )
+
+        cursor.execute(
+            f"CREATE TABLE {TABLA} (LIKE {TABLA_ANTERIOR} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (fechacreacion)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {TABLA} ADD PRIMARY KEY (idactividad, fechacreacion)"
+        )
+
+        # Secuencia propia: las columnas identity no se heredan entre particiones
+        # en todas las versiones de PostgreSQL
+        cursor.execute(f"CREATE SEQUENCE {SECUENCIA} OWNED BY {TABLA}.idactividad")
+        cursor.execute(
+            f"ALTER TABLE {TABLA} ALTER COLUMN idactividad "
+            f"SET DEFAULT nextval('{SECUENCIA}')"
+        )
+        cursor.execute(
+            f"SELECT setval('{SECUENCIA}', COALESCE(MAX(idactividad), 0) + 1, false) "
+            f"FROM {TABLA_ANTERIOR}"
+        )
+
+        cursor.execute(f"SELECT MIN(fechacreacion) FROM {TABLA_ANTERIOR}")
+        primera = cursor.fetchone()[0]
+        hoy = hoy_utc()
+        mes = inicio_mes(
+            primera.astimezone(datetime.timezone.utc).date() if primera else hoy
+        )
+        ultimo = inicio_mes(hoy)
+        for _ in range(meses_adelante):
+            ultimo = mes_siguiente(ultimo)
+        creadas = 0
+        while mes <= ultimo:
+            cursor.execute(_sql_crear_particion(mes))
+            creadas += 1
+            mes = mes_siguiente(mes)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {PARTICION_DEFECTO} PARTITION OF {TABLA} DEFAULT"
+        )
+
+        cursor.execute(f"INSERT INTO {TABLA} SELECT * FROM {TABLA_ANTERIOR}")
+        for _, definicion in indices:
+            cursor.execute(definicion)
+        if not conservar_anterior:
+            cursor.execute(f"DROP TABLE {TABLA_ANTERIOR}")
+    return creadas
@@ -0,0 +1,204 @@
+"""
+Operaciones masivas auditadas.
+
+``QuerySet.update()`` y ``bulk_create()`` no disparan las señales de
+auditoría. ``AuditedQuerySet`` ofrece ``audited_update()`` y
+``audited_bulk_create()``, que registran una sola ``Actividad`` por operación y
+sus ``DetalleActividad`` con ``bulk_create``, de modo que el número de
+consultas no depende del número de filas afectadas.
+
+Los modelos se importan dentro de los métodos porque ``dashboard.models`` usa
+este módulo para declarar sus managers.
+"""
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+
+TAMANO_LOTE_DETALLES = 1000
+
+
+def _usuario_auditoria(user):
+    """Usuario actual del hilo o, en su defecto, un superusuario (como las señales)"""
+    from .signals import get_current_user
+
+    user = user or get_current_user()
+    if not user:
+        try:
+            user = get_user_model().objects.filter(is_superuser=True).first()
+        except Exception:
+            pass
+    return user
+
+
+def _nombre_campo(field_name, pk=None):
+    nombre = field_name.replace("_", " ").title()
+    if pk is not None:
+        nombre = f"{nombre} (ID {pk})"
+    return nombre[:100]
+
+
+class AuditedQuerySet(models.QuerySet):
+    def _nombre_modelo(self):
+        from .signals import get_model_name
+
+        return get_model_name(self.model())
+
+    def _registrar_actividad(self, action_type, descripcion, user, entidad_id=None):
+        from .signals import get_client_ip
+
+        Actividad = apps.get_model("dashboard", "Actividad")
+        model_display = self._nombre_modelo()
+        return Actividad.objects.using(self.db).create(
+            nombre=f"{action_type} de {model_display}",
+            descripcion=descripcion,
+            idusuario=_usuario_auditoria(user),
+            accion=action_type,
+            entidad_tipo=self.model.__name__,
+            entidad_id=entidad_id,
+            ip_address=get_client_ip(),
+            es_automatica=True,
+        )
+
+    def _guardar_detalles(self, detalles):
+        DetalleActividad = apps.get_model("dashboard", "DetalleActividad")
+        DetalleActividad.objects.using(self.db).bulk_create(
+            detalles, batch_size=TAMANO_LOTE_DETALLES
+        )
+
+    def audited_update(self, user=None, **kwargs):
+        """
+        ``update()`` que registra una actividad de modificación para todo el lote.
+
+        Lee los valores anteriores de los campos actualizados en una consulta y
+        guarda un detalle por fila y campo que haya cambiado. Devuelve el número
+        de filas actualizadas, igual que ``update()``.
+        """
+        from .config_cache import obtener_config_campo, obtener_config_modelo
+
+        model_name = self.model.__name__
+        config = obtener_config_modelo(model_name)
+        if not config or not config.auditar_modificar:
+            return self.update(**kwargs)
+
+        campos = [self.model._meta.get_field(nombre) for nombre in kwargs]
+        attnames = [field.attname for field in campos]
+        # Con expresiones (F(), Case...) el valor nuevo solo se conoce tras actualizar
+        con_expresiones = any(
+            hasattr(valor, "resolve_expression") for valor in kwargs.values()
+        )
+
+        with transaction.atomic(using=self.db):
+            anteriores = {
+                fila[0]: fila[1:]
+                for fila in self.select_for_update(of=("self",)).values_list(
+                    "pk", *attnames
+                )
+            }
+            filas = self.update(**kwargs)
+            if not anteriores:
+                return filas
+
+            if con_expresiones:
+                nuevos = {
+                    fila[0]: fila[1:]
+                    for fila in self.model._base_manager.using(self.db)
+                    .filter(pk__in=list(anteriores))
+                    .values_list("pk", *attnames)
+                }
+            else:
+                valores = tuple(
+                    valor.pk if isinstance(valor, models.Model) else valor
+                    for valor in kwargs.values()
+                )
+                nuevos = dict.fromkeys(anteriores, valores)
+
+            cambios = []
+            for pk, valores_anteriores in anteriores.items():
+                for field, anterior, nuevo in zip(
+                    campos, valores_anteriores, nuevos.get(pk, valores_anteriores)
+                ):
+                    if anterior != nuevo:
+                        cambios.append((pk, field.name, anterior, nuevo))
+            if not cambios:
+                return filas
+
+            nombres_campos = sorted({cambio[1] for cambio in cambios})
+            model_display = self._nombre_modelo()
+            actividad = self._registrar_actividad(
+                "MODIFICACION",
+                f"Se ha modificado {model_display.lower()} en bloque: "
+                f"{len({cambio[0] for cambio in cambios})} registros "
+                f"({', '.join(_nombre_campo(nombre) for nombre in nombres_campos)})",
+                user,
+                entidad_id=next(iter(anteriores)) if len(anteriores) == 1 else None,
+            )
+
+            # No registrar detalles en nivel 1
+            if config.nivel_detalle == 1:
+                return filas
+
+            DetalleActividad = apps.get_model("dashboard", "DetalleActividad")
+            omitidos = {
+                nombre
+                for nombre in nombres_campos
+                if (campo := obtener_config_campo(model_name, nombre))
+                and not campo.auditar_modificar
+            }
+            self._guardar_detalles(
+                [
+                    DetalleActividad(
+                        idactividad=actividad,
+                        nombre_campo=_nombre_campo(nombre, pk),
+                        valor_anterior=str(anterior),
+                        valor_nuevo=str(nuevo),
+                    )
+                    for pk, nombre, anterior, nuevo in cambios
+                    if nombre not in omitidos
+                ]
+            )
+        return filas
+
+    def audited_bulk_create(self, objs, user=None, **kwargs):
+        """
+        ``bulk_create()`` que registra una única actividad de creación.
+
+        Con nivel de detalle 2 o superior se guarda un detalle por objeto creado.
+        Acepta los mismos argumentos que ``bulk_create()`` y devuelve los objetos.
+        """
+        from .config_cache import obtener_config_modelo
+        from .signals import get_instance_name
+
+        objs = list(objs)
+        config = obtener_config_modelo(self.model.__name__)
+        if not objs or not config or not config.auditar_crear:
+            return self.bulk_create(objs, **kwargs)
+
+        with transaction.atomic(using=self.db):
+            creados = self.bulk_create(objs, **kwargs)
+            model_display = self._nombre_modelo()
+            actividad = self._registrar_actividad(
+                "CREACION",
+                f"Se han creado {len(creados)} registros de "
+                f"{model_display.lower()} en bloque",
+                user,
+                entidad_id=creados[0].pk if len(creados) == 1 else None,
+            )
+
+            if config.nivel_detalle > 1:
+                DetalleActividad = apps.get_model("dashboard", "DetalleActividad")
+                self._guardar_detalles(
+                    [
+                        DetalleActividad(
+                            idactividad=actividad,
+                            nombre_campo=_nombre_campo("registro", obj.pk),
+                            valor_anterior=None,
+                            valor_nuevo=str(get_instance_name(obj)),
+                        )
+                        for obj in creados
+                    ]
+                )
+        return creados
+
+
+AuditedManager = models.Manager.from_queryset(AuditedQuerySet)
@@ -0,0 +1,145 @@
+"""
+Resumen diario de actividades por usuario y acción.
+
+La tabla ``actividad_resumen_diario`` guarda un conteo por (día, usuario,
+acción) de los días ya cerrados. Con ``AUDITORIA_RESUMEN_DIARIO`` activo, las
+estadísticas del registro de actividades suman el resumen y solo cuentan en
+``actividad`` los días posteriores al último resumido, en lugar de recorrer
+todo el histórico. El resumen conserva los conteos de las particiones que la
+política de retención ya eliminó.
+
+Se actualiza con ``cleanup_redundant_activities --rollup`` (y siempre antes de
+eliminar particiones).
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from dashboard.models import Actividad, ActividadResumenDiario, Usuario
+
+
+def resumen_habilitado():
+    """Indica si las estadísticas de auditoría se leen del resumen diario"""
+    return getattr(settings, "AUDITORIA_RESUMEN_DIARIO", False)
+
+
+def _inicio_dia(fecha):
+    return timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.min))
+
+
+def ultimo_dia_resumido():
+    return ActividadResumenDiario.objects.aggregate(ultimo=Max("fecha"))["ultimo"]
+
+
+def actualizar_resumen(hasta=None):
+    """
+    Resume los días completos pendientes, desde el último resumido hasta ``hasta``
+    (excluido, por defecto hoy). El último día resumido se recalcula por si se
+    resumió antes de cerrarse. Devuelve el número de filas escritas.
+    """
+    hasta = hasta or timezone.localdate()
+    ultimo = ultimo_dia_resumido()
+
+    actividades = Actividad.objects.filter(fechacreacion__lt=_inicio_dia(hasta))
+    if ultimo:
+        actividades = actividades.filter(fechacreacion__gte=_inicio_dia(ultimo))
+
+    filas = (
+        actividades.annotate(fecha=TruncDate("fechacreacion"))
+        .values("fecha", "idusuario", "accion")
+        .annotate(cantidad=Count("idactividad"))
+        .order_by()
+    )
+    resumen = [
+        ActividadResumenDiario(
+            fecha=fila["fecha"],
+            idusuario_id=fila["idusuario"],
+            accion=fila["accion"],
+            cantidad=fila["cantidad"],
+        )
+        for fila in filas
+    ]
+
+    with transaction.atomic():
+        if ultimo:
+            # Un solo DELETE: sin cargar las filas ni pasar por las señales
+            recientes = ActividadResumenDiario.objects.filter(fecha__gte=ultimo)
+            recientes._raw_delete(recientes.db)
+        ActividadResumenDiario.objects.bulk_create(resumen, batch_size=1000)
+    return len(resumen)
+
+
+def _actividades_sin_resumir():
+    ultimo = ultimo_dia_resumido()
+    if ultimo is None:
+        return Actividad.objects.all()
+    return Actividad.objects.filter(
+        fechacreacion__gte=_inicio_dia(ultimo + datetime.timedelta(days=1))
+    )
+
+
+def estadisticas_actividad(limite_usuarios=15):
+    """
+    Total de actividades, usuarios más activos y conteo por acción.
+
+    Devuelve ``(total, [(usuario, cantidad), ...], [{"accion", "total"}, ...])``.
+    """
+    if not resumen_habilitado():
+        usuarios = Usuario.objects.annotate(
+            num_actividades=Count("actividad")
+        ).order_by("-num_actividades")[:limite_usuarios]
+        tipos = (
+            Actividad.objects.values("accion")
+            .annotate(total=Count("idactividad"))
+            .order_by("-total")
+        )
+        return (
+            Actividad.objects.count(),
+            [(usuario, usuario.num_actividades) for usuario in usuarios],
+            list(tipos),
+        )
+
+    recientes = _actividades_sin_resumir()
+    por_usuario = {}
+    por_accion = {}
+    for idusuario, accion, cantidad in (
+        ActividadResumenDiario.objects.values_list("idusuario", "accion")
+        .annotate(total=Sum("cantidad"))
+        .order_by()
+    ):
+        por_usuario[idusuario] = por_usuario.get(idusuario, 0) + cantidad
+        por_accion[accion] = por_accion.get(accion, 0) + cantidad
+    for idusuario, accion, cantidad in (
+        recientes.values_list("idusuario", "accion")
+        .annotate(total=Count("idactividad"))
+        .order_by()
+    ):
+        por_usuario[idusuario] = por_usuario.get(idusuario, 0) + cantidad
+        por_accion[accion] = por_accion.get(accion, 0) + cantidad
+
+    top = sorted(
+        (
+            (idusuario, cantidad)
+            for idusuario, cantidad in por_usuario.items()
+            if idusuario
+        ),
+        key=lambda item: -item[1],
+    )[:limite_usuarios]
+    usuarios = Usuario.objects.in_bulk([idusuario for idusuario, _ in top])
+    return (
+        sum(por_accion.values()),
+        [
+            (usuarios[idusuario], cantidad)
+            for idusuario, cantidad in top
+            if idusuario in usuarios
+        ],
+        [
+            {"accion": accion, "total": total}
+            for accion, total in sorted(por_accion.items(), key=lambda item: -item[1])
+        ],
+    )
@@ -13,6 +13,7 @@ from dashboard.models import (
     Actividad,
     DetalleActividad,
     ConfiguracionAuditoria,
+    ConfiguracionGeneralAuditoria,
     Proyecto,
     Requerimiento,
     Tarea,
@@ -25,6 +26,8 @@ from dashboard.models import (
     Notificacion,
 )
 
+from . import config_cache
+
 # Variable local para almacenar el usuario actual
 _thread_local = threading.local()
 
@@ -57,47 +60,8 @@ def get_model_config(model_instance):
         return None
 
     try:
-        # Verificar primero si estamos en migración
-        import sys
-
-        if "migrate" in sys.argv:
-            return None
-
-        # Verificar si la tabla existe antes de consultarla
-        from django.db import connection
-
-        with connection.cursor() as cursor:
-            table_names = connection.introspection.table_names(cursor)
-            if "configuracion_auditoria" not in table_names:
-                print(
-                    "Tabla configuracion_auditoria no existe todavía, saltando configuración de auditoría"
-                )
-                return None
-
-        # Primero intentar encontrar una configuración existente
-        configs = list(
-            ConfiguracionAuditoria.objects.filter(modelo=model_name, campo__isnull=True)
-        )
-
-        # Si hay configuraciones existentes
-        if configs:
-            if len(configs) > 1:
-                # Si hay duplicados, usar la primera y programar una limpieza
-                return configs[0]
-            else:
-                # Solo hay una configuración, perfecto
-                return configs[0]
-        else:
-            # No hay configuración, crear una nueva
-            config = ConfiguracionAuditoria.objects.create(
-                modelo=model_name,
-                campo=None,  # Configuración para todo el modelo (no un campo específico)
-                auditar_crear=True,
-                auditar_modificar=True,
-                auditar_eliminar=True,
-                nivel_detalle=2,  # Nivel detallado por defecto
-            )
-            return config
+        # Se sirve desde la caché en memoria; solo se crea si no existe
+        return config_cache.obtener_config_modelo(model_name)
     except Exception as e:
         print(f"Error al obtener/crear configuración de auditoría: {e}")
         # Si hay error, usar valores predeterminados
@@ -302,9 +266,7 @@ def registrar_cambios(instance, changes, action_type, user=None):
     if changes and isinstance(changes, dict):
         for field, values in changes.items():
             # Verificar si el campo debe ser auditado específicamente
-            field_config = ConfiguracionAuditoria.objects.filter(
-                modelo=model_name, campo=field
-            ).first()
+            field_config = config_cache.obtener_config_campo(model_name, field)
             if field_config and not field_config.auditar_modificar:
                 continue
 
@@ -376,6 +338,65 @@ def get_entity_details(instance):
         return f"ID: {instance.pk}"
 
 
+# Campos que típicamente no se deberían auditar
+CAMPOS_IGNORADOS = ["updated_at", "fechamodificacion", "last_login"]
+
+
+def _campos_a_comparar(instance, update_fields=None):
+    campos = [f for f in instance._meta.fields if f.name not in CAMPOS_IGNORADOS]
+    if update_fields is not None:
+        # Con update_fields solo se escriben (y pueden cambiar) esos campos
+        update_fields = set(update_fields)
+        campos = [
+            f for f in campos if f.name in update_fields or f.attname in update_fields
+        ]
+    return campos
+
+
+def _valor_relacionado(field, pk):
+    """Representación del objeto al que apuntaba una FK, como en el diff original"""
+    if pk is None:
+        return None
+    return field.related_model._base_manager.filter(pk=pk).first()
+
+
+def detectar_cambios(sender, instance, update_fields=None):
+    """
+    Diferencias entre el estado guardado y el actual de una instancia.
+
+    Los modelos con ``SnapshotAuditoriaMixin`` comparan en memoria contra los
+    valores leídos de la base de datos; solo se consulta la instancia relacionada
+    de una FK que haya cambiado. El resto vuelve a leer la fila completa.
+    """
+    campos = _campos_a_comparar(instance, update_fields)
+    originales = getattr(instance, "_valores_originales", None)
+    changes = {}
+
+    if originales is None or any(f.attname not in originales for f in campos):
+        old_instance = sender.objects.get(pk=instance.pk)
+        for field in campos:
+            # Obtener valores antiguos y nuevos
+            old_value = getattr(old_instance, field.name)
+            new_value = getattr(instance, field.name)
+
+            # Si son diferentes, registrar el cambio
+            if old_value != new_value:
+                changes[field.name] = {"old": str(old_value), "new": str(new_value)}
+        return changes
+
+    for field in campos:
+        old_value = originales[field.attname]
+        if old_value == getattr(instance, field.attname):
+            continue
+        if field.is_relation:
+            old_value = _valor_relacionado(field, old_value)
+        changes[field.name] = {
+            "old": str(old_value),
+            "new": str(getattr(instance, field.name)),
+        }
+    return changes
+
+
 # Para capturar diferencias entre estado anterior y nuevo
 @receiver(pre_save)
 def pre_save_handler(sender, instance, **kwargs):
@@ -389,6 +410,12 @@ def pre_save_handler(sender, instance, **kwargs):
         "Actividad",
         "DetalleActividad",
         "ConfiguracionAuditoria",
+        "DjangoJob",
+        "DjangoJobExecution",
+        "Migration",
+        # Tablas derivadas, se reconstruyen desde las tablas de hechos
+        "KpiSnapshot",
+        "ActividadResumenDiario",
     ]
     if sender.__name__ in excluded_models:
         return
@@ -401,24 +428,7 @@ def pre_save_handler(sender, instance, **kwargs):
     if instance.pk:
         # Si la instancia ya existe, es una actualización
         try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            changes = {}
-
-            # Comparar cada campo
-            for field in instance._meta.fields:
-                field_name = field.name
-
-                # Ignorar campos que típicamente no se deberían auditar
-                if field_name in ["updated_at", "fechamodificacion", "last_login"]:
-                    continue
-
-                # Obtener valores antiguos y nuevos
-                old_value = getattr(old_instance, field_name)
-                new_value = getattr(instance, field_name)
-
-                # Si son diferentes, registrar el cambio
-                if old_value != new_value:
-                    changes[field_name] = {"old": str(old_value), "new": str(new_value)}
+            changes = detectar_cambios(sender, instance, kwargs.get("update_fields"))
 
             # Guardar cambios temporalmente en la instancia
             if changes:
@@ -430,6 +440,10 @@ def pre_save_handler(sender, instance, **kwargs):
 @receiver(post_save)
 def audit_post_save(sender, instance, created, **kwargs):
     """Registra creaciones y modificaciones automáticamente"""
+    # El estado recién guardado pasa a ser la referencia para el próximo diff
+    if hasattr(instance, "_capturar_valores_originales"):
+        instance._capturar_valores_originales(kwargs.get("update_fields"))
+
     # Excluir modelos que no queremos auditar
     excluded_models = [
         "Session",
@@ -439,6 +453,12 @@ def audit_post_save(sender, instance, created, **kwargs):
         "Actividad",
         "DetalleActividad",
         "ConfiguracionAuditoria",
+        "DjangoJob",
+        "DjangoJobExecution",
+        "Migration",
+        # Tablas derivadas, se reconstruyen desde las tablas de hechos
+        "KpiSnapshot",
+        "ActividadResumenDiario",
     ]
     if sender.__name__ in excluded_models:
         return
@@ -484,6 +504,12 @@ def audit_post_delete(sender, instance, **kwargs):
         "Actividad",
         "DetalleActividad",
         "ConfiguracionAuditoria",
+        "DjangoJob",
+        "DjangoJobExecution",
+        "Migration",
+        # Tablas derivadas, se reconstruyen desde las tablas de hechos
+        "KpiSnapshot",
+        "ActividadResumenDiario",
     ]
     if sender.__name__ in excluded_models:
         return
@@ -500,6 +526,15 @@ def audit_post_delete(sender, instance, **kwargs):
     registrar_cambios(instance, {}, "ELIMINACION", user)
 
 
+@receiver(post_save, sender=ConfiguracionAuditoria)
+@receiver(post_delete, sender=ConfiguracionAuditoria)
+@receiver(post_save, sender=ConfiguracionGeneralAuditoria)
+@receiver(post_delete, sender=ConfiguracionGeneralAuditoria)
+def invalidar_config_auditoria(sender, **kwargs):
+    """Fuerza la recarga de la configuración en caché en todos los procesos"""
+    config_cache.invalidar_configuracion()
+
+
 # Lista completa de modelos a auditar
 models_to_audit = [
     # Modelos principales
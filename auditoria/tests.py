@@ -1,3 +1,137 @@
+import datetime
+import unittest
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from dashboard.models import Actividad, ActividadResumenDiario, Usuario
+
+from . import particiones, resumen
+from .buffer import BufferAuditoria
+
+UTC = datetime.timezone.utc
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql", "El particionado requiere PostgreSQL"
+)
+class ParticionesActividadTest(TestCase):
+    """Meses en UTC y filas de la partición por defecto al crear una partición"""
+
+    # 31 de marzo a las 23:30 en America/Lima: ya es abril en UTC
+    AHORA = datetime.datetime(2026, 4, 1, 4, 30, tzinfo=UTC)
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: sin señales de auditoría
+        (cls.usuario,) = Usuario.objects.bulk_create(
+            [
+                Usuario(
+                    nombreusuario="auditoria-test",
+                    username="auditoria-test",
+                    email="auditoria-test@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                )
+            ]
+        )
+
+    def setUp(self):
+        reloj = mock.patch("django.utils.timezone.now", return_value=self.AHORA)
+        reloj.start()
+        self.addCleanup(reloj.stop)
+        # DDL transaccional: se deshace al terminar cada test
+        particiones.convertir_a_particionada(meses_adelante=0)
+
+    def _contar(self, tabla):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {tabla}")
+            return cursor.fetchone()[0]
+
+    def test_meses_en_utc(self):
+        self.assertEqual(particiones.hoy_utc(), datetime.date(2026, 4, 1))
+        nombres = [nombre for _, nombre in particiones.listar_particiones()]
+        self.assertIn("actividad_2026_04", nombres)
+        self.assertEqual(particiones.limite_retencion(1), datetime.date(2026, 3, 1))
+
+    def test_traslada_filas_de_la_particion_por_defecto(self):
+        # Sin partición de junio todavía: va a la partición por defecto
+        (actividad,) = Actividad.objects.bulk_create(
+            [Actividad(nombre="Futura", accion="CREACION", idusuario=self.usuario)]
+        )
+        junio = datetime.datetime(2026, 6, 15, tzinfo=UTC)
+        Actividad.objects.filter(pk=actividad.pk).update(fechacreacion=junio)
+        self.assertEqual(self._contar(particiones.PARTICION_DEFECTO), 1)
+
+        creadas = particiones.asegurar_particiones(meses_adelante=2)
+
+        self.assertEqual(creadas, ["actividad_2026_05", "actividad_2026_06"])
+        self.assertEqual(self._contar(particiones.PARTICION_DEFECTO), 0)
+        self.assertEqual(self._contar("actividad_2026_06"), 1)
+        self.assertEqual(Actividad.objects.get(pk=actividad.pk).fechacreacion, junio)
+
+
+class BufferAuditoriaTest(TestCase):
+    """El hilo de volcado vuelve a arrancar al encolar tras ``detener()``"""
+
+    def test_encolar_tras_detener(self):
+        escritas = []
+        buffer = BufferAuditoria(intervalo_ms=10)
+        with mock.patch.object(
+            BufferAuditoria, "_escribir", lambda _, lote: escritas.extend(lote)
+        ):
+            buffer.encolar("primera")
+            primer_hilo = buffer._hilo
+            buffer.detener()
+            self.assertFalse(primer_hilo.is_alive())
+            self.assertEqual(escritas, ["primera"])
+
+            buffer.encolar("segunda")
+            self.assertIsNot(buffer._hilo, primer_hilo)
+            self.assertTrue(buffer._hilo.is_alive())
+            buffer.detener()
+
+        self.assertEqual(escritas, ["primera", "segunda"])
+
+
+class ResumenActividadTest(TestCase):
+    """Volver a resumir el último día no audita las filas del resumen"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: sin señales de auditoría
+        (cls.usuario,) = Usuario.objects.bulk_create(
+            [
+                Usuario(
+                    nombreusuario="resumen-test",
+                    username="resumen-test",
+                    email="resumen-test@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                )
+            ]
+        )
+        ayer = timezone.now() - datetime.timedelta(days=1)
+        actividades = Actividad.objects.bulk_create(
+            [
+                Actividad(
+                    nombre=f"Actividad {i}", accion="CREACION", idusuario=cls.usuario
+                )
+                for i in range(3)
+            ]
+        )
+        Actividad.objects.filter(pk__in=[a.pk for a in actividades]).update(
+            fechacreacion=ayer
+        )
+
+    def test_resumir_de_nuevo_no_audita(self):
+        self.assertEqual(resumen.actualizar_resumen(), 1)
+        antes = Actividad.objects.count()
+
+        self.assertEqual(resumen.actualizar_resumen(), 1)
 
-# Create your tests here.
+        self.assertEqual(Actividad.objects.count(), antes)
+        fila = ActividadResumenDiario.objects.get()
+        self.assertEqual(fila.cantidad, 3)
@@ -0,0 +1,30 @@
+from apscheduler.triggers.cron import CronTrigger
+from django.conf import settings
+from django.core.management import call_command
+
+from auditoria import particiones
+from auditoria.resumen import resumen_habilitado
+from notificaciones.scheduler import registrar_trabajo
+
+
+def mantenimiento_auditoria():
+    """
+    Crea las particiones de los próximos meses, actualiza el resumen diario y
+    aplica la retención configurada en ``AUDITORIA_RETENCION_MESES``.
+    """
+    opciones = {"skip_redundant": True, "rollup": resumen_habilitado()}
+    if particiones.esta_particionada():
+        opciones["create_partitions"] = 2
+    meses = getattr(settings, "AUDITORIA_RETENCION_MESES", 0)
+    if meses > 0:
+        opciones["retention_months"] = meses
+    call_command("cleanup_redundant_activities", **opciones)
+
+
+# Mantenimiento del registro de actividades (cada día a las 03:00)
+registrar_trabajo(
+    "mantenimiento_auditoria",
+    mantenimiento_auditoria,
+    CronTrigger(hour=3, minute=0),
+    nombre="Particiones, resumen y retención de auditoría",
+)
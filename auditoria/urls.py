@@ -14,6 +14,7 @@ urlpatterns = [
     path("filtrar-actividades/", views.filtrar_actividades, name="filtrar_actividades"),
     # API para paginación AJAX
     path("lista-actividades/", views.lista_actividades, name="lista_actividades"),
+    path("buscar-actividades/", views.buscar_actividades, name="buscar_actividades"),
     path("intentos-acceso/", views.intentos_acceso, name="intentos_acceso"),
     path("gestion-roles/", views.gestion_roles, name="gestion_roles"),
     path("crear-actividad/", views.crear_actividad, name="crear_actividad"),
@@ -11,63 +11,56 @@ from dashboard.models import (
 )
 from django.db.models import Q, Count
 from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
+
+from .busqueda import buscar_por_relevancia, filtrar_por_texto
+from .paginacion import KeysetPaginator
+from .resumen import estadisticas_actividad
 
 # Importar modelos disponibles para auditoría
 from django.apps import apps
 
 
+def _actividades_filtradas(filtro, busqueda):
+    """Actividades con los filtros del registro, listas para paginar por clave"""
+    actividades = Actividad.objects.select_related("idusuario")
+    if filtro:
+        actividades = actividades.filter(accion=filtro)
+    if busqueda:
+        actividades = filtrar_por_texto(actividades, busqueda)
+    return actividades
+
+
 def registro_actividades(request):
     # Obtener filtros
     estado = request.GET.get("filtro", "")
     busqueda = request.GET.get("busqueda", "")
 
-    # Query base
-    actividades = Actividad.objects.all().order_by("-fechacreacion")
-
-    # Aplicar filtros
-    if estado:
-        actividades = actividades.filter(accion=estado)
-    if busqueda:
-        actividades = actividades.filter(
-            Q(idusuario__nombreusuario__icontains=busqueda)
-            | Q(descripcion__icontains=busqueda)
-            | Q(accion__icontains=busqueda)
-        )
+    actividades = _actividades_filtradas(estado, busqueda)
 
     # Obtener tipos únicos de actividades para los filtros
     tipos_actividades = Actividad.objects.values_list("accion", flat=True).distinct()
 
-    # Paginación
-    paginator = Paginator(actividades, 10)  # 10 actividades por página
-    page = request.GET.get("page", 1)
-    actividades_paginadas = paginator.get_page(page)
+    # Paginación por clave (fechacreacion, idactividad)
+    paginator = KeysetPaginator(actividades, 10)  # 10 actividades por página
+    actividades_paginadas = paginator.get_page(request.GET.get("cursor"))
+
+    # Conteos históricos (desde el resumen diario si está habilitado)
+    total_actividades, usuarios_activos, tipos_actividades_count = (
+        estadisticas_actividad(limite_usuarios=15)
+    )
 
     estadisticas = {
-        "total_actividades": Actividad.objects.count(),
+        "total_actividades": total_actividades,
         "usuarios_activos": Usuario.objects.filter(is_active=True).count(),
         "alertas_activas": Alerta.objects.filter(activa=True).count(),
     }
 
-    # Obtener usuarios más activos (con más actividades)
-    usuarios_activos = Usuario.objects.annotate(
-        num_actividades=Count("actividad")
-    ).order_by("-num_actividades")[
-        :15
-    ]  # Mostrar los 15 usuarios más activos
-
+    # Usuarios más activos (los 15 con más actividades)
     datos_actividades_usuario = {
-        "labels": [usuario.nombreusuario for usuario in usuarios_activos],
-        "data": [usuario.num_actividades for usuario in usuarios_activos],
+        "labels": [usuario.nombreusuario for usuario, _ in usuarios_activos],
+        "data": [num_actividades for _, num_actividades in usuarios_activos],
     }
 
-    # Obtener todos los tipos de actividades para la gráfica
-    tipos_actividades_count = (
-        Actividad.objects.values("accion")
-        .annotate(total=Count("idactividad"))
-        .order_by("-total")
-    )
-
     # Preparar datos para la gráfica
     datos_tipos_actividades = {
         "labels": [tipo["accion"] for tipo in tipos_actividades_count],
@@ -96,23 +89,11 @@ def filtrar_actividades(request):
         filtro = request.GET.get("filtro", "")
         busqueda = request.GET.get("busqueda", "")
 
-        # Query base
-        actividades = Actividad.objects.all().order_by("-fechacreacion")
-
-        # Aplicar filtros
-        if filtro:
-            actividades = actividades.filter(accion=filtro)
-        if busqueda:
-            actividades = actividades.filter(
-                Q(idusuario__nombreusuario__icontains=busqueda)
-                | Q(descripcion__icontains=busqueda)
-                | Q(accion__icontains=busqueda)
-            )
+        actividades = _actividades_filtradas(filtro, busqueda)
 
-        # Paginación
-        paginator = Paginator(actividades, 10)  # 10 actividades por página
-        page = request.GET.get("page", 1)
-        actividades_paginadas = paginator.get_page(page)
+        # Paginación por clave
+        paginator = KeysetPaginator(actividades, 10)  # 10 actividades por página
+        actividades_paginadas = paginator.get_page(request.GET.get("cursor"))
 
         context = {
             "actividades": actividades_paginadas,
@@ -136,23 +117,19 @@ def lista_actividades(request):
     filtro = request.GET.get("filtro", "")
     busqueda = request.GET.get("busqueda", "")
 
-    # Query base
-    actividades = Actividad.objects.all().order_by("-fechacreacion")
-
-    # Aplicar filtros
-    if filtro:
-        actividades = actividades.filter(accion=filtro)
-    if busqueda:
-        actividades = actividades.filter(
-            Q(idusuario__nombreusuario__icontains=busqueda)
-            | Q(descripcion__icontains=busqueda)
-            | Q(accion__icontains=busqueda)
-        )
+    actividades = _actividades_filtradas(filtro, busqueda)
 
-    # Paginación
-    paginator = Paginator(actividades, 10)
-    page = request.GET.get("page", 1)
-    actividades_page = paginator.get_page(page)
+    # Paginación por clave; el total es estimado salvo que se pida ?count=exact
+    paginator = KeysetPaginator(
+        actividades, 10, estimar=request.GET.get("count") != "exact"
+    )
+    actividades_page = paginator.get_page(request.GET.get("cursor"))
+    total_count = paginator.count()
+    # Con un total estimado la página actual nunca debe quedar fuera de rango
+    total_pages = max(
+        paginator.num_pages(total_count),
+        actividades_page.number + actividades_page.has_next(),
+    )
 
     # Formatear actividades para JSON
     actividades_data = []
@@ -176,14 +153,46 @@ def lista_actividades(request):
         {
             "actividades": actividades_data,
             "current_page": actividades_page.number,
-            "total_pages": paginator.num_pages,
+            "total_pages": total_pages,
             "has_previous": actividades_page.has_previous(),
             "has_next": actividades_page.has_next(),
-            "total_count": paginator.count,
+            "next_cursor": actividades_page.next_cursor,
+            "previous_cursor": actividades_page.previous_cursor,
+            "total_count": total_count,
+            "total_count_is_estimate": paginator.estimar,
         }
     )
 
 
+@login_required
+def buscar_actividades(request):
+    """API de búsqueda en el registro de actividades ordenada por relevancia"""
+    texto = request.GET.get("q", "")
+    try:
+        limite = min(max(int(request.GET.get("limite", 20)), 1), 100)
+    except ValueError:
+        limite = 20
+
+    resultados = []
+    for actividad in buscar_por_relevancia(texto, limite=limite):
+        resultados.append(
+            {
+                "idactividad": actividad.idactividad,
+                "nombre": actividad.nombre,
+                "descripcion": actividad.descripcion,
+                "accion": actividad.accion,
+                "fechacreacion": actividad.fechacreacion.strftime("%Y-%m-%d %H:%M:%S"),
+                "relevancia": actividad.relevancia,
+                "idusuario": {
+                    "idusuario": actividad.idusuario.idusuario,
+                    "nombreusuario": actividad.idusuario.nombreusuario,
+                },
+            }
+        )
+
+    return JsonResponse({"q": texto, "resultados": resultados})
+
+
 def intentos_acceso(request):
     intentos = []  # Consulta los intentos desde la base de datos.
     return render(request, "intentos_acceso.html", {"intentos": intentos})
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dashboard"
+
+    def ready(self):
+        """Registrar las señales que mantienen el snapshot de KPIs"""
+        from . import signals  # noqa: F401
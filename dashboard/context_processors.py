@@ -1,4 +1,4 @@
-from dashboard.models import Notificacion
+from dashboard.notificaciones_badge import obtener_badge
 
 
 def notificaciones_usuario(request):
@@ -8,16 +8,9 @@ def notificaciones_usuario(request):
     context = {"notificaciones_no_leidas": 0, "user_notifications": []}
 
     if request.user.is_authenticated:
-        # Obtener el número de notificaciones no leídas
-        context["notificaciones_no_leidas"] = Notificacion.objects.filter(
-            idusuario=request.user, leido=False, archivada=False
-        ).count()
-
-        # Obtener las notificaciones recientes no leídas para el dropdown
-        context["user_notifications"] = Notificacion.objects.filter(
-            idusuario=request.user, leido=False, archivada=False
-        ).order_by("-fechacreacion")[
-            :5
-        ]  # Mostrar solo las 5 más recientes
+        # Contador y las 5 notificaciones más recientes, servidos desde caché
+        badge = obtener_badge(request.user.pk)
+        context["notificaciones_no_leidas"] = badge["no_leidas"]
+        context["user_notifications"] = badge["recientes"]
 
     return context
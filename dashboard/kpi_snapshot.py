@@ -0,0 +1,417 @@
+"""
+Mantenimiento de la tabla materializada de KPIs (dashboard_kpi_snapshot).
+
+Cada Proyecto y cada Tarea aporta una "contribución" (un vector de métricas) a
+una fila identificada por (entidad, equipo, mes, estado). Al guardar o eliminar
+se resta la contribución anterior y se suma la nueva con ``F()``, de modo que el
+panel de control puede leer O(equipos × meses × estados) filas en lugar de
+recorrer las tablas de hechos.
+
+La actualización incremental solo está activa con ``DASHBOARD_KPI_SNAPSHOT``;
+tras activarla hay que ejecutar ``python manage.py rebuild_kpi_snapshot``.
+Las operaciones masivas que no disparan señales (``QuerySet.update``,
+``bulk_create``) deben aplicar su cambio con ``registrar_altas_tareas`` o
+``registrar_cambio_tareas``, o reconstruir la tabla.
+"""
+
+import datetime
+import logging
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DateField,
+    F,
+    FloatField,
+    IntegerField,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Least, TruncMonth
+from django.utils import timezone
+
+from .models import KpiSnapshot, Proyecto, Tarea, Tarearecurso
+
+logger = logging.getLogger(__name__)
+
+ENTIDAD_PROYECTO = "proyecto"
+ENTIDAD_TAREA = "tarea"
+
+METRICAS = [
+    "cantidad",
+    "presupuesto",
+    "presupuestoutilizado",
+    "costoestimado",
+    "costoactual",
+    "completadas_a_tiempo",
+    "con_duracion",
+    "productividad_total",
+    "asignaciones",
+    "con_recursos",
+]
+
+CAMPOS_TAREA = [
+    "estado",
+    "fechamodificacion",
+    "fechafin",
+    "costoestimado",
+    "costoactual",
+    "duracionestimada",
+    "duracionactual",
+]
+
+CAMPOS_PROYECTO = [
+    "idequipo",
+    "estado",
+    "fechacreacion",
+    "presupuesto",
+    "presupuestoutilizado",
+]
+
+
+# Tarea completada a tiempo: única definición para el cálculo directo, la
+# reconstrucción y la actualización incremental, siempre evaluada en la base
+# de datos (la comparación de un datetime con la fecha ``fechafin`` depende de
+# la zona horaria de la conexión)
+COMPLETADA_A_TIEMPO = Q(estado="Completada", fechamodificacion__lte=F("fechafin"))
+
+
+def snapshot_habilitado():
+    """Indica si el snapshot de KPIs está activo para lectura y escritura"""
+    return getattr(settings, "DASHBOARD_KPI_SNAPSHOT", False)
+
+
+def mes_de(valor):
+    """Primer día del mes (en la zona horaria local) de una fecha o datetime"""
+    if valor is None:
+        return None
+    if isinstance(valor, datetime.datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        valor = valor.date()
+    return valor.replace(day=1)
+
+
+def contribucion_tarea(fila):
+    """Clave y vector de métricas que aporta una tarea al snapshot"""
+    clave = (
+        ENTIDAD_TAREA,
+        fila["equipo"],
+        mes_de(fila["fechamodificacion"]),
+        fila["estado"],
+    )
+    con_duracion = (
+        fila["duracionestimada"] is not None and fila["duracionactual"] is not None
+    )
+    productividad = 0.0
+    if con_duracion and fila["duracionactual"] > 0:
+        productividad = min(fila["duracionestimada"] / fila["duracionactual"], 1) * 100
+    asignaciones = fila.get("asignaciones") or 0
+    vector = {
+        "cantidad": 1,
+        "costoestimado": fila["costoestimado"] or Decimal("0"),
+        "costoactual": fila["costoactual"] or Decimal("0"),
+        "completadas_a_tiempo": fila["a_tiempo"],
+        "con_duracion": int(con_duracion),
+        "productividad_total": productividad,
+        "asignaciones": asignaciones,
+        "con_recursos": int(asignaciones > 0),
+    }
+    return clave, vector
+
+
+def contribucion_proyecto(fila):
+    """Clave y vector de métricas que aporta un proyecto al snapshot"""
+    clave = (
+        ENTIDAD_PROYECTO,
+        fila["idequipo"],
+        mes_de(fila["fechacreacion"]),
+        fila["estado"],
+    )
+    vector = {
+        "cantidad": 1,
+        "presupuesto": fila["presupuesto"] or Decimal("0"),
+        "presupuestoutilizado": fila["presupuestoutilizado"] or Decimal("0"),
+    }
+    return clave, vector
+
+
+def valores_tarea(idtarea):
+    """Lee de la base de datos los campos de una tarea que afectan al snapshot"""
+    filas = list(
+        Tarea.objects.filter(idtarea=idtarea)
+        .values(
+            *CAMPOS_TAREA,
+            equipo=F("idrequerimiento__idproyecto__idequipo"),
+            a_tiempo=Case(
+                When(COMPLETADA_A_TIEMPO, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+        .annotate(asignaciones=Count("tarearecurso"))
+        .order_by()[:1]
+    )
+    return filas[0] if filas else None
+
+
+def contribucion_tarea_actual(idtarea):
+    """Contribución de la tarea según la base de datos (``None`` si no existe)"""
+    valores = valores_tarea(idtarea)
+    return contribucion_tarea(valores) if valores else None
+
+
+def valores_proyecto(idproyecto):
+    """Lee de la base de datos los campos de un proyecto que afectan al snapshot"""
+    return (
+        Proyecto.objects.filter(idproyecto=idproyecto).values(*CAMPOS_PROYECTO).first()
+    )
+
+
+def aplicar_delta(clave, vector, signo=1):
+    """Suma (o resta con ``signo=-1``) un vector de métricas a la fila de la clave"""
+    if not vector:
+        return
+    entidad, idequipo, mes, estado = clave
+    actualizacion = {
+        campo: F(campo) + signo * valor for campo, valor in vector.items() if valor
+    }
+    if not actualizacion:
+        return
+    # Se actualiza una sola fila de la clave aunque existan duplicados
+    fila = KpiSnapshot.objects.filter(
+        entidad=entidad, idequipo=idequipo, mes=mes, estado=estado
+    ).values("idsnapshot")[:1]
+    actualizadas = KpiSnapshot.objects.filter(idsnapshot=Subquery(fila)).update(
+        **actualizacion
+    )
+    if not actualizadas:
+        KpiSnapshot.objects.create(
+            entidad=entidad,
+            idequipo=idequipo,
+            mes=mes,
+            estado=estado,
+            **{campo: signo * valor for campo, valor in vector.items()},
+        )
+
+
+def aplicar_cambio(anterior, nueva):
+    """
+    Aplica el delta entre dos contribuciones ``(clave, vector)``.
+
+    Si la clave no cambia se aplica la diferencia en una sola actualización.
+    """
+    if anterior and nueva and anterior[0] == nueva[0]:
+        clave = nueva[0]
+        campos = set(anterior[1]) | set(nueva[1])
+        diferencia = {
+            campo: nueva[1].get(campo, 0) - anterior[1].get(campo, 0)
+            for campo in campos
+        }
+        aplicar_delta(clave, diferencia)
+        return
+    if anterior:
+        aplicar_delta(*anterior, signo=-1)
+    if nueva:
+        aplicar_delta(*nueva)
+
+
+def registrar_altas_tareas(ids):
+    """
+    Suma al snapshot, al confirmarse la transacción, las tareas ``ids`` creadas
+    con ``bulk_create`` (que no dispara las señales de ``dashboard.signals``).
+    Aplica un delta por clave del snapshot, no por tarea.
+    """
+    if not snapshot_habilitado() or not ids:
+        return
+    ids = list(ids)
+
+    def _aplicar():
+        try:
+            with transaction.atomic():
+                for clave, vector in _agregados_tareas(
+                    Tarea.objects.filter(idtarea__in=ids)
+                ).items():
+                    aplicar_delta(clave, vector)
+        except Exception:
+            logger.exception(
+                f"Error al actualizar snapshot de KPIs ({len(ids)} tareas nuevas)"
+            )
+
+    transaction.on_commit(_aplicar)
+
+
+def registrar_cambio_tareas(ids):
+    """
+    Captura la contribución actual de las tareas ``ids`` y, al confirmarse la
+    transacción, aplica la diferencia con la nueva. Se llama dentro de la
+    transacción y antes de una operación masiva que cambia esas tareas o sus
+    asignaciones sin disparar señales.
+    """
+    if not snapshot_habilitado():
+        return
+    anteriores = {idtarea: contribucion_tarea_actual(idtarea) for idtarea in ids}
+
+    def _aplicar():
+        try:
+            with transaction.atomic():
+                for idtarea, anterior in anteriores.items():
+                    aplicar_cambio(anterior, contribucion_tarea_actual(idtarea))
+        except Exception:
+            logger.exception(
+                f"Error al actualizar snapshot de KPIs (tareas {list(anteriores)})"
+            )
+
+    transaction.on_commit(_aplicar)
+
+
+def mover_tareas_de_proyecto(idproyecto, equipo_anterior, equipo_nuevo):
+    """Traslada las contribuciones de las tareas de un proyecto que cambió de equipo"""
+    for clave, vector in _agregados_tareas(
+        Tarea.objects.filter(idrequerimiento__idproyecto=idproyecto)
+    ).items():
+        _, _, mes, estado = clave
+        aplicar_delta((ENTIDAD_TAREA, equipo_anterior, mes, estado), vector, signo=-1)
+        aplicar_delta((ENTIDAD_TAREA, equipo_nuevo, mes, estado), vector)
+
+
+def _agregados_tareas(tareas):
+    """Agrega un queryset de tareas por (equipo, mes, estado) con todas las métricas"""
+    con_duracion = Q(duracionestimada__isnull=False, duracionactual__isnull=False)
+    ratio_productividad = Least(
+        Cast("duracionestimada", FloatField()) / Cast("duracionactual", FloatField()),
+        Value(1.0),
+    )
+    mes = TruncMonth("fechamodificacion", output_field=DateField())
+    campo_equipo = F("idrequerimiento__idproyecto__idequipo")
+
+    filas = (
+        tareas.values(equipo=campo_equipo, mes=mes, estado_tarea=F("estado"))
+        .annotate(
+            cantidad=Count("idtarea"),
+            suma_costoestimado=Coalesce(Sum("costoestimado"), Value(Decimal("0"))),
+            suma_costoactual=Coalesce(Sum("costoactual"), Value(Decimal("0"))),
+            completadas_a_tiempo=Count("idtarea", filter=COMPLETADA_A_TIEMPO),
+            con_duracion=Count("idtarea", filter=con_duracion),
+            productividad_total=Coalesce(
+                Sum(
+                    Case(
+                        When(
+                            con_duracion & Q(duracionactual__gt=0),
+                            then=ratio_productividad * 100,
+                        ),
+                        default=Value(0.0),
+                        output_field=FloatField(),
+                    )
+                ),
+                Value(0.0),
+            ),
+        )
+        .order_by()
+    )
+    agregados = {}
+    for fila in filas:
+        clave = (ENTIDAD_TAREA, fila["equipo"], fila["mes"], fila["estado_tarea"])
+        agregados[clave] = {
+            "cantidad": fila["cantidad"],
+            "costoestimado": fila["suma_costoestimado"],
+            "costoactual": fila["suma_costoactual"],
+            "completadas_a_tiempo": fila["completadas_a_tiempo"],
+            "con_duracion": fila["con_duracion"],
+            "productividad_total": fila["productividad_total"],
+        }
+
+    asignaciones = (
+        Tarearecurso.objects.filter(idtarea__in=tareas.values("idtarea"))
+        .values(
+            equipo=F("idtarea__idrequerimiento__idproyecto__idequipo"),
+            mes=TruncMonth("idtarea__fechamodificacion", output_field=DateField()),
+            estado_tarea=F("idtarea__estado"),
+        )
+        .annotate(
+            asignaciones=Count("idtarearecurso"),
+            con_recursos=Count("idtarea", distinct=True),
+        )
+        .order_by()
+    )
+    for fila in asignaciones:
+        clave = (ENTIDAD_TAREA, fila["equipo"], fila["mes"], fila["estado_tarea"])
+        vector = agregados.setdefault(clave, {})
+        vector["asignaciones"] = fila["asignaciones"]
+        vector["con_recursos"] = fila["con_recursos"]
+
+    return agregados
+
+
+def _agregados_proyectos():
+    """Agrega todos los proyectos por (equipo, mes de creación, estado)"""
+    filas = (
+        Proyecto.objects.values(
+            "idequipo",
+            "estado",
+            mes=TruncMonth("fechacreacion", output_field=DateField()),
+        )
+        .annotate(
+            cantidad=Count("idproyecto"),
+            suma_presupuesto=Coalesce(Sum("presupuesto"), Value(Decimal("0"))),
+            suma_presupuestoutilizado=Coalesce(
+                Sum("presupuestoutilizado"), Value(Decimal("0"))
+            ),
+        )
+        .order_by()
+    )
+    return {
+        (ENTIDAD_PROYECTO, fila["idequipo"], fila["mes"], fila["estado"]): {
+            "cantidad": fila["cantidad"],
+            "presupuesto": fila["suma_presupuesto"],
+            "presupuestoutilizado": fila["suma_presupuestoutilizado"],
+        }
+        for fila in filas
+    }
+
+
+def reconstruir_snapshot():
+    """
+    Recalcula la tabla completa desde Proyecto, Tarea y Tarearecurso.
+
+    Devuelve el número de filas generadas.
+    """
+    agregados = _agregados_proyectos()
+    agregados.update(_agregados_tareas(Tarea.objects.all()))
+
+    filas = [
+        KpiSnapshot(
+            entidad=entidad, idequipo=idequipo, mes=mes, estado=estado, **vector
+        )
+        for (entidad, idequipo, mes, estado), vector in agregados.items()
+    ]
+    with transaction.atomic():
+        # Un solo DELETE: sin cargar las filas ni pasar por las señales
+        KpiSnapshot.objects.all()._raw_delete(KpiSnapshot.objects.db)
+        KpiSnapshot.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def leer_snapshot():
+    """Devuelve todas las filas del snapshot sumadas por clave como diccionarios"""
+    filas = (
+        KpiSnapshot.objects.values("entidad", "idequipo", "mes", "estado")
+        .annotate(**{f"suma_{campo}": Sum(campo) for campo in METRICAS})
+        .order_by()
+    )
+    return [
+        {
+            "entidad": fila["entidad"],
+            "idequipo": fila["idequipo"],
+            "mes": fila["mes"],
+            "estado": fila["estado"],
+            **{campo: fila[f"suma_{campo}"] or 0 for campo in METRICAS},
+        }
+        for fila in filas
+    ]
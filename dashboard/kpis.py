@@ -0,0 +1,640 @@
+"""
+Motor de indicadores (KPIs) del panel de control.
+
+Calcula todas las tarjetas y conjuntos de datos de gráficos del dashboard con un
+número fijo de consultas de agregación condicional (``Count(filter=Q(...))`` y
+``GROUP BY``), de modo que el número de consultas por render no depende de la
+cantidad de equipos, estados o tipos de recurso.
+"""
+
+import datetime
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Least, TruncMonth
+from django.utils import timezone
+
+from .kpi_snapshot import (
+    COMPLETADA_A_TIEMPO,
+    ENTIDAD_PROYECTO,
+    leer_snapshot,
+    snapshot_habilitado,
+)
+from .models import (
+    Equipo,
+    Proyecto,
+    Recurso,
+    Tarea,
+    Tarearecurso,
+    Tiporecurso,
+    Usuario,
+)
+
+ESTADOS_PROYECTO = [
+    "Inicio",
+    "Planificación",
+    "Ejecución",
+    "Monitoreo-Control",
+    "Cierre",
+]
+
+ESTADOS_TAREA = ["Pendiente", "En Progreso", "Completada", "Atrasada", "Bloqueada"]
+
+PRIORIDADES_TAREA = range(1, 4)
+
+ESTADOS_COLORES = {
+    "Inicio": "rgba(255, 206, 86, 0.8)",  # Amarillo
+    "Planificación": "rgba(54, 162, 235, 0.8)",  # Azul
+    "Ejecución": "rgba(75, 192, 192, 0.8)",  # Verde claro
+    "Monitoreo-Control": "rgba(153, 102, 255, 0.8)",  # Púrpura
+    "Cierre": "rgba(255, 99, 132, 0.8)",  # Rojo
+}
+
+COLORES_EQUIPO_BG = [
+    "rgba(59, 130, 246, 0.2)",  # Azul
+    "rgba(16, 185, 129, 0.2)",  # Verde
+    "rgba(245, 158, 11, 0.2)",  # Amarillo
+    "rgba(139, 92, 246, 0.2)",  # Morado
+    "rgba(236, 72, 153, 0.2)",  # Rosa
+]
+
+COLORES_EQUIPO_BORDE = [
+    "#3b82f6",  # Azul
+    "#10b981",  # Verde
+    "#f59e0b",  # Amarillo
+    "#8b5cf6",  # Morado
+    "#ec4899",  # Rosa
+]
+
+METRICAS_RENDIMIENTO = [
+    "Efectividad",
+    "Puntualidad",
+    "Calidad",
+    "Productividad",
+    "Colaboración",
+]
+
+DECIMAL_FIELD = DecimalField(max_digits=15, decimal_places=2)
+
+
+@dataclass
+class DashboardSnapshot:
+    """Instantánea tipada de todos los KPIs que muestra el panel de control"""
+
+    stats: dict = field(default_factory=dict)
+    estado_proyectos: dict = field(default_factory=dict)
+    estado_tareas: dict = field(default_factory=dict)
+    prioridad_tareas: dict = field(default_factory=dict)
+    proyectos_equipo_datos: dict = field(default_factory=dict)
+    tareas_completadas_data: list = field(default_factory=list)
+    usuarios_por_tipo: dict = field(default_factory=dict)
+    equipos_rendimiento_datos: dict = field(default_factory=dict)
+    presupuesto_global_datos: list = field(default_factory=list)
+    gastos_por_categoria: dict = field(default_factory=dict)
+    gastos_mensuales_actuales: list = field(default_factory=list)
+    gastos_mensuales_estimados: list = field(default_factory=list)
+
+    def as_context(self):
+        """Devuelve el contexto de plantilla con los datasets serializados a JSON"""
+        return {
+            "stats": self.stats,
+            "estado_proyectos": json.dumps(self.estado_proyectos),
+            "estado_tareas": json.dumps(self.estado_tareas),
+            "prioridad_tareas": json.dumps(self.prioridad_tareas),
+            "proyectos_equipo_datos": json.dumps(self.proyectos_equipo_datos),
+            "tareas_completadas_data": json.dumps(self.tareas_completadas_data),
+            "usuarios_por_tipo": json.dumps(self.usuarios_por_tipo),
+            "equipos_rendimiento_datos": json.dumps(self.equipos_rendimiento_datos),
+            "presupuesto_global_datos": json.dumps(self.presupuesto_global_datos),
+            "gastos_por_categoria": json.dumps(self.gastos_por_categoria),
+            "gastos_mensuales_actuales": json.dumps(self.gastos_mensuales_actuales),
+            "gastos_mensuales_estimados": json.dumps(self.gastos_mensuales_estimados),
+        }
+
+
+def _rango_meses(hoy):
+    """Devuelve el primer día del mes anterior, actual y siguiente (aware)"""
+    primer_dia_mes_actual = timezone.make_aware(
+        datetime.datetime(hoy.year, hoy.month, 1)
+    )
+    if hoy.month == 1:
+        primer_dia_mes_anterior = timezone.make_aware(
+            datetime.datetime(hoy.year - 1, 12, 1)
+        )
+    else:
+        primer_dia_mes_anterior = timezone.make_aware(
+            datetime.datetime(hoy.year, hoy.month - 1, 1)
+        )
+    if hoy.month == 12:
+        primer_dia_mes_siguiente = timezone.make_aware(
+            datetime.datetime(hoy.year + 1, 1, 1)
+        )
+    else:
+        primer_dia_mes_siguiente = timezone.make_aware(
+            datetime.datetime(hoy.year, hoy.month + 1, 1)
+        )
+    return primer_dia_mes_anterior, primer_dia_mes_actual, primer_dia_mes_siguiente
+
+
+def _porcentaje(parte, total):
+    if not total:
+        return 0
+    return min(int((parte / total) * 100), 100)
+
+
+def _serie_mensual(filas, clave):
+    """Convierte filas agrupadas por ``mes`` en una lista de 12 valores (Ene-Dic)"""
+    por_mes = {fila["mes"].month: fila[clave] for fila in filas if fila["mes"]}
+    return [por_mes.get(mes, 0) for mes in range(1, 13)]
+
+
+def _agregados_proyectos(hoy):
+    """Presupuesto, tendencia mensual y proyectos por estado en una sola consulta"""
+    mes_anterior, mes_actual, mes_siguiente = _rango_meses(hoy)
+    agregados = {
+        "utilizado": Coalesce(
+            Sum("presupuestoutilizado", output_field=DECIMAL_FIELD),
+            Value(Decimal("0"), output_field=DECIMAL_FIELD),
+        ),
+        "total": Coalesce(
+            Sum("presupuesto", output_field=DECIMAL_FIELD),
+            Value(Decimal("1"), output_field=DECIMAL_FIELD),
+        ),
+        "mes_actual": Count(
+            "idproyecto",
+            filter=Q(fechacreacion__gte=mes_actual, fechacreacion__lt=mes_siguiente),
+        ),
+        "mes_anterior": Count(
+            "idproyecto",
+            filter=Q(fechacreacion__gte=mes_anterior, fechacreacion__lt=mes_actual),
+        ),
+    }
+    for i, estado in enumerate(ESTADOS_PROYECTO):
+        agregados[f"estado_{i}"] = Count("idproyecto", filter=Q(estado=estado))
+    return Proyecto.objects.aggregate(**agregados)
+
+
+def _agregados_tareas(incluir_estados=True):
+    """Tareas por estado, por prioridad y vencidas en una sola consulta"""
+    agregados = {
+        "vencidas": Count(
+            "idtarea",
+            filter=Q(
+                fechafin__lt=datetime.date.today(),
+                estado__in=["Pendiente", "En Progreso"],
+            ),
+        ),
+    }
+    if incluir_estados:
+        for i, estado in enumerate(ESTADOS_TAREA):
+            agregados[f"estado_{i}"] = Count("idtarea", filter=Q(estado=estado))
+    for prioridad in PRIORIDADES_TAREA:
+        agregados[f"prioridad_{prioridad}"] = Count(
+            "idtarea", filter=Q(prioridad=prioridad)
+        )
+    return Tarea.objects.aggregate(**agregados)
+
+
+def _proyectos_por_equipo_estado():
+    """Conteo de proyectos agrupado por (equipo, estado)"""
+    conteos = {}
+    filas = (
+        Proyecto.objects.filter(idequipo__isnull=False)
+        .values("idequipo", "estado")
+        .annotate(total=Count("idproyecto"))
+        .order_by()
+    )
+    for fila in filas:
+        conteos[(fila["idequipo"], fila["estado"])] = fila["total"]
+    return conteos
+
+
+def _usuarios_por_tipo():
+    """Distribución de usuarios por rol usando los OneToOne inversos de Usuario"""
+    conteos = Usuario.objects.aggregate(
+        desarrolladores=Count("desarrollador"),
+        testers=Count("tester"),
+        administradores=Count("administrador"),
+        clientes=Count("cliente"),
+        jefes=Count("jefeproyecto"),
+    )
+    return {
+        "Desarrolladores": conteos["desarrolladores"],
+        "Testers": conteos["testers"],
+        "Administradores": conteos["administradores"],
+        "Clientes": conteos["clientes"],
+        "Jefes de proyecto": conteos["jefes"],
+    }
+
+
+def _equipos_top(proyectos_equipo):
+    """Los 5 equipos con más miembros, descartando los que no tienen proyectos"""
+    equipos_top = list(
+        Equipo.objects.annotate(num_miembros=Count("miembro"))
+        .order_by("-num_miembros")
+        .values("idequipo", "nombreequipo")[:5]
+    )
+    equipos_con_proyectos = {idequipo for idequipo, _ in proyectos_equipo}
+    return [e for e in equipos_top if e["idequipo"] in equipos_con_proyectos]
+
+
+def _metricas_equipos(ids):
+    """
+    Métricas de tareas y de asignación de recursos por equipo.
+
+    Usa una consulta agrupada sobre tareas y otra sobre asignaciones de recursos
+    para todos los equipos a la vez, en lugar de varias consultas por equipo.
+    """
+    if not ids:
+        return {}, {}
+
+    campo_equipo = F("idrequerimiento__idproyecto__idequipo")
+    con_duracion = Q(duracionestimada__isnull=False, duracionactual__isnull=False)
+    ratio_productividad = Least(
+        Cast("duracionestimada", FloatField()) / Cast("duracionactual", FloatField()),
+        Value(1.0),
+    )
+    metricas_tareas = {
+        fila["equipo"]: fila
+        for fila in Tarea.objects.filter(idrequerimiento__idproyecto__idequipo__in=ids)
+        .values(equipo=campo_equipo)
+        .annotate(
+            total=Count("idtarea"),
+            completadas=Count("idtarea", filter=Q(estado="Completada")),
+            a_tiempo=Count("idtarea", filter=COMPLETADA_A_TIEMPO),
+            problemas=Count("idtarea", filter=Q(estado__in=["Bloqueada", "Atrasada"])),
+            con_duracion=Count("idtarea", filter=con_duracion),
+            productividad_total=Coalesce(
+                Sum(
+                    Case(
+                        When(
+                            con_duracion & Q(duracionactual__gt=0),
+                            then=ratio_productividad * 100,
+                        ),
+                        default=Value(0.0),
+                        output_field=FloatField(),
+                    )
+                ),
+                Value(0.0),
+            ),
+        )
+        .order_by()
+    }
+
+    metricas_recursos = {
+        fila["equipo"]: fila
+        for fila in Tarearecurso.objects.filter(
+            idtarea__idrequerimiento__idproyecto__idequipo__in=ids
+        )
+        .values(equipo=F("idtarea__idrequerimiento__idproyecto__idequipo"))
+        .annotate(
+            asignaciones=Count("idrecurso"),
+            tareas=Count("idtarea", distinct=True),
+        )
+        .order_by()
+    }
+
+    return metricas_tareas, metricas_recursos
+
+
+def _rendimiento_equipos(equipos_top, metricas_tareas, metricas_recursos):
+    """Dataset del gráfico radar de rendimiento a partir de las métricas por equipo"""
+    datos = {"labels": METRICAS_RENDIMIENTO, "datasets": []}
+
+    for i, equipo in enumerate(equipos_top):
+        tareas = metricas_tareas.get(equipo["idequipo"], {})
+        total = tareas.get("total", 0)
+        completadas = tareas.get("completadas", 0)
+
+        efectividad = _porcentaje(completadas, total)
+        puntualidad = _porcentaje(tareas.get("a_tiempo", 0), completadas)
+        calidad = max(_porcentaje(total - tareas.get("problemas", 0), total), 0)
+
+        if tareas.get("con_duracion"):
+            productividad = int(tareas["productividad_total"] / tareas["con_duracion"])
+        else:
+            productividad = 0
+
+        # Convertimos a escala 0-100, donde 3 recursos por tarea es óptimo (100%)
+        recursos = metricas_recursos.get(equipo["idequipo"])
+        if recursos and recursos["tareas"]:
+            recursos_por_tarea = recursos["asignaciones"] / recursos["tareas"]
+            colaboracion = min(int(100 - abs(3 - recursos_por_tarea) * 15), 100)
+        else:
+            colaboracion = 0
+
+        color_borde = COLORES_EQUIPO_BORDE[i % len(COLORES_EQUIPO_BORDE)]
+        datos["datasets"].append(
+            {
+                "label": equipo["nombreequipo"],
+                "data": [
+                    efectividad,
+                    puntualidad,
+                    calidad,
+                    productividad,
+                    colaboracion,
+                ],
+                "backgroundColor": COLORES_EQUIPO_BG[i % len(COLORES_EQUIPO_BG)],
+                "borderColor": color_borde,
+                "borderWidth": 2,
+                "pointBackgroundColor": color_borde,
+            }
+        )
+
+    return datos
+
+
+def _gastos_por_categoria():
+    """
+    Gasto por tipo de recurso: suma de costos de las tareas (distintas) que usan
+    algún recurso del tipo. Si no hay costos reales se usan los estimados.
+    """
+
+    def suma_costos(campo):
+        tareas_tipo = Tarea.objects.filter(
+            idtarea__in=Tarearecurso.objects.filter(
+                idrecurso__idtiporecurso=OuterRef(OuterRef("idtiporecurso"))
+            ).values("idtarea")
+        )
+        return Coalesce(
+            Subquery(
+                tareas_tipo.order_by()
+                .annotate(grupo=Value(1))
+                .values("grupo")
+                .annotate(total=Sum(campo))
+                .values("total")[:1],
+                output_field=DECIMAL_FIELD,
+            ),
+            Value(Decimal("0"), output_field=DECIMAL_FIELD),
+        )
+
+    gastos = {}
+    tipos = Tiporecurso.objects.annotate(
+        gasto_actual=suma_costos("costoactual"),
+        gasto_estimado=suma_costos("costoestimado"),
+    ).values("nametiporecurso", "gasto_actual", "gasto_estimado")
+    for tipo in tipos:
+        gasto_total = tipo["gasto_actual"] or tipo["gasto_estimado"]
+        if gasto_total > 0:
+            gastos[tipo["nametiporecurso"]] = float(gasto_total)
+    return gastos
+
+
+def _fuente_en_vivo(hoy):
+    """Agregados calculados directamente sobre Proyecto y Tarea"""
+    doce_meses_atras = hoy - datetime.timedelta(days=365)
+    proyectos_equipo = _proyectos_por_equipo_estado()
+    equipos_top = _equipos_top(proyectos_equipo)
+    metricas_tareas, metricas_recursos = _metricas_equipos(
+        [e["idequipo"] for e in equipos_top]
+    )
+
+    tareas_completadas_mes = (
+        Tarea.objects.filter(
+            estado="Completada", fechamodificacion__gte=doce_meses_atras
+        )
+        .annotate(mes=TruncMonth("fechamodificacion"))
+        .values("mes")
+        .annotate(total=Count("idtarea"))
+        .order_by("mes")
+    )
+
+    gastos_mensuales = list(
+        Tarea.objects.filter(fechamodificacion__gte=doce_meses_atras)
+        .annotate(mes=TruncMonth("fechamodificacion"))
+        .values("mes")
+        .annotate(
+            total_actual=Coalesce(
+                Sum("costoactual", output_field=DECIMAL_FIELD),
+                Value(0, output_field=DECIMAL_FIELD),
+            ),
+            total_estimado=Coalesce(
+                Sum("costoestimado", output_field=DECIMAL_FIELD),
+                Value(0, output_field=DECIMAL_FIELD),
+            ),
+        )
+        .order_by("mes")
+    )
+
+    return {
+        "proyectos": _agregados_proyectos(hoy),
+        "tareas": _agregados_tareas(),
+        "proyectos_equipo": proyectos_equipo,
+        "equipos_top": equipos_top,
+        "metricas_tareas": metricas_tareas,
+        "metricas_recursos": metricas_recursos,
+        "tareas_completadas_mes": list(tareas_completadas_mes),
+        "gastos_mensuales": gastos_mensuales,
+    }
+
+
+def _fuente_snapshot(hoy):
+    """
+    Los mismos agregados que _fuente_en_vivo, leídos de dashboard_kpi_snapshot.
+
+    Solo las métricas que dependen de la fecha actual (tareas vencidas) y la
+    distribución por prioridad se consultan sobre Tarea.
+    """
+    mes_actual = hoy.replace(day=1)
+    mes_anterior = (mes_actual - datetime.timedelta(days=1)).replace(day=1)
+    primer_mes_grafico = mes_actual
+    for _ in range(11):
+        primer_mes_grafico = (primer_mes_grafico - datetime.timedelta(days=1)).replace(
+            day=1
+        )
+
+    proyectos = {
+        "utilizado": Decimal("0"),
+        "total": Decimal("0"),
+        "mes_actual": 0,
+        "mes_anterior": 0,
+        **{f"estado_{i}": 0 for i in range(len(ESTADOS_PROYECTO))},
+    }
+    tareas = _agregados_tareas(incluir_estados=False)
+    tareas.update({f"estado_{i}": 0 for i in range(len(ESTADOS_TAREA))})
+    proyectos_equipo = {}
+    metricas_tareas = {}
+    metricas_recursos = {}
+    completadas_mes = {}
+    gastos_mes = {}
+
+    for fila in leer_snapshot():
+        cantidad = fila["cantidad"]
+        estado = fila["estado"]
+        idequipo = fila["idequipo"]
+        mes = fila["mes"]
+
+        if fila["entidad"] == ENTIDAD_PROYECTO:
+            proyectos["utilizado"] += fila["presupuestoutilizado"]
+            proyectos["total"] += fila["presupuesto"]
+            if mes == mes_actual:
+                proyectos["mes_actual"] += cantidad
+            elif mes == mes_anterior:
+                proyectos["mes_anterior"] += cantidad
+            if estado in ESTADOS_PROYECTO:
+                proyectos[f"estado_{ESTADOS_PROYECTO.index(estado)}"] += cantidad
+            if idequipo is not None and cantidad:
+                clave = (idequipo, estado)
+                proyectos_equipo[clave] = proyectos_equipo.get(clave, 0) + cantidad
+            continue
+
+        if estado in ESTADOS_TAREA:
+            tareas[f"estado_{ESTADOS_TAREA.index(estado)}"] += cantidad
+
+        if mes and mes >= primer_mes_grafico:
+            gastos = gastos_mes.setdefault(
+                mes, {"mes": mes, "total_actual": 0, "total_estimado": 0}
+            )
+            gastos["total_actual"] += fila["costoactual"]
+            gastos["total_estimado"] += fila["costoestimado"]
+            if estado == "Completada":
+                completadas_mes[mes] = completadas_mes.get(mes, 0) + cantidad
+
+        if idequipo is not None:
+            metricas = metricas_tareas.setdefault(
+                idequipo,
+                {
+                    "total": 0,
+                    "completadas": 0,
+                    "a_tiempo": 0,
+                    "problemas": 0,
+                    "con_duracion": 0,
+                    "productividad_total": 0.0,
+                },
+            )
+            metricas["total"] += cantidad
+            metricas["a_tiempo"] += fila["completadas_a_tiempo"]
+            metricas["con_duracion"] += fila["con_duracion"]
+            metricas["productividad_total"] += fila["productividad_total"]
+            if estado == "Completada":
+                metricas["completadas"] += cantidad
+            elif estado in ["Bloqueada", "Atrasada"]:
+                metricas["problemas"] += cantidad
+
+            recursos = metricas_recursos.setdefault(
+                idequipo, {"asignaciones": 0, "tareas": 0}
+            )
+            recursos["asignaciones"] += fila["asignaciones"]
+            recursos["tareas"] += fila["con_recursos"]
+
+    if not proyectos["total"]:
+        proyectos["total"] = Decimal("1")
+
+    return {
+        "proyectos": proyectos,
+        "tareas": tareas,
+        "proyectos_equipo": proyectos_equipo,
+        "equipos_top": _equipos_top(proyectos_equipo),
+        "metricas_tareas": metricas_tareas,
+        "metricas_recursos": metricas_recursos,
+        "tareas_completadas_mes": [
+            {"mes": mes, "total": total}
+            for mes, total in sorted(completadas_mes.items())
+        ],
+        "gastos_mensuales": [gastos_mes[mes] for mes in sorted(gastos_mes)],
+    }
+
+
+def calcular_kpis_dashboard():
+    """
+    Calcula todos los KPIs del panel de control y devuelve un DashboardSnapshot.
+
+    El número de consultas es constante: no crece con el número de equipos,
+    estados de proyecto/tarea ni tipos de recurso. Con DASHBOARD_KPI_SNAPSHOT
+    activo, los agregados se leen de la tabla materializada dashboard_kpi_snapshot.
+    """
+    hoy = timezone.now().date()
+
+    if snapshot_habilitado():
+        fuente = _fuente_snapshot(timezone.localdate())
+    else:
+        fuente = _fuente_en_vivo(hoy)
+
+    proyectos = fuente["proyectos"]
+    tareas = fuente["tareas"]
+    proyectos_equipo = fuente["proyectos_equipo"]
+
+    presupuesto_utilizado = float(proyectos["utilizado"])
+    presupuesto_total = float(proyectos["total"])
+    if presupuesto_total > 0:
+        porcentaje_utilizado = int((presupuesto_utilizado / presupuesto_total) * 100)
+    else:
+        porcentaje_utilizado = 0
+
+    equipos = list(
+        Equipo.objects.order_by("idequipo").values("idequipo", "nombreequipo")
+    )
+
+    stats = {
+        "proyectos_activos": proyectos[f"estado_{ESTADOS_PROYECTO.index('Ejecución')}"],
+        "proyectos_tendencia": proyectos["mes_actual"] - proyectos["mes_anterior"],
+        "tareas_pendientes": tareas[f"estado_{ESTADOS_TAREA.index('Pendiente')}"],
+        "tareas_vencidas": tareas["vencidas"],
+        "presupuesto_utilizado_porcentaje": porcentaje_utilizado,
+        "total_equipos": len(equipos),
+        "total_recursos": Recurso.objects.count(),
+    }
+
+    # Proyectos por equipo y estado (gráfico de barras apiladas)
+    proyectos_equipo_datos = {
+        "labels": [e["nombreequipo"] for e in equipos],
+        "datasets": [
+            {
+                "label": f"Proyectos en {estado}",
+                "data": [
+                    proyectos_equipo.get((e["idequipo"], estado), 0) for e in equipos
+                ],
+                "backgroundColor": ESTADOS_COLORES.get(estado),
+            }
+            for estado in ESTADOS_PROYECTO
+        ],
+    }
+
+    gastos_mensuales = fuente["gastos_mensuales"]
+
+    return DashboardSnapshot(
+        stats=stats,
+        estado_proyectos={
+            estado: proyectos[f"estado_{i}"]
+            for i, estado in enumerate(ESTADOS_PROYECTO)
+        },
+        estado_tareas={
+            estado: tareas[f"estado_{i}"] for i, estado in enumerate(ESTADOS_TAREA)
+        },
+        prioridad_tareas={
+            f"Prioridad {prioridad}": tareas[f"prioridad_{prioridad}"]
+            for prioridad in PRIORIDADES_TAREA
+        },
+        proyectos_equipo_datos=proyectos_equipo_datos,
+        tareas_completadas_data=_serie_mensual(
+            fuente["tareas_completadas_mes"], "total"
+        ),
+        usuarios_por_tipo=_usuarios_por_tipo(),
+        equipos_rendimiento_datos=_rendimiento_equipos(
+            fuente["equipos_top"],
+            fuente["metricas_tareas"],
+            fuente["metricas_recursos"],
+        ),
+        presupuesto_global_datos=[porcentaje_utilizado, 100 - porcentaje_utilizado],
+        gastos_por_categoria=_gastos_por_categoria(),
+        gastos_mensuales_actuales=[
+            float(v) for v in _serie_mensual(gastos_mensuales, "total_actual")
+        ],
+        gastos_mensuales_estimados=[
+            float(v) for v in _serie_mensual(gastos_mensuales, "total_estimado")
+        ],
+    )
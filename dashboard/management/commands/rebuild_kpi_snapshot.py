@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.kpi_snapshot import reconstruir_snapshot, snapshot_habilitado
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye desde cero la tabla dashboard_kpi_snapshot a partir de "
+        "Proyecto, Tarea y Tarearecurso"
+    )
+
+    def handle(self, *args, **options):
+        if not snapshot_habilitado():
+            self.stdout.write(
+                self.style.WARNING(
+                    "DASHBOARD_KPI_SNAPSHOT está desactivado: la tabla se reconstruirá "
+                    "pero no se mantendrá actualizada ni se usará en el dashboard"
+                )
+            )
+
+        filas = reconstruir_snapshot()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Snapshot de KPIs reconstruido: {filas} filas")
+        )
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0007_usuario_notif_email_usuario_notif_sistema_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KpiSnapshot",
+            fields=[
+                ("idsnapshot", models.AutoField(primary_key=True, serialize=False)),
+                ("entidad", models.CharField(max_length=20)),
+                ("idequipo", models.IntegerField(blank=True, null=True)),
+                ("mes", models.DateField(blank=True, null=True)),
+                ("estado", models.CharField(blank=True, max_length=50, null=True)),
+                ("cantidad", models.IntegerField(default=0)),
+                (
+                    "presupuesto",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=15),
+                ),
+                (
+                    "presupuestoutilizado",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=15),
+                ),
+                (
+                    "costoestimado",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=15),
+                ),
+                (
+                    "costoactual",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=15),
+                ),
+                ("completadas_a_tiempo", models.IntegerField(default=0)),
+                ("con_duracion", models.IntegerField(default=0)),
+                ("productividad_total", models.FloatField(default=0.0)),
+                ("asignaciones", models.IntegerField(default=0)),
+                ("con_recursos", models.IntegerField(default=0)),
+                ("fechamodificacion", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "dashboard_kpi_snapshot",
+                "managed": True,
+                "indexes": [
+                    models.Index(
+                        fields=["entidad", "idequipo", "mes", "estado"],
+                        name="kpi_snapshot_clave_idx",
+                    )
+                ],
+            },
+        ),
+    ]
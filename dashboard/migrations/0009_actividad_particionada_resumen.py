@@ -0,0 +1,49 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0008_kpisnapshot"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="detalleactividad",
+            name="idactividad",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="dashboard.actividad",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ActividadResumenDiario",
+            fields=[
+                ("idresumen", models.AutoField(primary_key=True, serialize=False)),
+                ("fecha", models.DateField()),
+                ("accion", models.CharField(max_length=255)),
+                ("cantidad", models.IntegerField(default=0)),
+                (
+                    "idusuario",
+                    models.ForeignKey(
+                        blank=True,
+                        db_column="idusuario",
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "actividad_resumen_diario",
+                "managed": True,
+                "unique_together": {("fecha", "idusuario", "accion")},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0009_actividad_particionada_resumen"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="actividad",
+            index=models.Index(
+                fields=["fechacreacion", "idactividad"], name="actividad_fecha_id_idx"
+            ),
+        ),
+    ]
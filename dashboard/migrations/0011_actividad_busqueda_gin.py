@@ -0,0 +1,39 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+INDICE = GinIndex(
+    SearchVector("nombre", "descripcion", "accion", config="spanish"),
+    name="actividad_busqueda_gin",
+)
+
+
+def crear_indice(apps, schema_editor):
+    # Los índices GIN sobre tsvector solo existen en PostgreSQL
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.add_index(apps.get_model("dashboard", "Actividad"), INDICE)
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("dashboard", "Actividad"), INDICE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0010_actividad_fecha_id_idx"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="actividad", index=INDICE),
+            ],
+            database_operations=[
+                migrations.RunPython(crear_indice, eliminar_indice),
+            ],
+        ),
+    ]
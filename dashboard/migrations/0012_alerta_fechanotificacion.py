@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:26
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+
+def marcar_alertas_existentes(apps, schema_editor):
+    # Las alertas anteriores ya se notificaron con el recorrido por ventana de
+    # tiempo; no deben volver a notificarse como pendientes
+    Alerta = apps.get_model("dashboard", "Alerta")
+    Alerta.objects.filter(fechanotificacion__isnull=True).update(
+        fechanotificacion=Coalesce("fechacreacion", Now())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0011_actividad_busqueda_gin"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="alerta",
+            name="fechanotificacion",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(marcar_alertas_existentes, migrations.RunPython.noop),
+    ]
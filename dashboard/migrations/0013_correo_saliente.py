@@ -0,0 +1,55 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0012_alerta_fechanotificacion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CorreoSaliente",
+            fields=[
+                ("idcorreo", models.AutoField(primary_key=True, serialize=False)),
+                ("asunto", models.CharField(max_length=255)),
+                ("cuerpo", models.TextField()),
+                ("cuerpo_html", models.TextField(blank=True, null=True)),
+                ("remitente", models.CharField(blank=True, max_length=255, null=True)),
+                ("destinatarios", models.JSONField(default=list)),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "Pendiente"),
+                            ("enviado", "Enviado"),
+                            ("fallido", "Fallido"),
+                        ],
+                        default="pendiente",
+                        max_length=20,
+                    ),
+                ),
+                ("intentos", models.IntegerField(default=0)),
+                (
+                    "siguiente_intento",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("ultimo_error", models.TextField(blank=True, null=True)),
+                ("fechacreacion", models.DateTimeField(auto_now_add=True)),
+                ("fechaenvio", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "correo_saliente",
+                "managed": True,
+                "indexes": [
+                    models.Index(
+                        fields=["estado", "siguiente_intento"],
+                        name="correo_pendiente_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0013_correo_saliente"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tarea",
+            index=models.Index(
+                fields=["fechacreacion", "idtarea"], name="tarea_fecha_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0014_tarea_fecha_id_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="correosaliente",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("pendiente", "Pendiente"),
+                    ("enviando", "Enviando"),
+                    ("enviado", "Enviado"),
+                    ("fallido", "Fallido"),
+                ],
+                default="pendiente",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -7,7 +7,42 @@
 # Feel free to rename the models, but don't rename db_table values or field names.
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import UserManager as BaseUserManager
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
 from django.db import models
+from django.utils import timezone
+
+from auditoria.querysets import AuditedManager
+
+
+class SnapshotAuditoriaMixin:
+    """
+    Guarda los valores de los campos tal como se leyeron de la base de datos.
+
+    La auditoría compara contra ``_valores_originales`` para detectar cambios
+    sin volver a consultar la fila antes de cada ``save()``.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._capturar_valores_originales()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._capturar_valores_originales(fields)
+
+    def _capturar_valores_originales(self, campos=None):
+        """Toma los valores actuales de los campos cargados (o solo de ``campos``)"""
+        originales = getattr(self, "_valores_originales", None) or {}
+        for field in self._meta.concrete_fields:
+            if campos is not None and not {field.name, field.attname} & set(campos):
+                continue
+            # Los campos diferidos no están en __dict__ y no se cargan aquí
+            if field.attname in self.__dict__:
+                originales[field.attname] = self.__dict__[field.attname]
+        self._valores_originales = originales
 
 
 class Actividad(models.Model):
@@ -33,13 +68,29 @@ class Actividad(models.Model):
     class Meta:
         managed = True
         db_table = "actividad"
+        indexes = [
+            # Paginación por clave del registro de actividades
+            models.Index(
+                fields=["fechacreacion", "idactividad"], name="actividad_fecha_id_idx"
+            ),
+            # Búsqueda de texto completo (solo PostgreSQL, ver auditoria/busqueda.py)
+            GinIndex(
+                SearchVector("nombre", "descripcion", "accion", config="spanish"),
+                name="actividad_busqueda_gin",
+            ),
+        ]
 
 
 class DetalleActividad(models.Model):
     """Almacena cambios detallados de cada campo modificado"""
 
     iddetalle = models.AutoField(primary_key=True)
-    idactividad = models.ForeignKey(Actividad, on_delete=models.CASCADE)
+    # Sin restricción en la base de datos: "actividad" puede estar particionada
+    # por fecha (ver auditoria/particiones.py) y PostgreSQL no admite claves
+    # foráneas hacia una clave única que no incluya la columna de partición.
+    idactividad = models.ForeignKey(
+        Actividad, on_delete=models.CASCADE, db_constraint=False
+    )
     nombre_campo = models.CharField(max_length=100)
     valor_anterior = models.TextField(blank=True, null=True)
     valor_nuevo = models.TextField(blank=True, null=True)
@@ -96,13 +147,17 @@ class Administrador(models.Model):
         db_table = "administrador"
 
 
-class Alerta(models.Model):
+class Alerta(SnapshotAuditoriaMixin, models.Model):
     idalerta = models.AutoField(primary_key=True)
     idtarea = models.ForeignKey("Tarea", models.DO_NOTHING, db_column="idtarea")
     tipoalerta = models.CharField(max_length=50, blank=True, null=True)
     mensaje = models.TextField()
     activa = models.BooleanField(blank=True, null=True)
     fechacreacion = models.DateTimeField(blank=True, null=True)
+    # Marca de idempotencia: se fija al notificar la alerta a los usuarios
+    fechanotificacion = models.DateTimeField(blank=True, null=True)
+
+    objects = AuditedManager()
 
     class Meta:
         managed = True
@@ -143,13 +198,15 @@ class Entradamodeloestimacionrnn(models.Model):
         db_table = "entradamodeloestimacionrnn"
 
 
-class Equipo(models.Model):
+class Equipo(SnapshotAuditoriaMixin, models.Model):
     idequipo = models.AutoField(primary_key=True)
     nombreequipo = models.CharField(max_length=255)
     descripcion = models.TextField(blank=True, null=True)
     fechacreacion = models.DateTimeField(blank=True, null=True)
     fechamodificacion = models.DateTimeField(blank=True, null=True)
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "equipo"
@@ -269,7 +326,7 @@ class Monitoreotarea(models.Model):
         db_table = "monitoreotarea"
 
 
-class Notificacion(models.Model):
+class Notificacion(SnapshotAuditoriaMixin, models.Model):
     idnotificacion = models.AutoField(primary_key=True)
     idusuario = models.ForeignKey("Usuario", models.DO_NOTHING, db_column="idusuario")
     mensaje = models.TextField()
@@ -297,12 +354,14 @@ class Notificacion(models.Model):
     archivada = models.BooleanField(default=False)
     fecha_recordatorio = models.DateTimeField(blank=True, null=True)
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "notificacion"
 
 
-class Proyecto(models.Model):
+class Proyecto(SnapshotAuditoriaMixin, models.Model):
     idproyecto = models.AutoField(primary_key=True)
     nombreproyecto = models.CharField(max_length=255)
     descripcion = models.TextField(blank=True, null=True)
@@ -321,12 +380,14 @@ class Proyecto(models.Model):
     fechacreacion = models.DateTimeField(blank=True, null=True)
     fechamodificacion = models.DateTimeField(blank=True, null=True)
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "proyecto"
 
 
-class Recurso(models.Model):
+class Recurso(SnapshotAuditoriaMixin, models.Model):
     idrecurso = models.AutoField(primary_key=True)
     nombrerecurso = models.CharField(max_length=255)
     idtiporecurso = models.ForeignKey(
@@ -337,6 +398,8 @@ class Recurso(models.Model):
     fechacreacion = models.DateTimeField(blank=True, null=True)
     fechamodificacion = models.DateTimeField(blank=True, null=True)
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "recurso"
@@ -397,7 +460,7 @@ class Reporteusuario(models.Model):
         db_table = "reporteusuario"
 
 
-class Requerimiento(models.Model):
+class Requerimiento(SnapshotAuditoriaMixin, models.Model):
     idrequerimiento = models.AutoField(primary_key=True)
     descripcion = models.TextField()
     keywords = models.TextField(blank=True, null=True)  # Nuevo campo
@@ -405,6 +468,8 @@ class Requerimiento(models.Model):
     fechamodificacion = models.DateTimeField(blank=True, null=True)
     idproyecto = models.ForeignKey(Proyecto, models.DO_NOTHING, db_column="idproyecto")
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "requerimiento"
@@ -467,13 +532,15 @@ class TipoTarea(models.Model):
         return self.nombre
 
 
-class Fase(models.Model):
+class Fase(SnapshotAuditoriaMixin, models.Model):
     idfase = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
     orden = models.IntegerField(default=0)
     fechacreacion = models.DateTimeField(auto_now_add=True, null=True)
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "fase"
@@ -482,7 +549,7 @@ class Fase(models.Model):
         return self.nombre
 
 
-class TareaComun(models.Model):
+class TareaComun(SnapshotAuditoriaMixin, models.Model):
     idtareacomun = models.AutoField(primary_key=True)
     nombre = models.TextField()
     descripcion = models.TextField(blank=True, null=True)
@@ -493,6 +560,8 @@ class TareaComun(models.Model):
     variabilidad_tiempo = models.FloatField(blank=True, null=True)
     fechacreacion = models.DateTimeField(auto_now_add=True, null=True)
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "tareacomun"
@@ -501,7 +570,7 @@ class TareaComun(models.Model):
         return self.nombre
 
 
-class Tarea(models.Model):
+class Tarea(SnapshotAuditoriaMixin, models.Model):
     idtarea = models.AutoField(primary_key=True)
     nombretarea = models.CharField(max_length=255)
     descripcion = models.TextField(blank=True, null=True)  # Nuevo campo
@@ -535,9 +604,17 @@ class Tarea(models.Model):
         Requerimiento, models.DO_NOTHING, db_column="idrequerimiento"
     )
 
+    objects = AuditedManager()
+
     class Meta:
         managed = True
         db_table = "tarea"
+        indexes = [
+            # Paginación por cursor de la API (ver api.pagination)
+            models.Index(
+                fields=["fechacreacion", "idtarea"], name="tarea_fecha_id_idx"
+            ),
+        ]
 
 
 class TareaTareaComun(models.Model):
@@ -633,7 +710,7 @@ class CustomUserManager(BaseUserManager):
         return self._create_user(nombreusuario, email, password, **extra_fields)
 
 
-class Usuario(AbstractUser):
+class Usuario(SnapshotAuditoriaMixin, AbstractUser):
     idusuario = models.AutoField(primary_key=True)
     nombreusuario = models.CharField(max_length=255, unique=True)
     email = models.CharField(unique=True, max_length=255)
@@ -687,3 +764,105 @@ class HistorialEquipo(models.Model):
     class Meta:
         managed = True
         db_table = "historialequipo"
+
+
+class KpiSnapshot(models.Model):
+    """
+    Agregados precalculados del panel de control por entidad, equipo, mes y estado.
+
+    Se mantiene incrementalmente con deltas desde las señales de Tarea, Proyecto y
+    Tarearecurso (ver dashboard/kpi_snapshot.py). Puede haber más de una fila por
+    clave; las lecturas siempre suman por clave.
+    """
+
+    idsnapshot = models.AutoField(primary_key=True)
+    entidad = models.CharField(max_length=20)  # "proyecto" o "tarea"
+    idequipo = models.IntegerField(blank=True, null=True)
+    mes = models.DateField(blank=True, null=True)  # Primer día del mes
+    estado = models.CharField(max_length=50, blank=True, null=True)
+    cantidad = models.IntegerField(default=0)
+    presupuesto = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    presupuestoutilizado = models.DecimalField(
+        max_digits=15, decimal_places=2, default=0
+    )
+    costoestimado = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    costoactual = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    completadas_a_tiempo = models.IntegerField(default=0)
+    con_duracion = models.IntegerField(default=0)
+    productividad_total = models.FloatField(default=0.0)
+    asignaciones = models.IntegerField(default=0)
+    con_recursos = models.IntegerField(default=0)
+    fechamodificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        db_table = "dashboard_kpi_snapshot"
+        indexes = [
+            models.Index(
+                fields=["entidad", "idequipo", "mes", "estado"],
+                name="kpi_snapshot_clave_idx",
+            ),
+        ]
+
+
+class ActividadResumenDiario(models.Model):
+    """Conteo diario de actividades por usuario y acción (ver auditoria/resumen.py)"""
+
+    idresumen = models.AutoField(primary_key=True)
+    fecha = models.DateField()
+    idusuario = models.ForeignKey(
+        "Usuario",
+        models.DO_NOTHING,
+        db_column="idusuario",
+        db_constraint=False,
+        blank=True,
+        null=True,
+    )
+    accion = models.CharField(max_length=255)
+    cantidad = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = "actividad_resumen_diario"
+        unique_together = (("fecha", "idusuario", "accion"),)
+
+
+class CorreoSaliente(models.Model):
+    """Bandeja de salida de correos (ver notificaciones/correo.py)"""
+
+    PENDIENTE = "pendiente"
+    # Reservado por un worker hasta ``siguiente_intento``
+    ENVIANDO = "enviando"
+    ENVIADO = "enviado"
+    FALLIDO = "fallido"
+
+    idcorreo = models.AutoField(primary_key=True)
+    asunto = models.CharField(max_length=255)
+    cuerpo = models.TextField()
+    cuerpo_html = models.TextField(blank=True, null=True)
+    remitente = models.CharField(max_length=255, blank=True, null=True)
+    destinatarios = models.JSONField(default=list)
+    estado = models.CharField(
+        max_length=20,
+        default=PENDIENTE,
+        choices=[
+            (PENDIENTE, "Pendiente"),
+            (ENVIANDO, "Enviando"),
+            (ENVIADO, "Enviado"),
+            (FALLIDO, "Fallido"),
+        ],
+    )
+    intentos = models.IntegerField(default=0)
+    siguiente_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, null=True)
+    fechacreacion = models.DateTimeField(auto_now_add=True)
+    fechaenvio = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = True
+        db_table = "correo_saliente"
+        indexes = [
+            models.Index(
+                fields=["estado", "siguiente_intento"], name="correo_pendiente_idx"
+            ),
+        ]
@@ -0,0 +1,82 @@
+"""
+Caché por usuario del indicador de notificaciones (contador de no leídas y las
+cinco más recientes) que muestra la barra de navegación en cada página.
+
+Se guarda en la caché por defecto (Redis) y se invalida al guardar o eliminar
+una ``Notificacion`` y desde las vistas que marcan, archivan o leen en bloque.
+Si la caché no está disponible se consulta directamente la base de datos.
+"""
+
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notificacion
+
+logger = logging.getLogger(__name__)
+
+BADGE_TIMEOUT = 300
+MAX_RECIENTES = 5
+CAMPOS_RECIENTES = [
+    "idnotificacion",
+    "mensaje",
+    "leido",
+    "fechacreacion",
+    "prioridad",
+    "categoria",
+]
+
+
+def clave_badge(idusuario):
+    return f"notif_badge:{idusuario}"
+
+
+def _calcular_badge(idusuario):
+    pendientes = Notificacion.objects.filter(
+        idusuario_id=idusuario, leido=False, archivada=False
+    )
+    recientes = list(
+        pendientes.order_by("-fechacreacion").values(*CAMPOS_RECIENTES)[:MAX_RECIENTES]
+    )
+    return {
+        "no_leidas": pendientes.count(),
+        "ids": [fila["idnotificacion"] for fila in recientes],
+        "recientes": recientes,
+    }
+
+
+def obtener_badge(idusuario):
+    """
+    Devuelve ``{"no_leidas", "ids", "recientes"}`` para el usuario.
+
+    Solo consulta la base de datos cuando la entrada no está en caché.
+    """
+    clave = clave_badge(idusuario)
+    try:
+        badge = cache.get(clave)
+    except Exception:
+        logger.exception("Error al leer el badge de notificaciones de la caché")
+        return _calcular_badge(idusuario)
+
+    if badge is None:
+        badge = _calcular_badge(idusuario)
+        try:
+            cache.set(clave, badge, BADGE_TIMEOUT)
+        except Exception:
+            logger.exception("Error al guardar el badge de notificaciones en caché")
+    return badge
+
+
+def invalidar_badge(idusuario):
+    """Elimina el badge del usuario cuando la transacción en curso se confirma"""
+    if not idusuario:
+        return
+
+    def _borrar():
+        try:
+            cache.delete(clave_badge(idusuario))
+        except Exception:
+            logger.exception("Error al invalidar el badge de notificaciones")
+
+    transaction.on_commit(_borrar)
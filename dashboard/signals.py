@@ -0,0 +1,190 @@
+"""
+Señales que mantienen incrementalmente el snapshot de KPIs del dashboard.
+
+Antes de guardar o eliminar se captura la contribución actual de la fila en la
+base de datos; después se lee la nueva y se aplica solo la diferencia.
+
+También invalidan el badge de notificaciones en caché de cada usuario.
+"""
+
+import logging
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import kpi_snapshot
+from .models import Notificacion, Proyecto, Tarea, Tarearecurso
+from .notificaciones_badge import invalidar_badge
+
+logger = logging.getLogger(__name__)
+
+
+def _contribucion_tarea(idtarea):
+    return kpi_snapshot.contribucion_tarea_actual(idtarea)
+
+
+def _contribucion_proyecto(idproyecto):
+    valores = kpi_snapshot.valores_proyecto(idproyecto)
+    return kpi_snapshot.contribucion_proyecto(valores) if valores else None
+
+
+def _debe_procesar(instance, raw=False):
+    return kpi_snapshot.snapshot_habilitado() and not raw and instance.pk
+
+
+# --- Tarea ---
+
+
+@receiver(pre_save, sender=Tarea)
+def tarea_pre_save(sender, instance, raw=False, **kwargs):
+    if not _debe_procesar(instance, raw):
+        return
+    instance._kpi_anterior = _contribucion_tarea(instance.pk)
+
+
+@receiver(post_save, sender=Tarea)
+def tarea_post_save(sender, instance, raw=False, **kwargs):
+    if not _debe_procesar(instance, raw):
+        return
+    try:
+        kpi_snapshot.aplicar_cambio(
+            getattr(instance, "_kpi_anterior", None), _contribucion_tarea(instance.pk)
+        )
+    except Exception:
+        logger.exception(f"Error al actualizar snapshot de KPIs (tarea {instance.pk})")
+    instance._kpi_anterior = None
+
+
+@receiver(pre_delete, sender=Tarea)
+def tarea_pre_delete(sender, instance, **kwargs):
+    if not _debe_procesar(instance):
+        return
+    instance._kpi_anterior = _contribucion_tarea(instance.pk)
+
+
+@receiver(post_delete, sender=Tarea)
+def tarea_post_delete(sender, instance, **kwargs):
+    if not kpi_snapshot.snapshot_habilitado():
+        return
+    try:
+        kpi_snapshot.aplicar_cambio(getattr(instance, "_kpi_anterior", None), None)
+    except Exception:
+        logger.exception(f"Error al actualizar snapshot de KPIs (tarea {instance.pk})")
+
+
+# --- Proyecto ---
+
+
+@receiver(pre_save, sender=Proyecto)
+def proyecto_pre_save(sender, instance, raw=False, **kwargs):
+    if not _debe_procesar(instance, raw):
+        return
+    instance._kpi_anterior = _contribucion_proyecto(instance.pk)
+
+
+@receiver(post_save, sender=Proyecto)
+def proyecto_post_save(sender, instance, raw=False, **kwargs):
+    if not _debe_procesar(instance, raw):
+        return
+    anterior = getattr(instance, "_kpi_anterior", None)
+    nueva = _contribucion_proyecto(instance.pk)
+    try:
+        kpi_snapshot.aplicar_cambio(anterior, nueva)
+        # Si el proyecto cambió de equipo, sus tareas también cambian de fila
+        equipo_anterior = anterior[0][1] if anterior else None
+        equipo_nuevo = nueva[0][1] if nueva else None
+        if anterior and equipo_anterior != equipo_nuevo:
+            kpi_snapshot.mover_tareas_de_proyecto(
+                instance.pk, equipo_anterior, equipo_nuevo
+            )
+    except Exception:
+        logger.exception(
+            f"Error al actualizar snapshot de KPIs (proyecto {instance.pk})"
+        )
+    instance._kpi_anterior = None
+
+
+@receiver(pre_delete, sender=Proyecto)
+def proyecto_pre_delete(sender, instance, **kwargs):
+    if not _debe_procesar(instance):
+        return
+    instance._kpi_anterior = _contribucion_proyecto(instance.pk)
+
+
+@receiver(post_delete, sender=Proyecto)
+def proyecto_post_delete(sender, instance, **kwargs):
+    if not kpi_snapshot.snapshot_habilitado():
+        return
+    try:
+        kpi_snapshot.aplicar_cambio(getattr(instance, "_kpi_anterior", None), None)
+    except Exception:
+        logger.exception(
+            f"Error al actualizar snapshot de KPIs (proyecto {instance.pk})"
+        )
+
+
+# --- Tarearecurso: solo afecta a las métricas de asignación de su tarea ---
+
+
+def _capturar_tareas(ids):
+    return {idtarea: _contribucion_tarea(idtarea) for idtarea in ids if idtarea}
+
+
+def _aplicar_tareas(anteriores):
+    for idtarea, anterior in anteriores.items():
+        kpi_snapshot.aplicar_cambio(anterior, _contribucion_tarea(idtarea))
+
+
+@receiver(pre_save, sender=Tarearecurso)
+def tarearecurso_pre_save(sender, instance, raw=False, **kwargs):
+    if not kpi_snapshot.snapshot_habilitado() or raw:
+        return
+    ids = {instance.idtarea_id}
+    if instance.pk:
+        ids.update(
+            Tarearecurso.objects.filter(pk=instance.pk).values_list(
+                "idtarea", flat=True
+            )
+        )
+    instance._kpi_anteriores = _capturar_tareas(ids)
+
+
+@receiver(post_save, sender=Tarearecurso)
+def tarearecurso_post_save(sender, instance, raw=False, **kwargs):
+    if not kpi_snapshot.snapshot_habilitado() or raw:
+        return
+    try:
+        _aplicar_tareas(getattr(instance, "_kpi_anteriores", {}))
+    except Exception:
+        logger.exception(
+            f"Error al actualizar snapshot de KPIs (tarearecurso {instance.pk})"
+        )
+    instance._kpi_anteriores = {}
+
+
+@receiver(pre_delete, sender=Tarearecurso)
+def tarearecurso_pre_delete(sender, instance, **kwargs):
+    if not kpi_snapshot.snapshot_habilitado():
+        return
+    instance._kpi_anteriores = _capturar_tareas({instance.idtarea_id})
+
+
+@receiver(post_delete, sender=Tarearecurso)
+def tarearecurso_post_delete(sender, instance, **kwargs):
+    if not kpi_snapshot.snapshot_habilitado():
+        return
+    try:
+        _aplicar_tareas(getattr(instance, "_kpi_anteriores", {}))
+    except Exception:
+        logger.exception(
+            f"Error al actualizar snapshot de KPIs (tarearecurso {instance.pk})"
+        )
+
+
+# --- Notificacion: invalida el badge de notificaciones del usuario ---
+
+
+@receiver(post_save, sender=Notificacion)
+@receiver(post_delete, sender=Notificacion)
+def notificacion_invalidar_badge(sender, instance, **kwargs):
+    invalidar_badge(instance.idusuario_id)
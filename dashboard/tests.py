@@ -1,3 +1,204 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import kpi_snapshot
+from .kpis import ESTADOS_PROYECTO, ESTADOS_TAREA, calcular_kpis_dashboard
+from .models import (
+    Actividad,
+    Equipo,
+    Miembro,
+    Proyecto,
+    Recurso,
+    Requerimiento,
+    Tarea,
+    Tarearecurso,
+    Tiporecurso,
+    Usuario,
+)
+
+
+@override_settings(DASHBOARD_KPI_SNAPSHOT=True)
+class KpiSnapshotTest(TestCase):
+    """La actualización incremental coincide con la reconstrucción completa"""
+
+    FECHA_FIN = datetime.date(2026, 3, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: sin señales de auditoría ni del snapshot
+        Usuario.objects.bulk_create(
+            [
+                # Autor de la auditoría de las operaciones sin usuario en curso
+                Usuario(
+                    nombreusuario="kpi-admin",
+                    username="kpi-admin",
+                    email="kpi-admin@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                    is_superuser=True,
+                )
+            ]
+        )
+        (proyecto,) = Proyecto.objects.bulk_create(
+            [Proyecto(nombreproyecto="Proyecto KPI")]
+        )
+        (requerimiento,) = Requerimiento.objects.bulk_create(
+            [Requerimiento(descripcion="Requerimiento KPI", idproyecto=proyecto)]
+        )
+        (cls.tarea,) = Tarea.objects.bulk_create(
+            [
+                Tarea(
+                    nombretarea="Tarea KPI",
+                    estado="Pendiente",
+                    fechafin=cls.FECHA_FIN,
+                    idrequerimiento=requerimiento,
+                )
+            ]
+        )
+
+    def _snapshot(self):
+        return sorted(
+            (fila for fila in kpi_snapshot.leer_snapshot() if fila["cantidad"]),
+            key=lambda fila: (fila["entidad"], str(fila["mes"]), fila["estado"]),
+        )
+
+    def test_completada_a_tiempo(self):
+        utc = datetime.timezone.utc
+        casos = [
+            # Antes de la medianoche UTC de fechafin
+            datetime.datetime(2026, 3, 9, 12, tzinfo=utc),
+            # Entre la medianoche UTC y la local (America/Lima) de fechafin
+            datetime.datetime(2026, 3, 10, 2, tzinfo=utc),
+            # Después de fechafin
+            datetime.datetime(2026, 3, 11, 12, tzinfo=utc),
+        ]
+        for fechamodificacion in casos:
+            with self.subTest(fechamodificacion=fechamodificacion):
+                Tarea.objects.filter(pk=self.tarea.pk).update(
+                    estado="Pendiente", fechamodificacion=None
+                )
+                kpi_snapshot.reconstruir_snapshot()
+
+                tarea = Tarea.objects.get(pk=self.tarea.pk)
+                tarea.estado = "Completada"
+                tarea.fechamodificacion = fechamodificacion
+                tarea.save()
+
+                incremental = self._snapshot()
+                kpi_snapshot.reconstruir_snapshot()
+                self.assertEqual(incremental, self._snapshot())
+
+    def test_snapshot_no_se_audita(self):
+        kpi_snapshot.reconstruir_snapshot()
+        tarea = Tarea.objects.get(pk=self.tarea.pk)
+        tarea.estado = "Completada"
+        tarea.save()
+        with CaptureQueriesContext(connection) as consultas:
+            kpi_snapshot.reconstruir_snapshot()
+
+        borrados = [c for c in consultas if c["sql"].startswith("DELETE")]
+        self.assertEqual(len(borrados), 1)
+        self.assertFalse(Actividad.objects.filter(entidad_tipo="KpiSnapshot").exists())
+
+
+class KpisDashboardConsultasTest(TestCase):
+    """
+    El número de consultas de ``calcular_kpis_dashboard`` no depende del número
+    de equipos, proyectos, tareas ni tipos de recurso.
+    """
+
+    def _crear_equipos(self, total):
+        """``total`` equipos con un proyecto, tareas y un recurso asignado cada uno"""
+        # bulk_create: sin señales de auditoría ni del snapshot
+        ahora = timezone.now()
+        inicio = Equipo.objects.count()
+        equipos = Equipo.objects.bulk_create(
+            [Equipo(nombreequipo=f"Equipo {inicio + i}") for i in range(total)]
+        )
+        proyectos = Proyecto.objects.bulk_create(
+            [
+                Proyecto(
+                    nombreproyecto=f"Proyecto {equipo.pk}",
+                    idequipo=equipo,
+                    estado=ESTADOS_PROYECTO[i % len(ESTADOS_PROYECTO)],
+                    presupuesto=Decimal("1000"),
+                    presupuestoutilizado=Decimal("250"),
+                    fechacreacion=ahora,
+                )
+                for i, equipo in enumerate(equipos)
+            ]
+        )
+        requerimientos = Requerimiento.objects.bulk_create(
+            [
+                Requerimiento(descripcion="Requerimiento", idproyecto=proyecto)
+                for proyecto in proyectos
+            ]
+        )
+        tareas = Tarea.objects.bulk_create(
+            [
+                Tarea(
+                    nombretarea=f"Tarea {i}",
+                    idrequerimiento=requerimiento,
+                    estado=ESTADOS_TAREA[i % len(ESTADOS_TAREA)],
+                    prioridad=i % 3 + 1,
+                    costoestimado=Decimal("100"),
+                    costoactual=Decimal("80"),
+                    duracionestimada=8,
+                    duracionactual=10,
+                    fechafin=ahora.date(),
+                    fechamodificacion=ahora,
+                )
+                for requerimiento in requerimientos
+                for i in range(len(ESTADOS_TAREA))
+            ]
+        )
+        tipos = Tiporecurso.objects.bulk_create(
+            [Tiporecurso(nametiporecurso=f"Tipo {equipo.pk}") for equipo in equipos]
+        )
+        recursos = Recurso.objects.bulk_create(
+            [
+                Recurso(nombrerecurso=f"Recurso {tipo.pk}", idtiporecurso=tipo)
+                for tipo in tipos
+            ]
+        )
+        Miembro.objects.bulk_create(
+            [
+                Miembro(idrecurso=recurso, idequipo=equipo)
+                for recurso, equipo in zip(recursos, equipos)
+            ]
+        )
+        Tarearecurso.objects.bulk_create(
+            [
+                Tarearecurso(idtarea=tarea, idrecurso=recursos[i // len(ESTADOS_TAREA)])
+                for i, tarea in enumerate(tareas)
+            ]
+        )
+
+    def _consultas(self):
+        if kpi_snapshot.snapshot_habilitado():
+            kpi_snapshot.reconstruir_snapshot()
+        with CaptureQueriesContext(connection) as consultas:
+            datos = calcular_kpis_dashboard()
+        return len(consultas), datos
+
+    def _comprobar_consultas_constantes(self):
+        self._crear_equipos(2)
+        consultas_pequena, datos = self._consultas()
+        self.assertEqual(datos.stats["total_equipos"], 2)
+
+        self._crear_equipos(10)
+        consultas_grande, datos = self._consultas()
+        self.assertEqual(datos.stats["total_equipos"], 12)
+        self.assertEqual(consultas_pequena, consultas_grande)
+
+    def test_consultas_constantes(self):
+        self._comprobar_consultas_constantes()
+
+    @override_settings(DASHBOARD_KPI_SNAPSHOT=True)
+    def test_consultas_constantes_con_snapshot(self):
+        self._comprobar_consultas_constantes()
@@ -0,0 +1,19 @@
+from apscheduler.triggers.cron import CronTrigger
+
+from dashboard.kpi_snapshot import reconstruir_snapshot, snapshot_habilitado
+from notificaciones.scheduler import registrar_trabajo
+
+
+def refrescar_kpi_snapshot():
+    """Reconstruye el snapshot de KPIs para corregir posibles desvíos de los deltas"""
+    if snapshot_habilitado():
+        return reconstruir_snapshot()
+
+
+# Refresco del snapshot de KPIs (cada día a las 04:00)
+registrar_trabajo(
+    "refrescar_kpi_snapshot",
+    refrescar_kpi_snapshot,
+    CronTrigger(hour=4, minute=0),
+    nombre="Reconstruir snapshot de KPIs",
+)
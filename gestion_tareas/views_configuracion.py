@@ -6,6 +6,7 @@ from django.db.models import Count, Max, F
 from django.http import JsonResponse
 from django.db import transaction  # Añadir esta importación
 
+from api.condicional import incrementar_version
 from dashboard.models import TipoTarea, Fase, TareaComun, TareaTareaComun, Tarea
 
 
@@ -197,6 +198,8 @@ def crear_fase(request):
             with transaction.atomic():
                 # Obtener todas las fases con orden >= al nuevo orden y actualizar su orden
                 Fase.objects.filter(orden__gte=orden).update(orden=F("orden") + 1)
+                # QuerySet.update no dispara las señales de versión de la API
+                incrementar_version(Fase)
 
                 # Crear la nueva fase
                 Fase.objects.create(
@@ -23,6 +23,7 @@ from django.core.mail import EmailMultiAlternatives
 import uuid
 from django.conf import settings
 from django.db import transaction
+from notificaciones.correo import encolar_correo
 
 
 def enviar_correo_confirmacion(email, token):
@@ -42,7 +43,8 @@ def enviar_correo_confirmacion(email, token):
     remitente = settings.EMAIL_HOST_USER
     correo = EmailMultiAlternatives(asunto, mensaje_texto, remitente, [email])
     correo.attach_alternative(mensaje_html, "text/html")
-    correo.send()
+    # Se envía desde la bandeja de salida sin esperar al servidor SMTP
+    encolar_correo(correo)
 
 
 @login_required
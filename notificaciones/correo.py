@@ -0,0 +1,238 @@
+"""
+Envío diferido de correos mediante una bandeja de salida.
+
+Las vistas y servicios no llaman a ``send_mail``: guardan el mensaje en la
+tabla ``correo_saliente`` con ``encolar_correo``/``encolar_correos`` (dentro de
+la misma transacción que lo origina) y responden sin esperar al servidor SMTP.
+
+El worker (``python manage.py procesar_correos`` o el trabajo periódico del
+scheduler) reserva lotes de correos pendientes y los envía con una sola
+conexión por lote, respetando ``NOTIFICACIONES_CORREO_POR_MINUTO``. Los fallos
+se reintentan con espera exponencial hasta ``MAX_INTENTOS``; después el correo
+queda como fallido con el último error.
+
+La reserva es una transacción corta que marca los correos como ``enviando``
+hasta el fin de un plazo (guardado en ``siguiente_intento``); el envío se hace
+fuera de cualquier transacción y cada resultado se guarda con su propio
+``UPDATE``, así que no se mantienen bloqueos de filas durante la conexión SMTP
+ni las pausas. Si el worker muere, sus correos vuelven a estar disponibles al
+vencer el plazo (y pueden enviarse dos veces).
+
+El backend es el de ``EMAIL_BACKEND``, así que en local basta con el backend
+``locmem`` o ``filebased`` de Django.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_CORREOS = 50
+MAX_INTENTOS = 5
+ESPERA_BASE_SEGUNDOS = 60
+ESPERA_MAXIMA_SEGUNDOS = 3600
+# Plazo de reserva de un lote, además de las pausas entre envíos
+PLAZO_RESERVA_SEGUNDOS = 300
+
+
+def _correo_desde_mensaje(mensaje):
+    html = next(
+        (
+            contenido
+            for contenido, tipo in getattr(mensaje, "alternatives", [])
+            if tipo == "text/html"
+        ),
+        None,
+    )
+    return CorreoSaliente(
+        asunto=mensaje.subject[:255],
+        cuerpo=mensaje.body,
+        cuerpo_html=html,
+        remitente=mensaje.from_email,
+        destinatarios=list(mensaje.to),
+    )
+
+
+def encolar_correos(mensajes):
+    """
+    Guarda los ``EmailMessage`` en la bandeja de salida con un solo
+    ``bulk_create``. Devuelve las filas creadas.
+    """
+    return CorreoSaliente.objects.bulk_create(
+        [_correo_desde_mensaje(mensaje) for mensaje in mensajes],
+        batch_size=TAMANO_LOTE_CORREOS,
+    )
+
+
+def encolar_correo(mensaje):
+    """Guarda un ``EmailMessage`` en la bandeja de salida"""
+    return encolar_correos([mensaje])[0]
+
+
+def _mensaje_desde_correo(correo, connection):
+    mensaje = EmailMultiAlternatives(
+        correo.asunto,
+        correo.cuerpo,
+        correo.remitente or settings.DEFAULT_FROM_EMAIL,
+        correo.destinatarios,
+        connection=connection,
+    )
+    if correo.cuerpo_html:
+        mensaje.attach_alternative(correo.cuerpo_html, "text/html")
+    return mensaje
+
+
+def _espera_reintento(intentos):
+    return timedelta(
+        seconds=min(ESPERA_BASE_SEGUNDOS * 2 ** (intentos - 1), ESPERA_MAXIMA_SEGUNDOS)
+    )
+
+
+def _pausa_entre_envios():
+    por_minuto = getattr(settings, "NOTIFICACIONES_CORREO_POR_MINUTO", 0)
+    return 60 / por_minuto if por_minuto > 0 else 0
+
+
+def _reservar_lote(tamano, plazo):
+    """
+    Marca como ``enviando`` hasta ``fin`` hasta ``tamano`` correos listos para
+    enviarse (pendientes o con la reserva vencida). Devuelve ``(correos, fin)``.
+    """
+    ahora = timezone.now()
+    fin = ahora + plazo
+    with transaction.atomic():
+        correos = list(
+            CorreoSaliente.objects.select_for_update(skip_locked=True)
+            .filter(
+                estado__in=[CorreoSaliente.PENDIENTE, CorreoSaliente.ENVIANDO],
+                siguiente_intento__lte=ahora,
+            )
+            .order_by("siguiente_intento", "idcorreo")[:tamano]
+        )
+        if correos:
+            CorreoSaliente.objects.filter(
+                idcorreo__in=[correo.idcorreo for correo in correos]
+            ).update(estado=CorreoSaliente.ENVIANDO, siguiente_intento=fin)
+    return correos, fin
+
+
+def _guardar_resultado(correo, fin_reserva, **campos):
+    """
+    Guarda el resultado del envío si la reserva sigue siendo de este worker.
+    Devuelve ``False`` si otro worker la tomó tras vencer el plazo.
+    """
+    return bool(
+        CorreoSaliente.objects.filter(
+            idcorreo=correo.idcorreo,
+            estado=CorreoSaliente.ENVIANDO,
+            siguiente_intento=fin_reserva,
+        ).update(**campos)
+    )
+
+
+def procesar_lote(tamano=TAMANO_LOTE_CORREOS):
+    """
+    Envía un lote de correos pendientes con una única conexión SMTP.
+
+    Los correos se reservan con ``SKIP LOCKED`` en una transacción corta para
+    que varios workers no envíen el mismo, y se envían fuera de ella, uno a
+    uno sobre la misma conexión para poder reintentar solo los que fallan.
+    Devuelve ``(enviados, reintentos, fallidos)``.
+    """
+    enviados = reintentos = fallidos = 0
+    pausa = _pausa_entre_envios()
+
+    correos, fin_reserva = _reservar_lote(
+        tamano, timedelta(seconds=PLAZO_RESERVA_SEGUNDOS + pausa * tamano)
+    )
+    if not correos:
+        return enviados, reintentos, fallidos
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"No se pudo abrir la conexión de correo: {str(e)}")
+        connection = None
+
+    for indice, correo in enumerate(correos):
+        if pausa and indice:
+            time.sleep(pausa)
+        if timezone.now() >= fin_reserva:
+            # El resto puede haberlo tomado otro worker; se queda para él
+            logger.warning(
+                f"Plazo de reserva vencido: {len(correos) - indice} correos sin enviar"
+            )
+            break
+        try:
+            if connection is None:
+                raise ConnectionError("Conexión de correo no disponible")
+            connection.send_messages([_mensaje_desde_correo(correo, connection)])
+        except Exception as e:
+            intentos = correo.intentos + 1
+            if intentos >= MAX_INTENTOS:
+                if _guardar_resultado(
+                    correo,
+                    fin_reserva,
+                    estado=CorreoSaliente.FALLIDO,
+                    intentos=intentos,
+                    ultimo_error=str(e),
+                ):
+                    fallidos += 1
+                logger.error(
+                    f"Correo {correo.idcorreo} descartado tras {intentos} intentos: {str(e)}"
+                )
+            elif _guardar_resultado(
+                correo,
+                fin_reserva,
+                estado=CorreoSaliente.PENDIENTE,
+                intentos=intentos,
+                ultimo_error=str(e),
+                siguiente_intento=timezone.now() + _espera_reintento(intentos),
+            ):
+                reintentos += 1
+            continue
+
+        if _guardar_resultado(
+            correo,
+            fin_reserva,
+            estado=CorreoSaliente.ENVIADO,
+            fechaenvio=timezone.now(),
+            ultimo_error=None,
+        ):
+            enviados += 1
+        else:
+            logger.warning(f"Correo {correo.idcorreo} enviado tras vencer su reserva")
+
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    logger.info(
+        f"Correos enviados: {enviados}, reintentos: {reintentos}, fallidos: {fallidos}"
+    )
+    return enviados, reintentos, fallidos
+
+
+def procesar_correos_pendientes(max_lotes=None, tamano=TAMANO_LOTE_CORREOS):
+    """Procesa lotes hasta vaciar la bandeja (o ``max_lotes``). Devuelve los totales"""
+    totales = [0, 0, 0]
+    lotes = 0
+    while max_lotes is None or lotes < max_lotes:
+        resultado = procesar_lote(tamano)
+        lotes += 1
+        for i, valor in enumerate(resultado):
+            totales[i] += valor
+        if sum(resultado) < tamano:
+            break
+    return tuple(totales)
@@ -1,5 +1,3 @@
-from django.utils import timezone
-from datetime import timedelta
 from dashboard.models import Alerta
 from .services import MonitoreoService, NotificacionService
 
@@ -14,11 +12,12 @@ def verificar_y_crear_alertas():
     # Verificar tareas bloqueadas
     alertas_bloqueo = MonitoreoService.verificar_tareas_bloqueadas()
 
-    # Para cada nueva alerta creada, notificar a los usuarios
-    alertas_nuevas = Alerta.objects.filter(
-        fechacreacion__gte=timezone.now() - timedelta(minutes=10)
-    )
-    for alerta in alertas_nuevas:
-        NotificacionService.notificar_alerta_a_usuarios(alerta)
+    # Notificar exactamente las alertas creadas, junto con las que una ejecución
+    # anterior dejó sin notificar (por ejemplo, si se interrumpió)
+    alertas_nuevas = alertas_retraso + alertas_presupuesto + alertas_bloqueo
+    pendientes = Alerta.objects.filter(
+        fechanotificacion__isnull=True, activa=True
+    ).values_list("idalerta", flat=True)
+    NotificacionService.notificar_alertas(set(alertas_nuevas) | set(pendientes))
 
-    return f"Alertas creadas: {alertas_retraso + alertas_presupuesto + alertas_bloqueo}"
+    return f"Alertas creadas: {len(alertas_nuevas)}"
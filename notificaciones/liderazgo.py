@@ -0,0 +1,109 @@
+"""
+Bloqueo de líder para que solo un proceso ``run_scheduler`` ejecute trabajos.
+
+En PostgreSQL se usa un advisory lock de sesión (``pg_try_advisory_lock``):
+lo mantiene la conexión del proceso líder y se libera solo si el proceso
+muere o pierde la conexión. En otras bases de datos se usa una clave en la
+caché compartida (Redis) con caducidad, que el líder renueva periódicamente.
+
+El bloqueo vive en la conexión del hilo principal. Si falla (caída de la base
+de datos, reinicio del servidor...) se cierra, y antes de cada intento de
+adquirirlo se descarta si quedó inutilizable, de modo que el proceso puede
+volver a ser líder con una conexión nueva en lugar de reintentar para
+siempre sobre la rota.
+"""
+
+import logging
+import os
+import socket
+import uuid
+import zlib
+
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_BLOQUEO = "webapp-pm:scheduler"
+
+
+class BloqueoLider:
+    def __init__(self, nombre=NOMBRE_BLOQUEO, ttl=60):
+        self.nombre = nombre
+        self.ttl = ttl
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self.clave_pg = zlib.crc32(nombre.encode())
+        self.clave_cache = f"lider:{nombre}"
+        self.adquirido = False
+
+    @property
+    def usa_postgresql(self):
+        return connection.vendor == "postgresql"
+
+    @staticmethod
+    def _cerrar_conexion():
+        """Cierra la conexión tras un error; la siguiente consulta abre otra"""
+        try:
+            connection.close()
+        except Exception:
+            logger.exception("Error al cerrar la conexión del bloqueo de líder")
+
+    def adquirir(self):
+        """Intenta convertirse en líder sin esperar. Devuelve si lo consiguió"""
+        try:
+            if self.usa_postgresql:
+                # Aún no hay bloqueo que perder: se puede renovar la conexión
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_try_advisory_lock(%s)", [self.clave_pg])
+                    self.adquirido = cursor.fetchone()[0]
+            else:
+                self.adquirido = cache.add(self.clave_cache, self.token, self.ttl)
+        except Exception:
+            logger.exception("Error al intentar adquirir el bloqueo de líder")
+            self.adquirido = False
+            if self.usa_postgresql:
+                self._cerrar_conexion()
+        return self.adquirido
+
+    def mantener(self):
+        """
+        Comprueba (y renueva) el liderazgo. Debe llamarse con un intervalo
+        menor que ``ttl``. Devuelve ``False`` si se ha perdido.
+        """
+        if not self.adquirido:
+            return False
+        try:
+            if self.usa_postgresql:
+                # Si la conexión se perdió, el bloqueo también
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' "
+                        "AND pid = pg_backend_pid() AND objid = %s AND granted",
+                        [self.clave_pg],
+                    )
+                    self.adquirido = cursor.fetchone() is not None
+            elif cache.get(self.clave_cache) == self.token:
+                cache.touch(self.clave_cache, self.ttl)
+            else:
+                self.adquirido = False
+        except Exception:
+            logger.exception("Error al renovar el bloqueo de líder")
+            self.adquirido = False
+            if self.usa_postgresql:
+                # El bloqueo se perdió con la conexión
+                self._cerrar_conexion()
+        return self.adquirido
+
+    def liberar(self):
+        if not self.adquirido:
+            return
+        try:
+            if self.usa_postgresql:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", [self.clave_pg])
+            elif cache.get(self.clave_cache) == self.token:
+                cache.delete(self.clave_cache)
+        except Exception:
+            logger.exception("Error al liberar el bloqueo de líder")
+        self.adquirido = False
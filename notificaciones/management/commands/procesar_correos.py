@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificaciones import correo
+
+
+class Command(BaseCommand):
+    help = "Envía los correos pendientes de la bandeja de salida (correo_saliente)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Seguir procesando la bandeja indefinidamente",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help="Segundos de espera entre pasadas con --loop (default: 10)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=correo.TAMANO_LOTE_CORREOS,
+            help=f"Correos por lote y conexión (default: {correo.TAMANO_LOTE_CORREOS})",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            enviados, reintentos, fallidos = correo.procesar_correos_pendientes(
+                tamano=options["batch_size"]
+            )
+            if enviados or reintentos or fallidos or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Correos enviados: {enviados}, reintentos: {reintentos}, "
+                        f"fallidos: {fallidos}"
+                    )
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,80 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notificaciones.liderazgo import BloqueoLider
+from notificaciones.scheduler import cargar_trabajos, crear_scheduler, metricas_trabajos
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta el scheduler de tareas programadas. Solo el proceso que obtiene "
+        "el bloqueo de líder ejecuta trabajos; el resto queda en espera"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--metrics",
+            action="store_true",
+            help="Mostrar las métricas de ejecución de los trabajos y salir",
+        )
+
+    def handle(self, *args, **options):
+        trabajos = cargar_trabajos()
+
+        if options["metrics"]:
+            self.mostrar_metricas()
+            return
+
+        ttl = getattr(settings, "SCHEDULER_BLOQUEO_TTL", 60)
+        intervalo = max(ttl / 3, 1)
+        bloqueo = BloqueoLider(ttl=ttl)
+
+        detener = []
+        signal.signal(signal.SIGTERM, lambda *args: detener.append(True))
+
+        self.stdout.write(f"Trabajos registrados: {', '.join(trabajos)}")
+        scheduler = None
+        try:
+            while not detener:
+                if scheduler is None:
+                    if bloqueo.adquirir():
+                        self.stdout.write(
+                            self.style.SUCCESS("Bloqueo de líder obtenido: iniciando")
+                        )
+                        scheduler = crear_scheduler()
+                        scheduler.start()
+                elif not bloqueo.mantener():
+                    self.stdout.write(
+                        self.style.WARNING("Bloqueo de líder perdido: deteniendo")
+                    )
+                    # Se espera a que terminen los trabajos en curso antes de
+                    # volver a competir por el liderazgo. Otro proceso puede
+                    # haberlo tomado ya (el bloqueo se pierde con la conexión,
+                    # sin aviso previo), así que ese solape no se puede evitar
+                    # del todo: los trabajos deben tolerar una ejecución
+                    # simultánea (las alertas y el correo bloquean sus filas).
+                    scheduler.shutdown(wait=True)
+                    scheduler = None
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if scheduler is not None and scheduler.running:
+                scheduler.shutdown()
+            bloqueo.liberar()
+            self.stdout.write("Scheduler detenido")
+
+    def mostrar_metricas(self):
+        metricas = metricas_trabajos()
+        if not metricas:
+            self.stdout.write("Sin métricas registradas")
+        for id_trabajo, datos in metricas.items():
+            self.stdout.write(
+                f"{id_trabajo}: {datos['ejecuciones']} ejecuciones, "
+                f"{datos['errores']} errores, media {datos['duracion_media']:.2f}s, "
+                f"máxima {datos['duracion_maxima']:.2f}s, "
+                f"última {datos['ultima_duracion']:.2f}s ({datos['ultima_ejecucion']})"
+            )
@@ -1,17 +1,50 @@
+"""
+Scheduler de tareas programadas.
+
+Se ejecuta como proceso independiente con ``python manage.py run_scheduler``
+(no dentro de ``runserver`` ni de los workers web). Cada aplicación registra
+sus trabajos en un módulo ``trabajos.py`` con ``registrar_trabajo``; el comando
+los descubre al arrancar.
+
+Todos los trabajos se ejecutan a través de ``ejecutar_trabajo``, que mide su
+duración y guarda métricas en la caché compartida (ver ``metricas_trabajos``).
+El ``DjangoJobStore`` además conserva el historial de ejecuciones en
+``django_apscheduler_djangojobexecution``.
+"""
+
 import logging
-from django_apscheduler.jobstores import DjangoJobStore
+import time
+
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from django_apscheduler.models import DjangoJobExecution
-from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
 from django.utils import timezone
-import sys
-from datetime import datetime
-
-from notificaciones.cron import verificar_y_crear_alertas
+from django.utils.module_loading import autodiscover_modules
+from django_apscheduler.jobstores import DjangoJobStore
+from django_apscheduler.models import DjangoJob, DjangoJobExecution
 
 logger = logging.getLogger(__name__)
 
+CLAVE_METRICAS = "scheduler:metricas:{}"
+
+# id del trabajo -> {"funcion", "trigger", "nombre"}
+TRABAJOS = {}
+
+
+def registrar_trabajo(id_trabajo, funcion, trigger, nombre=None):
+    """Registra un trabajo programado; se añade al scheduler al arrancar"""
+    TRABAJOS[id_trabajo] = {
+        "funcion": funcion,
+        "trigger": trigger,
+        "nombre": nombre or id_trabajo,
+    }
+
+
+def cargar_trabajos():
+    """Importa el módulo ``trabajos`` de cada aplicación instalada"""
+    autodiscover_modules("trabajos")
+    return TRABAJOS
+
 
 def delete_old_job_executions(max_age=604_800):
     """
@@ -21,42 +54,82 @@ def delete_old_job_executions(max_age=604_800):
     DjangoJobExecution.objects.delete_old_job_executions(max_age)
 
 
-def start_scheduler():
+def _registrar_metricas(id_trabajo, duracion, error=None):
+    clave = CLAVE_METRICAS.format(id_trabajo)
+    try:
+        metricas = cache.get(clave) or {
+            "ejecuciones": 0,
+            "errores": 0,
+            "duracion_total": 0.0,
+            "duracion_maxima": 0.0,
+        }
+        metricas["ejecuciones"] += 1
+        metricas["duracion_total"] += duracion
+        metricas["duracion_maxima"] = max(metricas["duracion_maxima"], duracion)
+        metricas["ultima_duracion"] = duracion
+        metricas["ultima_ejecucion"] = timezone.now().isoformat()
+        if error is not None:
+            metricas["errores"] += 1
+            metricas["ultimo_error"] = str(error)
+        cache.set(clave, metricas, timeout=None)
+    except Exception:
+        logger.exception(f"Error al guardar las métricas del trabajo {id_trabajo}")
+
+
+def ejecutar_trabajo(id_trabajo):
+    """Ejecuta un trabajo registrado midiendo su duración"""
+    trabajo = TRABAJOS[id_trabajo]
+    close_old_connections()
+    inicio = time.monotonic()
+    try:
+        resultado = trabajo["funcion"]()
+    except Exception as e:
+        duracion = time.monotonic() - inicio
+        _registrar_metricas(id_trabajo, duracion, error=e)
+        logger.exception(f"Trabajo {id_trabajo} falló tras {duracion:.2f}s")
+        raise
+    finally:
+        close_old_connections()
+
+    duracion = time.monotonic() - inicio
+    _registrar_metricas(id_trabajo, duracion)
+    logger.info(f"Trabajo {id_trabajo} completado en {duracion:.2f}s")
+    return resultado
+
+
+def metricas_trabajos():
+    """Métricas de los trabajos registrados: ``{id: {...}}``"""
+    metricas = {}
+    for id_trabajo in TRABAJOS:
+        datos = cache.get(CLAVE_METRICAS.format(id_trabajo))
+        if datos:
+            datos["duracion_media"] = datos["duracion_total"] / datos["ejecuciones"]
+            metricas[id_trabajo] = datos
+    return metricas
+
+
+def crear_scheduler():
     """
-    Configura e inicia el scheduler con las tareas programadas.
+    Crea el scheduler con todos los trabajos registrados (sin arrancarlo).
+
+    Los trabajos que ya no están registrados se eliminan del almacén.
     """
     scheduler = BackgroundScheduler()
     scheduler.add_jobstore(DjangoJobStore(), "default")
 
-    # Añadir el trabajo para verificar y crear alertas (cada 6 horas)
-    scheduler.add_job(
-        verificar_y_crear_alertas,
-        trigger=IntervalTrigger(hours=6),
-        id="verificar_alertas",  # ID único para este trabajo
-        name="Verificar y crear alertas",
-        max_instances=1,
-        replace_existing=True,
-    )
-
-    # Añadir trabajo para limpiar historial de ejecuciones (una vez por semana)
-    scheduler.add_job(
-        delete_old_job_executions,
-        trigger=IntervalTrigger(days=7),
-        id="delete_old_job_executions",
-        max_instances=1,
-        replace_existing=True,
-    )
-
-    logger.info(
-        "Tareas programadas iniciadas:"
-        f" verificar_alertas (cada 6 horas),"
-        f" delete_old_job_executions (semanal)"
-    )
+    for id_trabajo, trabajo in TRABAJOS.items():
+        scheduler.add_job(
+            ejecutar_trabajo,
+            args=[id_trabajo],
+            trigger=trabajo["trigger"],
+            id=id_trabajo,
+            name=trabajo["nombre"],
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+        )
 
-    try:
-        logger.info("Iniciando scheduler...")
-        scheduler.start()
-    except KeyboardInterrupt:
-        logger.info("Deteniendo scheduler...")
-        scheduler.shutdown()
-        logger.info("Scheduler parado correctamente.")
+    DjangoJob.objects.exclude(id__in=list(TRABAJOS)).delete()
+
+    logger.info(f"Tareas programadas: {', '.join(TRABAJOS) or 'ninguna'}")
+    return scheduler
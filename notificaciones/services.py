@@ -7,172 +7,295 @@ from dashboard.models import (
     Usuario,
     Monitoreotarea,
     Jefeproyecto,
+    Tarearecurso,
 )
+from dashboard.notificaciones_badge import invalidar_badge
+from notificaciones.correo import encolar_correo, encolar_correos
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models import F, ExpressionWrapper, fields, Q
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
+from django.db import transaction
 from django.conf import settings
 import logging
 
 
+TAMANO_LOTE_ALERTAS = 500
+
+
+def _crear_alertas(alertas):
+    """
+    Inserta las alertas con ``bulk_create`` en lotes de ``TAMANO_LOTE_ALERTAS``.
+
+    Cada lote registra una sola actividad de auditoría. Devuelve los ids de las
+    alertas creadas.
+    """
+    creadas = []
+    lote = []
+    for alerta in alertas:
+        lote.append(alerta)
+        if len(lote) >= TAMANO_LOTE_ALERTAS:
+            creadas += [a.idalerta for a in Alerta.objects.audited_bulk_create(lote)]
+            lote = []
+    if lote:
+        creadas += [a.idalerta for a in Alerta.objects.audited_bulk_create(lote)]
+    return creadas
+
+
 class MonitoreoService:
     @staticmethod
     def verificar_tareas_retrasadas():
-        """Verifica tareas que están retrasadas según su fecha de fin"""
+        """
+        Verifica tareas que están retrasadas según su fecha de fin.
+
+        Devuelve los ids de las alertas creadas.
+        """
         hoy = timezone.now().date()
+        ahora = timezone.now()
 
         # Buscar tareas que deberían haber terminado pero no están completadas
-        # Buscar tareas que deberían haber terminado pero no están completadas
-        tareas_retrasadas = Tarea.objects.filter(
-            fechafin__lt=hoy, estado__in=["Pendiente", "En Progreso"]
-        ).exclude(alerta__tipoalerta="retraso", alerta__activa=True)
-
-        alertas_creadas = 0
-        for tarea in tareas_retrasadas:
-            # Crear alerta de retraso
-            Alerta.objects.create(
+        tareas_retrasadas = (
+            Tarea.objects.filter(
+                fechafin__lt=hoy, estado__in=["Pendiente", "En Progreso"]
+            )
+            .exclude(alerta__tipoalerta="retraso", alerta__activa=True)
+            .only("idtarea", "nombretarea", "fechafin")
+        )
+
+        return _crear_alertas(
+            Alerta(
                 idtarea=tarea,
                 tipoalerta="retraso",
                 mensaje=f"La tarea '{tarea.nombretarea}' está retrasada. Debía finalizar el {tarea.fechafin}.",
                 activa=True,
-                fechacreacion=timezone.now(),
+                fechacreacion=ahora,
             )
-            alertas_creadas += 1
-
-        return alertas_creadas
+            for tarea in tareas_retrasadas.iterator(chunk_size=TAMANO_LOTE_ALERTAS)
+        )
 
     @staticmethod
     def verificar_presupuesto_excedido():
-        """Verifica tareas que han excedido su presupuesto estimado"""
-        tareas_presupuesto_excedido = Tarea.objects.filter(
-            costoactual__gt=F("costoestimado") * 1.1  # 10% más que lo estimado
-        ).exclude(alerta__tipoalerta="presupuesto", alerta__activa=True)
-        alertas_creadas = 0
-        for tarea in tareas_presupuesto_excedido:
-            Alerta.objects.create(
+        """
+        Verifica tareas que han excedido su presupuesto estimado.
+
+        Devuelve los ids de las alertas creadas.
+        """
+        ahora = timezone.now()
+        tareas_presupuesto_excedido = (
+            Tarea.objects.filter(
+                costoactual__gt=F("costoestimado") * 1.1  # 10% más que lo estimado
+            )
+            .exclude(alerta__tipoalerta="presupuesto", alerta__activa=True)
+            .only("idtarea", "nombretarea", "costoactual", "costoestimado")
+        )
+
+        return _crear_alertas(
+            Alerta(
                 idtarea=tarea,
                 tipoalerta="presupuesto",
                 mensaje=f"La tarea '{tarea.nombretarea}' ha excedido su presupuesto estimado en un {((tarea.costoactual/tarea.costoestimado)-1)*100:.1f}%.",
                 activa=True,
-                fechacreacion=timezone.now(),
+                fechacreacion=ahora,
             )
-            alertas_creadas += 1
-
-        return alertas_creadas
+            for tarea in tareas_presupuesto_excedido.iterator(
+                chunk_size=TAMANO_LOTE_ALERTAS
+            )
+        )
 
     @staticmethod
     def verificar_tareas_bloqueadas():
-        """Verifica tareas que están bloqueadas por alguna dependencia"""
+        """
+        Verifica tareas que están bloqueadas por alguna dependencia.
+
+        Devuelve los ids de las alertas creadas.
+        """
+        ahora = timezone.now()
         # Esta verificación puede ser específica a tu lógica de negocio
-        tareas_bloqueadas = Monitoreotarea.objects.filter(
-            porcentajecompletado__lt=10,  # Tareas con poco avance
-            fechainicioreal__lt=timezone.now().date()
-            - timedelta(days=7),  # Iniciaron hace más de una semana
-            fechafinreal__isnull=True,  # No han terminado
-        ).exclude(idtarea__alerta__tipoalerta="bloqueo", idtarea__alerta__activa=True)
-
-        alertas_creadas = 0
-        for monitoreo in tareas_bloqueadas:
-            Alerta.objects.create(
+        tareas_bloqueadas = (
+            Monitoreotarea.objects.filter(
+                porcentajecompletado__lt=10,  # Tareas con poco avance
+                fechainicioreal__lt=timezone.now().date()
+                - timedelta(days=7),  # Iniciaron hace más de una semana
+                fechafinreal__isnull=True,  # No han terminado
+            )
+            .exclude(
+                idtarea__alerta__tipoalerta="bloqueo", idtarea__alerta__activa=True
+            )
+            .select_related("idtarea")
+            .only("idtarea__idtarea", "idtarea__nombretarea")
+        )
+
+        return _crear_alertas(
+            Alerta(
                 idtarea=monitoreo.idtarea,
                 tipoalerta="bloqueo",
                 mensaje=f"La tarea '{monitoreo.idtarea.nombretarea}' parece estar bloqueada. Avance menor al 10% después de una semana.",
                 activa=True,
-                fechacreacion=timezone.now(),
+                fechacreacion=ahora,
             )
-            alertas_creadas += 1
-
-        return alertas_creadas
+            for monitoreo in tareas_bloqueadas.iterator(chunk_size=TAMANO_LOTE_ALERTAS)
+        )
 
 
 # Configurar el logger
 logger = logging.getLogger(__name__)
 
 
+TAMANO_LOTE_NOTIFICACION = 100
+
+
 class NotificacionService:
     @staticmethod
-    def notificar_alerta_a_usuarios(alerta):
-        """Notifica a los usuarios relevantes sobre una alerta"""
-        try:
-            tarea = alerta.idtarea
-            logger.info(
-                f"Procesando alerta: {alerta.idalerta}, tipo: {alerta.tipoalerta}, tarea: {tarea.nombretarea}"
-            )
+    def notificar_alertas(ids_alertas):
+        """
+        Notifica las alertas indicadas que aún no se hayan notificado.
 
-            proyecto = tarea.idrequerimiento.idproyecto
-            logger.info(
-                f"Proyecto relacionado: {proyecto.nombreproyecto}, equipo: {proyecto.idequipo}"
-            )
+        Se procesan en lotes de ``TAMANO_LOTE_NOTIFICACION``. Cada lote bloquea
+        sus alertas pendientes, crea las notificaciones y fija
+        ``fechanotificacion`` en la misma transacción, así que reintentar con
+        los mismos ids no vuelve a notificar. Si un lote falla se deshace
+        entero y sus alertas quedan pendientes. Devuelve el número de
+        notificaciones creadas.
+        """
+        ids = sorted(set(ids_alertas))
+        notificaciones_creadas = 0
+        for inicio in range(0, len(ids), TAMANO_LOTE_NOTIFICACION):
+            lote = ids[inicio : inicio + TAMANO_LOTE_NOTIFICACION]
+            try:
+                with transaction.atomic():
+                    alertas = list(
+                        Alerta.objects.select_for_update(skip_locked=True, of=("self",))
+                        .filter(idalerta__in=lote, fechanotificacion__isnull=True)
+                        .select_related(
+                            "idtarea__idrequerimiento__idproyecto",
+                            "idtarea__tipo_tarea",
+                        )
+                    )
+                    creadas = NotificacionService.notificar_lote(alertas)
+                    Alerta.objects.filter(
+                        idalerta__in=[alerta.idalerta for alerta in alertas]
+                    ).update(fechanotificacion=timezone.now())
+            except Exception:
+                # El lote se deshace: sus alertas siguen pendientes y se
+                # reintentan en la siguiente ejecución
+                logger.warning(f"Lote de {len(lote)} alertas sin notificar")
+                continue
+            notificaciones_creadas += creadas
+        return notificaciones_creadas
 
-            # Buscar usuarios relacionados con el equipo del proyecto
-            usuarios_equipo = Usuario.objects.filter(
-                recursohumano__idrecurso__in=Recurso.objects.filter(
-                    miembro__idequipo=proyecto.idequipo
-                )
-            ).distinct()
-            logger.info(f"Usuarios del equipo encontrados: {usuarios_equipo.count()}")
-
-            # Obtener los recursos asignados a la tarea
-            recursos_tarea = Recurso.objects.filter(tarearecurso__idtarea=tarea.idtarea)
-
-            # Luego obtener los usuarios asociados a esos recursos
-            usuarios_tarea = Usuario.objects.filter(
-                recursohumano__idrecurso__in=recursos_tarea
-            ).distinct()
-            logger.info(
-                f"Usuarios asignados a tarea encontrados: {usuarios_tarea.count()}"
+    @staticmethod
+    def usuarios_por_tarea(ids_tareas):
+        """
+        Usuarios asignados a cada tarea a través de sus recursos humanos.
+
+        Resuelve todas las tareas con una sola consulta sobre
+        ``Tarearecurso``/``Recursohumano`` y devuelve
+        ``({idtarea: {idusuario, ...}}, {idusuario: Usuario})``.
+        """
+        asignaciones = (
+            Tarearecurso.objects.filter(
+                idtarea__in=ids_tareas,
+                idrecurso__recursohumano__idusuario__isnull=False,
             )
+            .values_list("idtarea", "idrecurso__recursohumano__idusuario")
+            .distinct()
+        )
+        por_tarea = {}
+        for idtarea, idusuario in asignaciones:
+            por_tarea.setdefault(idtarea, set()).add(idusuario)
+
+        ids_usuarios = set().union(*por_tarea.values()) if por_tarea else set()
+        usuarios = Usuario.objects.only(
+            "idusuario", "nombreusuario", "email", "notif_sistema", "notif_email"
+        ).in_bulk(ids_usuarios)
+        return por_tarea, usuarios
+
+    @staticmethod
+    def notificar_lote(alertas):
+        """
+        Notifica un conjunto de alertas a los usuarios asignados a sus tareas.
 
-            # Crear notificaciones para cada usuario relevante
-            notificaciones_creadas = 0
-            for usuario in usuarios_tarea:
-                # Solo enviar notificación si el usuario tiene habilitadas las notificaciones
+        Las notificaciones se insertan con un único ``bulk_create`` auditado y
+        los correos se encolan en la bandeja de salida en la misma transacción.
+        Las alertas deben traer cargados ``idtarea``, su proyecto y
+        ``tipo_tarea``. Devuelve el número de notificaciones creadas; si algo
+        falla se propaga la excepción para que la transacción del llamante se
+        deshaga y las alertas no se marquen como notificadas.
+        """
+        if not alertas:
+            return 0
+
+        try:
+            por_tarea, usuarios = NotificacionService.usuarios_por_tarea(
+                {alerta.idtarea_id for alerta in alertas}
+            )
+            ahora = timezone.now()
+            notificaciones = []
+            correos = []
+            for alerta in alertas:
+                tarea = alerta.idtarea
+                destinatarios = [
+                    usuarios[idusuario]
+                    for idusuario in sorted(por_tarea.get(tarea.idtarea, ()))
+                    if idusuario in usuarios
+                ]
                 logger.info(
-                    f"Verificando usuario: {usuario.nombreusuario}, notif_sistema: {usuario.notif_sistema}"
+                    f"Procesando alerta: {alerta.idalerta}, tipo: {alerta.tipoalerta}, "
+                    f"tarea: {tarea.nombretarea}, usuarios asignados: {len(destinatarios)}"
                 )
-                if usuario.notif_sistema:
-                    Notificacion.objects.create(
-                        idusuario=usuario,
-                        mensaje=f"[ALERTA] {alerta.tipoalerta.upper()}: {alerta.mensaje}",
-                        leido=False,
-                        fechacreacion=timezone.now(),
-                        prioridad=(
-                            "alta"
-                            if alerta.tipoalerta in ["bloqueo", "retraso"]
-                            else "media"
-                        ),
-                        categoria=(
-                            "Backend"
-                            if tarea.tipo_tarea and tarea.tipo_tarea.nombre == "Backend"
-                            else "Otro"
-                        ),
-                        archivada=False,
-                    )
-                    notificaciones_creadas += 1
-                    logger.info(f"Notificación creada para: {usuario.nombreusuario}")
+                for usuario in destinatarios:
+                    # Solo crear notificación si el usuario tiene habilitadas las notificaciones
+                    if usuario.notif_sistema:
+                        notificaciones.append(
+                            Notificacion(
+                                idusuario=usuario,
+                                mensaje=f"[ALERTA] {alerta.tipoalerta.upper()}: {alerta.mensaje}",
+                                leido=False,
+                                fechacreacion=ahora,
+                                prioridad=(
+                                    "alta"
+                                    if alerta.tipoalerta in ["bloqueo", "retraso"]
+                                    else "media"
+                                ),
+                                categoria=(
+                                    "Backend"
+                                    if tarea.tipo_tarea
+                                    and tarea.tipo_tarea.nombre == "Backend"
+                                    else "Otro"
+                                ),
+                                archivada=False,
+                            )
+                        )
+                    # Encolar email si está habilitado
+                    if usuario.notif_email:
+                        correos.append((usuario, alerta))
 
-                # Enviar email si está habilitado
-                if usuario.notif_email:
-                    resultado = NotificacionService.enviar_correo_notificacion(
-                        usuario, alerta
-                    )
-                    logger.info(
-                        f"Envío de correo a {usuario.email}: {'éxito' if resultado else 'fallido'}"
-                    )
+            with transaction.atomic():
+                Notificacion.objects.audited_bulk_create(
+                    notificaciones, batch_size=TAMANO_LOTE_NOTIFICACION
+                )
+                for idusuario in {n.idusuario_id for n in notificaciones}:
+                    invalidar_badge(idusuario)
+                # Los correos se guardan en la bandeja de salida en la misma
+                # transacción; el worker de correo los envía
+                if correos:
+                    NotificacionService.enviar_correos_alertas(correos)
 
-            logger.info(f"Total notificaciones creadas: {notificaciones_creadas}")
-            return notificaciones_creadas
+            logger.info(f"Total notificaciones creadas: {len(notificaciones)}")
+            return len(notificaciones)
         except Exception as e:
-            logger.error(f"Error al notificar alerta {alerta.idalerta}: {str(e)}")
-            return 0
+            ids = ", ".join(str(alerta.idalerta) for alerta in alertas)
+            logger.error(f"Error al notificar alertas {ids}: {str(e)}")
+            raise
 
     @staticmethod
-    def enviar_correo_notificacion(usuario, alerta):
-        """Envía notificación por correo si el usuario tiene habilitada esta opción"""
-        if not usuario.notif_email:
-            return False
+    def notificar_alerta_a_usuarios(alerta):
+        """Notifica a los usuarios relevantes sobre una alerta"""
+        return NotificacionService.notificar_lote([alerta])
 
+    @staticmethod
+    def mensaje_correo_alerta(usuario, alerta):
+        """Construye el ``EmailMessage`` de una alerta para un usuario"""
         tarea = alerta.idtarea
         proyecto = tarea.idrequerimiento.idproyecto
 
@@ -194,16 +317,29 @@ class NotificacionService:
         Saludos,
         WebApp-PM
         """
+        return EmailMessage(
+            asunto, mensaje, settings.DEFAULT_FROM_EMAIL, [usuario.email]
+        )
 
-        try:
-            send_mail(
-                asunto,
-                mensaje,
-                settings.DEFAULT_FROM_EMAIL,
-                [usuario.email],
-                fail_silently=False,
+    @staticmethod
+    def enviar_correos_alertas(correos):
+        """
+        Encola en la bandeja de salida los correos ``(usuario, alerta)``.
+
+        Devuelve el número de correos encolados.
+        """
+        return len(
+            encolar_correos(
+                NotificacionService.mensaje_correo_alerta(usuario, alerta)
+                for usuario, alerta in correos
             )
-            return True
-        except Exception as e:
-            print(f"Error enviando correo: {str(e)}")
+        )
+
+    @staticmethod
+    def enviar_correo_notificacion(usuario, alerta):
+        """Encola la notificación por correo si el usuario tiene habilitada esta opción"""
+        if not usuario.notif_email:
             return False
+
+        encolar_correo(NotificacionService.mensaje_correo_alerta(usuario, alerta))
+        return True
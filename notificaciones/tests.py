@@ -1,3 +1,203 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import DatabaseError
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from auditoria.querysets import AuditedQuerySet
+from dashboard.models import (
+    Alerta,
+    CorreoSaliente,
+    Notificacion,
+    Proyecto,
+    Recurso,
+    Recursohumano,
+    Requerimiento,
+    Tarea,
+    Tarearecurso,
+    Tiporecurso,
+    Usuario,
+)
+from . import correo
+from .services import NotificacionService
+
+
+class NotificarAlertasTest(TestCase):
+    """Una alerta solo se marca como notificada si su lote se completa"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: sin señales de auditoría
+        (usuario, _) = Usuario.objects.bulk_create(
+            [
+                Usuario(
+                    nombreusuario="notif-test",
+                    username="notif-test",
+                    email="notif-test@example.com",
+                    contrasena="",
+                    rol="Desarrollador",
+                    notif_sistema=True,
+                    notif_email=True,
+                ),
+                # Autor de la auditoría de las operaciones sin usuario en curso
+                Usuario(
+                    nombreusuario="notif-admin",
+                    username="notif-admin",
+                    email="notif-admin@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                    is_superuser=True,
+                ),
+            ]
+        )
+        (proyecto,) = Proyecto.objects.bulk_create(
+            [Proyecto(nombreproyecto="Proyecto notificaciones")]
+        )
+        (requerimiento,) = Requerimiento.objects.bulk_create(
+            [Requerimiento(descripcion="Requerimiento", idproyecto=proyecto)]
+        )
+        (tarea,) = Tarea.objects.bulk_create(
+            [Tarea(nombretarea="Tarea con alerta", idrequerimiento=requerimiento)]
+        )
+        (tipo,) = Tiporecurso.objects.bulk_create(
+            [Tiporecurso(nametiporecurso="Humano")]
+        )
+        (recurso,) = Recurso.objects.bulk_create(
+            [Recurso(nombrerecurso="Recurso", idtiporecurso=tipo)]
+        )
+        Recursohumano.objects.bulk_create(
+            [Recursohumano(idrecurso=recurso, idusuario=usuario)]
+        )
+        Tarearecurso.objects.bulk_create(
+            [Tarearecurso(idtarea=tarea, idrecurso=recurso)]
+        )
+        (cls.alerta,) = Alerta.objects.bulk_create(
+            [
+                Alerta(
+                    idtarea=tarea,
+                    tipoalerta="retraso",
+                    mensaje="La tarea está retrasada",
+                    activa=True,
+                    fechacreacion=timezone.now(),
+                )
+            ]
+        )
+
+    def _pendiente(self):
+        self.alerta.refresh_from_db()
+        return self.alerta.fechanotificacion is None
+
+    def test_fallo_al_resolver_destinatarios(self):
+        with mock.patch.object(
+            NotificacionService,
+            "usuarios_por_tarea",
+            side_effect=DatabaseError("sin conexión"),
+        ):
+            creadas = NotificacionService.notificar_alertas([self.alerta.idalerta])
+
+        self.assertEqual(creadas, 0)
+        self.assertTrue(self._pendiente())
+
+    def test_fallo_al_insertar_notificaciones(self):
+        with mock.patch.object(
+            AuditedQuerySet,
+            "audited_bulk_create",
+            side_effect=DatabaseError("sin conexión"),
+        ):
+            creadas = NotificacionService.notificar_alertas([self.alerta.idalerta])
+
+        self.assertEqual(creadas, 0)
+        self.assertTrue(self._pendiente())
+        self.assertFalse(Notificacion.objects.exists())
+        self.assertFalse(CorreoSaliente.objects.exists())
+
+    def test_lote_correcto_marca_la_alerta(self):
+        creadas = NotificacionService.notificar_alertas([self.alerta.idalerta])
+
+        self.assertEqual(creadas, 1)
+        self.assertFalse(self._pendiente())
+        self.assertEqual(CorreoSaliente.objects.count(), 1)
+
+        # Reintentar no vuelve a notificar
+        self.assertEqual(
+            NotificacionService.notificar_alertas([self.alerta.idalerta]), 0
+        )
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    NOTIFICACIONES_CORREO_POR_MINUTO=0,
+)
+class ProcesarLoteCorreosTest(TestCase):
+    """Los correos se reservan antes de enviarse y cada resultado se guarda aparte"""
+
+    def setUp(self):
+        self.correos = CorreoSaliente.objects.bulk_create(
+            [
+                CorreoSaliente(
+                    asunto=f"Asunto {i}",
+                    cuerpo="Cuerpo",
+                    destinatarios=[f"destino{i}@example.com"],
+                )
+                for i in range(3)
+            ]
+        )
+
+    def _estados(self):
+        return list(
+            CorreoSaliente.objects.order_by("idcorreo").values_list("estado", flat=True)
+        )
+
+    def test_envio_correcto(self):
+        estados_al_enviar = []
+        enviar = EmailBackend.send_messages
+
+        def send_messages(backend, mensajes):
+            estados_al_enviar.append(self._estados())
+            return enviar(backend, mensajes)
+
+        with mock.patch.object(EmailBackend, "send_messages", send_messages):
+            self.assertEqual(correo.procesar_lote(), (3, 0, 0))
+
+        # Todo el lote ya estaba reservado antes del primer envío
+        self.assertEqual(estados_al_enviar[0], [CorreoSaliente.ENVIANDO] * 3)
+        # y cada resultado se guarda al enviarse
+        self.assertEqual(
+            estados_al_enviar[2],
+            [CorreoSaliente.ENVIADO, CorreoSaliente.ENVIADO, CorreoSaliente.ENVIANDO],
+        )
+        self.assertEqual(self._estados(), [CorreoSaliente.ENVIADO] * 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_fallo_programa_reintento(self):
+        with mock.patch.object(
+            EmailBackend,
+            "send_messages",
+            side_effect=ConnectionError("SMTP no disponible"),
+        ):
+            self.assertEqual(correo.procesar_lote(), (0, 3, 0))
+
+        for fila in CorreoSaliente.objects.all():
+            self.assertEqual(fila.estado, CorreoSaliente.PENDIENTE)
+            self.assertEqual(fila.intentos, 1)
+            self.assertGreater(fila.siguiente_intento, timezone.now())
+        # Hasta que pase la espera no se vuelven a tomar
+        self.assertEqual(correo.procesar_lote(), (0, 0, 0))
+
+    def test_reserva_vencida_se_vuelve_a_tomar(self):
+        CorreoSaliente.objects.update(
+            estado=CorreoSaliente.ENVIANDO,
+            siguiente_intento=timezone.now() - timedelta(seconds=1),
+        )
+        self.assertEqual(correo.procesar_lote(), (3, 0, 0))
+
+    def test_reserva_vigente_no_se_toma(self):
+        CorreoSaliente.objects.filter(idcorreo=self.correos[0].idcorreo).update(
+            estado=CorreoSaliente.ENVIANDO,
+            siguiente_intento=timezone.now() + timedelta(minutes=5),
+        )
+        self.assertEqual(correo.procesar_lote(), (2, 0, 0))
+        self.assertEqual(self._estados()[0], CorreoSaliente.ENVIANDO)
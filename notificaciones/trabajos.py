@@ -0,0 +1,29 @@
+from apscheduler.triggers.interval import IntervalTrigger
+
+from notificaciones.correo import procesar_correos_pendientes
+from notificaciones.cron import verificar_y_crear_alertas
+from notificaciones.scheduler import delete_old_job_executions, registrar_trabajo
+
+# Verificar y crear alertas (cada 6 horas)
+registrar_trabajo(
+    "verificar_alertas",
+    verificar_y_crear_alertas,
+    IntervalTrigger(hours=6),
+    nombre="Verificar y crear alertas",
+)
+
+# Enviar la bandeja de salida de correos (cada minuto)
+registrar_trabajo(
+    "procesar_correos",
+    procesar_correos_pendientes,
+    IntervalTrigger(minutes=1),
+    nombre="Enviar correos pendientes",
+)
+
+# Limpiar historial de ejecuciones (una vez por semana)
+registrar_trabajo(
+    "delete_old_job_executions",
+    delete_old_job_executions,
+    IntervalTrigger(days=7),
+    nombre="Limpiar historial de ejecuciones",
+)
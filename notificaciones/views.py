@@ -12,6 +12,8 @@ from django.db.models.functions import TruncDate
 
 from .services import MonitoreoService, NotificacionService
 
+from dashboard.notificaciones_badge import invalidar_badge
+
 from dashboard.models import (
     Notificacion,
     Alerta,
@@ -545,6 +547,7 @@ def marcar_leida(request, id):
         notificacion = get_object_or_404(Notificacion, idnotificacion=id)
         notificacion.leido = True
         notificacion.save()
+        invalidar_badge(notificacion.idusuario_id)
 
         # Crear registro en historial
         Historialnotificacion.objects.create(
@@ -600,20 +603,26 @@ def marcar_todas_leidas(request):
             notificaciones = Notificacion.objects.filter(
                 idusuario=request.user, leido=False
             )
+            ids = list(notificaciones.values_list("idnotificacion", flat=True))
 
-            # Marcar como leídas
-            for notif in notificaciones:
-                notif.leido = True
-                notif.save()
-
-                # Registrar en historial
-                Historialnotificacion.objects.create(
-                    idnotificacion=notif, fechalectura=timezone.now()
-                )
+            # Marcar como leídas en una sola operación auditada
+            total = Notificacion.objects.filter(idnotificacion__in=ids).audited_update(
+                user=request.user, leido=True
+            )
 
-            messages.success(
-                request, f"{notificaciones.count()} notificaciones marcadas como leídas"
+            # Registrar en historial
+            fechalectura = timezone.now()
+            Historialnotificacion.objects.bulk_create(
+                [
+                    Historialnotificacion(
+                        idnotificacion_id=idnotificacion, fechalectura=fechalectura
+                    )
+                    for idnotificacion in ids
+                ]
             )
+            invalidar_badge(request.user.pk)
+
+            messages.success(request, f"{total} notificaciones marcadas como leídas")
             return redirect("notificaciones:index")
 
         except Exception as e:
@@ -640,6 +649,7 @@ def archivar_notificacion(request, id):
             ):
                 notificacion.archivada = True
                 notificacion.save()
+                invalidar_badge(notificacion.idusuario_id)
                 messages.success(request, "Notificación archivada correctamente")
             else:
                 messages.error(
@@ -1085,31 +1095,22 @@ def generar_alertas(request):
         alertas_nuevas = []
 
         if tipo == "retrasadas":
-            alertas_creadas = MonitoreoService.verificar_tareas_retrasadas()
-            alertas_nuevas = Alerta.objects.filter(
-                tipoalerta="retraso",
-                fechacreacion__gte=timezone.now() - timedelta(minutes=10),
-            )
+            alertas_nuevas = MonitoreoService.verificar_tareas_retrasadas()
+            alertas_creadas = len(alertas_nuevas)
             messages.success(
                 request,
                 f"Se han generado {alertas_creadas} alertas de tareas retrasadas",
             )
         elif tipo == "presupuesto":
-            alertas_creadas = MonitoreoService.verificar_presupuesto_excedido()
-            alertas_nuevas = Alerta.objects.filter(
-                tipoalerta="presupuesto",
-                fechacreacion__gte=timezone.now() - timedelta(minutes=10),
-            )
+            alertas_nuevas = MonitoreoService.verificar_presupuesto_excedido()
+            alertas_creadas = len(alertas_nuevas)
             messages.success(
                 request,
                 f"Se han generado {alertas_creadas} alertas de presupuesto excedido",
             )
         elif tipo == "bloqueo":
-            alertas_creadas = MonitoreoService.verificar_tareas_bloqueadas()
-            alertas_nuevas = Alerta.objects.filter(
-                tipoalerta="bloqueo",
-                fechacreacion__gte=timezone.now() - timedelta(minutes=10),
-            )
+            alertas_nuevas = MonitoreoService.verificar_tareas_bloqueadas()
+            alertas_creadas = len(alertas_nuevas)
             messages.success(
                 request,
                 f"Se han generado {alertas_creadas} alertas de tareas bloqueadas",
@@ -1118,18 +1119,14 @@ def generar_alertas(request):
             alertas_retraso = MonitoreoService.verificar_tareas_retrasadas()
             alertas_presupuesto = MonitoreoService.verificar_presupuesto_excedido()
             alertas_bloqueo = MonitoreoService.verificar_tareas_bloqueadas()
-            alertas_creadas = alertas_retraso + alertas_presupuesto + alertas_bloqueo
-            alertas_nuevas = Alerta.objects.filter(
-                fechacreacion__gte=timezone.now() - timedelta(minutes=10)
-            )
+            alertas_nuevas = alertas_retraso + alertas_presupuesto + alertas_bloqueo
+            alertas_creadas = len(alertas_nuevas)
             messages.success(
                 request, f"Se han generado {alertas_creadas} alertas en total"
             )
 
-        # Notificar a los usuarios para cada alerta creada
-        for alerta in alertas_nuevas:
-            notif_count = NotificacionService.notificar_alerta_a_usuarios(alerta)
-            notificaciones_creadas += notif_count
+        # Notificar a los usuarios exactamente las alertas creadas
+        notificaciones_creadas = NotificacionService.notificar_alertas(alertas_nuevas)
 
         if notificaciones_creadas > 0:
             messages.success(
@@ -17,6 +17,11 @@ django.setup()
 from dashboard.models import TipoTarea, Fase
 
 
+def _o_defecto(serie, defecto):
+    """Equivalente vectorizado de ``valor or defecto`` (nulos y ceros)"""
+    return serie.where(serie.notna() & (serie != 0), defecto)
+
+
 class DataProcessor:
     def __init__(self, data_path=None, use_db=False):
         """Inicializa el procesador de datos.
@@ -272,13 +277,24 @@ class DataProcessor:
         Returns:
             np.array: Datos procesados listos para el modelo
         """
+        return self.process_tasks([task_data])
+
+    def process_tasks(self, tasks_data):
+        """Procesa varias tareas para predecirlas en una sola pasada del modelo
+
+        Args:
+            tasks_data: Lista de diccionarios con datos de cada tarea
+
+        Returns:
+            np.array: Una fila por tarea, en el mismo orden
+        """
         if not hasattr(self, "scalers") or not hasattr(self, "encoders"):
             raise ValueError(
                 "Preprocessors no cargados. Ejecute load_preprocessors primero."
             )
 
-        # Crear un DataFrame de una sola fila
-        task_df = pd.DataFrame([task_data])
+        # Crear un DataFrame con una fila por tarea
+        task_df = pd.DataFrame(list(tasks_data))
 
         # Rellenar valores faltantes en los recursos
         for i in range(1, 4):
@@ -289,6 +305,7 @@ class DataProcessor:
                 task_df[carga_col] = 0
             if exp_col not in task_df.columns:
                 task_df[exp_col] = 0
+            task_df[[carga_col, exp_col]] = task_df[[carga_col, exp_col]].fillna(0)
 
         # Características numéricas
         numeric_features = [
@@ -332,65 +349,84 @@ class DataProcessor:
         print("Recolectando datos desde la base de datos...")
 
         try:
-            from dashboard.models import (
-                Tarea,
-                TipoTarea,
-                Fase,
-                Tarearecurso,
-                Recursohumano,
-            )
+            import pyarrow.compute as pc
 
-            # Obtener tareas completadas con duración registrada
-            tareas = Tarea.objects.filter(
-                estado="Completada", duracionactual__isnull=False
-            ).select_related("tipo_tarea", "fase", "idrequerimiento")
+            from dashboard.models import Tarea
+            from reporte.columnar import tabla_tareas
+
+            # Tareas completadas con duración registrada, con sus recursos y
+            # fase, leídas por lotes en formato columnar
+            tabla = tabla_tareas(
+                Tarea.objects.filter(estado="Completada", duracionactual__isnull=False)
+            )
 
-            if not tareas.exists():
+            if tabla.num_rows == 0:
                 print("No hay tareas completadas con duración registrada")
                 return None
 
-            # Preparar datos
-            data = []
-            for tarea in tareas:
-                # Obtener recursos asignados
-                recursos = Tarearecurso.objects.filter(idtarea=tarea)
-                cantidad_recursos = recursos.count() or 1
-
-                # Información de recursos (hasta 3)
-                carga_trabajo = [0, 0, 0]
-                experiencia = [0, 0, 0]
-
-                for i, recurso_asignacion in enumerate(recursos[:3]):
-                    carga_trabajo[i] = recurso_asignacion.idrecurso.carga_trabajo or 1
-                    experiencia[i] = recurso_asignacion.experiencia or 3
-
-                # Determinar tipo de tarea y fase
-                tipo_tarea = tarea.tipo_tarea.nombre if tarea.tipo_tarea else "Backend"
-                fase = tarea.fase.nombre if tarea.fase else "Construcción/Desarrollo"
-
-                # Agregar al dataset
-                data.append(
-                    {
-                        "ID": tarea.idtarea,
-                        "Complejidad": tarea.dificultad or 3,
-                        "Tipo_Tarea": tipo_tarea,
-                        "Fase_Tarea": fase,
-                        "Cantidad_Recursos": cantidad_recursos,
-                        "Carga_Trabajo_R1": carga_trabajo[0],
-                        "Experiencia_R1": experiencia[0],
-                        "Carga_Trabajo_R2": carga_trabajo[1],
-                        "Experiencia_R2": experiencia[1],
-                        "Carga_Trabajo_R3": carga_trabajo[2],
-                        "Experiencia_R3": experiencia[2],
-                        "Experiencia_Equipo": 3,  # Valor por defecto
-                        "Claridad_Requisitos": tarea.claridad_requisitos or 0.7,
-                        "Tamaño_Tarea": tarea.tamaño_estimado or 5,
-                        "Tiempo_Ejecucion": tarea.duracionactual,
-                    }
+            tareas = tabla.select(
+                [
+                    "idtarea",
+                    "dificultad",
+                    "tipo_tarea",
+                    "fase",
+                    "cantidad_recursos",
+                    "claridad_requisitos",
+                    "tamaño_estimado",
+                    "duracionactual",
+                ]
+            ).to_pandas()
+
+            # Información de recursos (hasta 3): una fila por asignación
+            recursos = tabla.column("recursos").combine_chunks()
+            asignaciones = pc.list_flatten(recursos)
+            asignaciones = pd.DataFrame(
+                {
+                    "fila": pc.list_parent_indices(recursos).to_numpy(),
+                    "carga_trabajo": _o_defecto(
+                        asignaciones.field("carga_trabajo").to_pandas(), 1
+                    ),
+                    "experiencia": _o_defecto(
+                        asignaciones.field("experiencia").to_pandas(), 3
+                    ),
+                }
+            )
+            asignaciones["posicion"] = asignaciones.groupby("fila").cumcount()
+            asignaciones = asignaciones[asignaciones["posicion"] < 3]
+
+            def _por_posicion(columna):
+                return (
+                    asignaciones.pivot(index="fila", columns="posicion", values=columna)
+                    .reindex(index=range(len(tareas)), columns=range(3))
+                    .fillna(0)
                 )
 
-            # Crear DataFrame
-            df = pd.DataFrame(data)
+            carga_trabajo = _por_posicion("carga_trabajo")
+            experiencia = _por_posicion("experiencia").astype(int)
+
+            df = pd.DataFrame(
+                {
+                    "ID": tareas["idtarea"],
+                    "Complejidad": _o_defecto(tareas["dificultad"], 3).astype(int),
+                    "Tipo_Tarea": tareas["tipo_tarea"].fillna("Backend"),
+                    "Fase_Tarea": tareas["fase"].fillna("Construcción/Desarrollo"),
+                    "Cantidad_Recursos": _o_defecto(tareas["cantidad_recursos"], 1),
+                    "Carga_Trabajo_R1": carga_trabajo[0],
+                    "Experiencia_R1": experiencia[0],
+                    "Carga_Trabajo_R2": carga_trabajo[1],
+                    "Experiencia_R2": experiencia[1],
+                    "Carga_Trabajo_R3": carga_trabajo[2],
+                    "Experiencia_R3": experiencia[2],
+                    "Experiencia_Equipo": 3,  # Valor por defecto
+                    "Claridad_Requisitos": _o_defecto(
+                        tareas["claridad_requisitos"], 0.7
+                    ),
+                    "Tamaño_Tarea": _o_defecto(tareas["tamaño_estimado"], 5).astype(
+                        int
+                    ),
+                    "Tiempo_Ejecucion": tareas["duracionactual"],
+                }
+            )
             print(f"Dataset creado con {len(df)} registros")
 
             # Guardar CSV si se especificó una ruta
@@ -15,6 +15,14 @@ class EstimacionService:
 
     _instance = None
 
+    # Claves que necesita DataProcessor.process_tasks (modelo avanzado)
+    CLAVES_MODELO_AVANZADO = [
+        "Complejidad",
+        "Tipo_Tarea",
+        "Fase_Tarea",
+        "Cantidad_Recursos",
+    ]
+
     def __new__(cls):
         """Implementa patrón singleton para no recargar el modelo constantemente"""
         if cls._instance is None:
@@ -122,6 +130,9 @@ class EstimacionService:
         if not self.model:
             raise Exception("El modelo de estimación no está disponible")
 
+        if self.model_type == "advanced":
+            return self._estimar_lote_avanzado([tarea_data])[0]
+
         try:
             # Log para depuración de los datos recibidos
             logger.debug(f"Datos recibidos para estimación: {tarea_data}")
@@ -138,57 +149,113 @@ class EstimacionService:
                     logger.error(f"Falta la clave {key} en los datos de entrada")
                     raise ValueError(f"Falta parámetro necesario: {key}")
 
-            # Preparar datos para el modelo según el tipo
-            if self.model_type == "advanced":
-                # Procesar datos para modelo avanzado
-                X = self.processor.process_single_task(tarea_data)
-                logger.debug(f"Datos procesados para modelo avanzado: {X}")
-                prediction = self.model.predict(X, self.feature_dims)
-                tiempo_estimado = float(prediction[0])
-
-                return {
-                    "tiempo_estimado": tiempo_estimado,
-                    "unidad": "horas",
-                    "modelo": "RNN avanzado",
-                    "confianza": 0.85,  # Valor hipotético, idealmente calculado del modelo
-                }
-            else:
-                # Procesar datos para modelo básico
-                numeric_data = np.array(
-                    [[tarea_data.get("complejidad", 3), tarea_data.get("prioridad", 2)]]
-                )
+            # Procesar datos para modelo básico
+            numeric_data = np.array(
+                [[tarea_data.get("complejidad", 3), tarea_data.get("prioridad", 2)]]
+            )
 
-                # Normalizar datos numéricos
-                X_num = self.scalers.transform(numeric_data)
+            # Normalizar datos numéricos
+            X_num = self.scalers.transform(numeric_data)
 
-                # Procesar tipo de tarea
-                tipo_tarea = tarea_data.get("tipo_tarea", "backend")
-                X_task = np.array(
-                    [[self.encoders.texts_to_sequences([tipo_tarea])[0][0]]]
-                )
+            # Procesar tipo de tarea
+            tipo_tarea = tarea_data.get("tipo_tarea", "backend")
+            X_task = np.array([[self.encoders.texts_to_sequences([tipo_tarea])[0][0]]])
 
-                # Procesar datos del requerimiento (información contextual)
-                X_req = np.array(
+            # Procesar datos del requerimiento (información contextual)
+            X_req = np.array(
+                [
                     [
-                        [
-                            tarea_data.get("complejidad_req", 3),
-                            tarea_data.get("max_complejidad_req", 5),
-                            tarea_data.get("num_tareas_req", 5),
-                            tarea_data.get("prioridad_media_req", 2),
-                        ]
+                        tarea_data.get("complejidad_req", 3),
+                        tarea_data.get("max_complejidad_req", 5),
+                        tarea_data.get("num_tareas_req", 5),
+                        tarea_data.get("prioridad_media_req", 2),
                     ]
-                )
+                ]
+            )
 
-                prediction = self.model.predict(X_num, X_task, X_req)
-                tiempo_estimado = float(prediction[0][0])
+            prediction = self.model.predict(X_num, X_task, X_req)
+            tiempo_estimado = float(prediction[0][0])
 
-                return {
-                    "tiempo_estimado": tiempo_estimado,
-                    "unidad": "horas",
-                    "modelo": "Modelo básico",
-                    "confianza": 0.7,  # Valor hipotético
-                }
+            return {
+                "tiempo_estimado": tiempo_estimado,
+                "unidad": "horas",
+                "modelo": "Modelo básico",
+                "confianza": 0.7,  # Valor hipotético
+            }
 
         except Exception as e:
             logger.error(f"Error al estimar tiempo: {e}")
             raise Exception(f"Error en la estimación de tiempo: {str(e)}")
+
+    def estimar_tiempo_tareas(self, tareas_data):
+        """
+        Estima el tiempo de varias tareas con una sola pasada del modelo
+
+        Args:
+            tareas_data: Lista de diccionarios con las características de cada
+                tarea (claves de DataProcessor.process_tasks)
+
+        Returns:
+            list: Un resultado por tarea, en el mismo orden. Las tareas que no
+                se pueden estimar devuelven ``{"error": mensaje}``
+        """
+        if not self.model:
+            raise Exception("El modelo de estimación no está disponible")
+
+        if self.model_type != "advanced":
+            # El modelo básico no admite lotes: se estima tarea a tarea y el
+            # error de una no impide devolver las demás
+            resultados = []
+            for datos in tareas_data:
+                try:
+                    resultados.append(self.estimar_tiempo_tarea(datos))
+                except Exception as e:
+                    resultados.append({"error": str(e)})
+            return resultados
+
+        tareas_data = list(tareas_data)
+        if not tareas_data:
+            return []
+
+        try:
+            return self._estimar_lote_avanzado(tareas_data)
+        except Exception as e:
+            if len(tareas_data) == 1:
+                return [{"error": str(e)}]
+
+        # Una tarea con datos inválidos no debe descartar el lote: se repite
+        # tarea a tarea para aislar el error
+        resultados = []
+        for datos in tareas_data:
+            try:
+                resultados.extend(self._estimar_lote_avanzado([datos]))
+            except Exception as e:
+                resultados.append({"error": str(e)})
+        return resultados
+
+    def _estimar_lote_avanzado(self, tareas_data):
+        """Una sola pasada del modelo avanzado; un error afecta a todo el lote"""
+        try:
+            # Verificamos que las claves necesarias existan en todas las tareas
+            for indice, datos in enumerate(tareas_data):
+                for key in self.CLAVES_MODELO_AVANZADO:
+                    if key not in datos:
+                        logger.error(f"Falta la clave {key} en la tarea {indice}")
+                        raise ValueError(f"Falta parámetro necesario: {key}")
+
+            # Una matriz con todas las tareas y una sola predicción
+            X = self.processor.process_tasks(tareas_data)
+            predictions = self.model.predict(X, self.feature_dims)
+        except Exception as e:
+            logger.error(f"Error al estimar tiempo: {e}")
+            raise Exception(f"Error en la estimación de tiempo: {str(e)}")
+
+        return [
+            {
+                "tiempo_estimado": float(prediction),
+                "unidad": "horas",
+                "modelo": "RNN avanzado",
+                "confianza": 0.85,  # Valor hipotético, idealmente calculado del modelo
+            }
+            for prediction in predictions
+        ]
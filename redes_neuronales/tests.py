@@ -7,6 +7,11 @@ import json
 from django.db.models.signals import pre_save, post_save, post_delete
 from unittest.mock import patch
 
+import numpy as np
+import pandas as pd
+
+from redes_neuronales.services import EstimacionService
+
 
 # Función para escribir en la caché desde un proceso separado
 def write_to_cache(cache_key, data):
@@ -283,3 +288,229 @@ class TrainingLogSystemTest(RedisTestCase):
         self.assertTrue(
             has_epoch_log, "No se encontró el log de época esperado en los eventos"
         )
+
+
+class ProcesadorFalso:
+    """Una fila por tarea con su complejidad; falla con un tipo desconocido"""
+
+    def process_tasks(self, tareas_data):
+        for datos in tareas_data:
+            if datos["Tipo_Tarea"] not in ("Backend", "Frontend"):
+                raise ValueError(f"Tipo de tarea desconocido: {datos['Tipo_Tarea']}")
+        return np.array([[datos["Complejidad"], 1.0] for datos in tareas_data])
+
+
+class ModeloFalso:
+    """Predice el doble de la primera columna y registra cada llamada"""
+
+    def __init__(self):
+        self.llamadas = []
+
+    def predict(self, X, feature_dims):
+        self.llamadas.append(X)
+        return X[:, 0] * 2
+
+
+class EstimacionServiceLoteTest(TestCase):
+    """Estimación de varias tareas con los modelos básico y avanzado"""
+
+    def _servicio_avanzado(self):
+        # Instancia sin cargar modelos (no el singleton)
+        servicio = object.__new__(EstimacionService)
+        servicio.model = ModeloFalso()
+        servicio.processor = ProcesadorFalso()
+        servicio.feature_dims = None
+        servicio.model_type = "advanced"
+        return servicio
+
+    def _tareas(self, *tipos):
+        return [
+            {
+                "Complejidad": complejidad,
+                "Tipo_Tarea": tipo,
+                "Fase_Tarea": "Desarrollo",
+                "Cantidad_Recursos": 1,
+            }
+            for complejidad, tipo in enumerate(tipos, start=1)
+        ]
+
+    def test_modelo_avanzado_una_sola_prediccion(self):
+        servicio = self._servicio_avanzado()
+        tareas = self._tareas(*["Backend", "Frontend"] * 5)
+
+        resultados = servicio.estimar_tiempo_tareas(tareas)
+
+        self.assertEqual(len(servicio.model.llamadas), 1)
+        self.assertEqual(servicio.model.llamadas[0].shape[0], len(tareas))
+        self.assertEqual(
+            [r["tiempo_estimado"] for r in resultados],
+            [2.0 * i for i in range(1, len(tareas) + 1)],
+        )
+
+    def test_error_del_lote_avanzado_se_aisla_por_tarea(self):
+        servicio = self._servicio_avanzado()
+        tareas = self._tareas("Backend", "Desconocido", "Frontend")
+
+        resultados = servicio.estimar_tiempo_tareas(tareas)
+
+        self.assertEqual(resultados[0]["tiempo_estimado"], 2.0)
+        self.assertIn("Tipo de tarea desconocido", resultados[1]["error"])
+        self.assertEqual(resultados[2]["tiempo_estimado"], 6.0)
+        # El lote completo falla antes de predecir; después, una por tarea
+        self.assertEqual([X.shape[0] for X in servicio.model.llamadas], [1, 1])
+
+    def test_error_de_una_tarea_no_descarta_las_demas(self):
+        # Instancia sin cargar modelos (no el singleton)
+        servicio = object.__new__(EstimacionService)
+        servicio.model = object()
+        servicio.model_type = "basic"
+        correcta = {"tiempo_estimado": 4.0, "unidad": "horas"}
+
+        with patch.object(
+            EstimacionService,
+            "estimar_tiempo_tarea",
+            side_effect=[correcta, ValueError("Falta parámetro necesario: fase_tarea")],
+        ):
+            resultados = servicio.estimar_tiempo_tareas([{}, {}])
+
+        self.assertEqual(
+            resultados,
+            [correcta, {"error": "Falta parámetro necesario: fase_tarea"}],
+        )
+
+
+def _dataset_por_bucle():
+    """Dataset de entrenamiento calculado como antes, tarea a tarea"""
+    from dashboard.models import Tarea, Tarearecurso
+
+    data = []
+    tareas = Tarea.objects.filter(
+        estado="Completada", duracionactual__isnull=False
+    ).select_related("tipo_tarea", "fase")
+    for tarea in tareas.order_by("idtarea"):
+        recursos = Tarearecurso.objects.filter(idtarea=tarea).order_by("idtarearecurso")
+        carga_trabajo = [0, 0, 0]
+        experiencia = [0, 0, 0]
+        for i, asignacion in enumerate(recursos[:3]):
+            carga_trabajo[i] = asignacion.idrecurso.carga_trabajo or 1
+            experiencia[i] = asignacion.experiencia or 3
+        data.append(
+            {
+                "ID": tarea.idtarea,
+                "Complejidad": tarea.dificultad or 3,
+                "Tipo_Tarea": (
+                    tarea.tipo_tarea.nombre if tarea.tipo_tarea else "Backend"
+                ),
+                "Fase_Tarea": (
+                    tarea.fase.nombre if tarea.fase else "Construcción/Desarrollo"
+                ),
+                "Cantidad_Recursos": recursos.count() or 1,
+                "Carga_Trabajo_R1": carga_trabajo[0],
+                "Experiencia_R1": experiencia[0],
+                "Carga_Trabajo_R2": carga_trabajo[1],
+                "Experiencia_R2": experiencia[1],
+                "Carga_Trabajo_R3": carga_trabajo[2],
+                "Experiencia_R3": experiencia[2],
+                "Experiencia_Equipo": 3,
+                "Claridad_Requisitos": tarea.claridad_requisitos or 0.7,
+                "Tamaño_Tarea": tarea.tamaño_estimado or 5,
+                "Tiempo_Ejecucion": tarea.duracionactual,
+            }
+        )
+    return pd.DataFrame(data)
+
+
+class CargaDatosBDTest(TestCase):
+    """``DataProcessor.load_data_from_db`` coincide con el cálculo tarea a tarea"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from dashboard.models import (
+            Fase,
+            Proyecto,
+            Recurso,
+            Requerimiento,
+            Tarea,
+            Tarearecurso,
+            Tiporecurso,
+            TipoTarea,
+        )
+
+        # bulk_create: sin señales de auditoría
+        (proyecto,) = Proyecto.objects.bulk_create(
+            [Proyecto(nombreproyecto="Proyecto Dataset")]
+        )
+        (requerimiento,) = Requerimiento.objects.bulk_create(
+            [Requerimiento(descripcion="Requerimiento Dataset", idproyecto=proyecto)]
+        )
+        (tipo_tarea,) = TipoTarea.objects.bulk_create([TipoTarea(nombre="Frontend")])
+        (fase,) = Fase.objects.bulk_create([Fase(nombre="Pruebas", orden=1)])
+        (tipo_recurso,) = Tiporecurso.objects.bulk_create(
+            [Tiporecurso(nametiporecurso="Humano")]
+        )
+        # Cargas nulas y 0 cuentan como 1
+        recursos = Recurso.objects.bulk_create(
+            [
+                Recurso(
+                    nombrerecurso=f"Recurso {i}",
+                    idtiporecurso=tipo_recurso,
+                    carga_trabajo=carga,
+                )
+                for i, carga in enumerate((0.5, None, 0.0, 0.8, 0.25))
+            ]
+        )
+        # 0, 1 y más de 3 asignaciones; valores nulos con sus valores por defecto
+        tareas = Tarea.objects.bulk_create(
+            [
+                Tarea(
+                    nombretarea=f"Tarea {i}",
+                    estado="Completada",
+                    duracionactual=10 + i,
+                    dificultad=None if i == 0 else i,
+                    claridad_requisitos=None if i == 1 else 0.9,
+                    tamaño_estimado=None if i == 2 else 3,
+                    tipo_tarea=tipo_tarea if i % 2 else None,
+                    fase=fase if i % 2 == 0 else None,
+                    idrequerimiento=requerimiento,
+                )
+                for i in range(3)
+            ]
+            # No entran en el dataset
+            + [
+                Tarea(
+                    nombretarea="Pendiente",
+                    estado="Pendiente",
+                    duracionactual=4,
+                    idrequerimiento=requerimiento,
+                ),
+                Tarea(
+                    nombretarea="Sin duración",
+                    estado="Completada",
+                    idrequerimiento=requerimiento,
+                ),
+            ]
+        )
+        asignaciones = {tareas[1]: recursos[:1], tareas[2]: recursos}
+        Tarearecurso.objects.bulk_create(
+            [
+                Tarearecurso(
+                    idtarea=tarea,
+                    idrecurso=recurso,
+                    experiencia=None if j == 1 else j + 1,
+                )
+                for tarea, asignados in asignaciones.items()
+                for j, recurso in enumerate(asignados)
+            ]
+        )
+
+    def test_igual_que_tarea_a_tarea(self):
+        from redes_neuronales.estimacion_tiempo.data_processor import DataProcessor
+
+        df = DataProcessor().load_data_from_db()
+
+        esperado = _dataset_por_bucle()
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df["Cantidad_Recursos"].tolist(), [1, 1, 5])
+        pd.testing.assert_frame_equal(
+            df.reset_index(drop=True), esperado, check_dtype=False
+        )
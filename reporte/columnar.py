@@ -0,0 +1,224 @@
+"""
+Exportación columnar (Parquet / Arrow) de tareas con sus recursos y fase.
+
+Pensada para extracciones masivas (análisis y entrenamiento de modelos): las
+tareas se leen por bloques con ``iterator`` y cada bloque se convierte en un
+``RecordBatch`` de Arrow con ``ESQUEMA``. Los recursos asignados de cada tarea
+van en la columna ``recursos`` (lista de structs), con una consulta por bloque.
+
+``lotes_tareas`` produce los lotes; ``escribir`` los guarda en un archivo y
+``transmitir`` los entrega como bytes para una respuesta HTTP en streaming, sin
+construir el archivo completo en memoria.
+"""
+
+from itertools import islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dashboard.models import Tarearecurso
+from reporte.datos import TAMANO_LOTE_TAREAS
+
+PARQUET = "parquet"
+ARROW = "arrow"
+
+FORMATOS = {
+    PARQUET: {"extension": "parquet", "content_type": "application/vnd.apache.parquet"},
+    ARROW: {
+        "extension": "arrows",
+        "content_type": "application/vnd.apache.arrow.stream",
+    },
+}
+
+COMPRESION = "zstd"
+
+RECURSO = pa.struct(
+    [
+        ("idrecurso", pa.int32()),
+        ("nombrerecurso", pa.string()),
+        ("cantidad", pa.int32()),
+        ("experiencia", pa.int32()),
+        ("carga_trabajo", pa.float64()),
+    ]
+)
+
+# Columna del esquema -> campo de ``Tarea.objects.values()``
+CAMPOS_TAREA = {
+    "idtarea": "idtarea",
+    "nombretarea": "nombretarea",
+    "estado": "estado",
+    "prioridad": "prioridad",
+    "dificultad": "dificultad",
+    "duracionestimada": "duracionestimada",
+    "duracionactual": "duracionactual",
+    "claridad_requisitos": "claridad_requisitos",
+    "tamaño_estimado": "tamaño_estimado",
+    "costoestimado": "costoestimado",
+    "costoactual": "costoactual",
+    "fechainicio": "fechainicio",
+    "fechafin": "fechafin",
+    "fechacreacion": "fechacreacion",
+    "fechamodificacion": "fechamodificacion",
+    "idrequerimiento": "idrequerimiento",
+    "idproyecto": "idrequerimiento__idproyecto",
+    "nombreproyecto": "idrequerimiento__idproyecto__nombreproyecto",
+    "idtipotarea": "tipo_tarea",
+    "tipo_tarea": "tipo_tarea__nombre",
+    "idfase": "fase",
+    "fase": "fase__nombre",
+    "fase_orden": "fase__orden",
+}
+
+ESQUEMA = pa.schema(
+    [
+        ("idtarea", pa.int32()),
+        ("nombretarea", pa.string()),
+        ("estado", pa.string()),
+        ("prioridad", pa.int32()),
+        ("dificultad", pa.int32()),
+        ("duracionestimada", pa.int32()),
+        ("duracionactual", pa.int32()),
+        ("claridad_requisitos", pa.float64()),
+        ("tamaño_estimado", pa.int32()),
+        ("costoestimado", pa.decimal128(15, 2)),
+        ("costoactual", pa.decimal128(15, 2)),
+        ("fechainicio", pa.date32()),
+        ("fechafin", pa.date32()),
+        ("fechacreacion", pa.timestamp("us", tz="UTC")),
+        ("fechamodificacion", pa.timestamp("us", tz="UTC")),
+        ("idrequerimiento", pa.int32()),
+        ("idproyecto", pa.int32()),
+        ("nombreproyecto", pa.string()),
+        ("idtipotarea", pa.int32()),
+        ("tipo_tarea", pa.string()),
+        ("idfase", pa.int32()),
+        ("fase", pa.string()),
+        ("fase_orden", pa.int32()),
+        ("cantidad_recursos", pa.int32()),
+        ("recursos", pa.list_(RECURSO)),
+    ]
+)
+
+
+def _recursos_por_tarea(ids):
+    """``{idtarea: [recurso, ...]}`` de un bloque de tareas en una consulta"""
+    filas = (
+        Tarearecurso.objects.filter(idtarea__in=ids)
+        .order_by("idtarea", "idtarearecurso")
+        .values_list(
+            "idtarea",
+            "idrecurso",
+            "idrecurso__nombrerecurso",
+            "cantidad",
+            "experiencia",
+            "idrecurso__carga_trabajo",
+        )
+    )
+    recursos = {}
+    for idtarea, idrecurso, nombre, cantidad, experiencia, carga in filas:
+        recursos.setdefault(idtarea, []).append(
+            {
+                "idrecurso": idrecurso,
+                "nombrerecurso": nombre,
+                "cantidad": cantidad,
+                "experiencia": experiencia,
+                "carga_trabajo": carga,
+            }
+        )
+    return recursos
+
+
+def _lote(filas):
+    recursos = _recursos_por_tarea([fila["idtarea"] for fila in filas])
+    columnas = {
+        columna: [fila[campo] for fila in filas]
+        for columna, campo in CAMPOS_TAREA.items()
+    }
+    columnas["recursos"] = [recursos.get(fila["idtarea"], []) for fila in filas]
+    columnas["cantidad_recursos"] = [len(r) for r in columnas["recursos"]]
+    return pa.RecordBatch.from_pydict(columnas, schema=ESQUEMA)
+
+
+def lotes_tareas(tareas, tamano=TAMANO_LOTE_TAREAS):
+    """
+    Recorre el queryset ``tareas`` por bloques de ``tamano`` y produce un
+    ``RecordBatch`` por bloque (dos consultas por bloque: tareas y recursos).
+    """
+    filas = (
+        tareas.order_by("idtarea")
+        .values(*CAMPOS_TAREA.values())
+        .iterator(chunk_size=tamano)
+    )
+    while bloque := list(islice(filas, tamano)):
+        yield _lote(bloque)
+
+
+def tabla_tareas(tareas, tamano=TAMANO_LOTE_TAREAS):
+    """Todas las tareas del queryset en una ``pyarrow.Table``"""
+    return pa.Table.from_batches(list(lotes_tareas(tareas, tamano)), schema=ESQUEMA)
+
+
+def _escritor(destino, formato):
+    if formato == PARQUET:
+        return pq.ParquetWriter(destino, ESQUEMA, compression=COMPRESION)
+    if formato == ARROW:
+        return pa.ipc.new_stream(
+            destino, ESQUEMA, options=pa.ipc.IpcWriteOptions(compression=COMPRESION)
+        )
+    raise ValueError(f"Formato no soportado: {formato}")
+
+
+def escribir(lotes, destino, formato=PARQUET):
+    """Escribe los lotes en ``destino`` (ruta o archivo). Devuelve las filas escritas"""
+    filas = 0
+    with _escritor(destino, formato) as escritor:
+        for lote in lotes:
+            escritor.write_batch(lote)
+            filas += lote.num_rows
+    return filas
+
+
+class _Buffer:
+    """Archivo de solo escritura que acumula los bytes hasta que se recogen"""
+
+    closed = False
+
+    def __init__(self):
+        self.partes = []
+        self.posicion = 0
+
+    def write(self, datos):
+        self.partes.append(bytes(datos))
+        self.posicion += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.posicion
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def recoger(self):
+        datos = b"".join(self.partes)
+        self.partes = []
+        return datos
+
+
+def transmitir(lotes, formato=PARQUET):
+    """
+    Genera el archivo por partes: tras cada lote se entrega lo que el escritor
+    ya ha volcado (en Parquet, un row group por lote).
+    """
+    buffer = _Buffer()
+    escritor = _escritor(buffer, formato)
+    try:
+        for lote in lotes:
+            escritor.write_batch(lote)
+            if datos := buffer.recoger():
+                yield datos
+    finally:
+        escritor.close()
+    yield buffer.recoger()
@@ -0,0 +1,545 @@
+"""
+Fuente de datos común de los reportes.
+
+``ReportDataSource`` interpreta una sola vez los filtros de un reporte (tipo,
+rango de fechas y proyecto) y ofrece sobre ellos:
+
+- ``tareas``: el queryset filtrado, sin evaluar.
+- ``iterar_tareas``: recorrido por bloques con los recursos de cada bloque.
+- ``iterar_recursos`` / ``iterar_costos``: filas ya agregadas en la base de datos.
+- ``estadisticas_*`` y ``version_datos``: agregados que se calculan una vez
+  por instancia y se reutilizan.
+
+La página de reportes, la exportación CSV y la PDF usan la misma instancia
+para todo lo que muestran, de modo que un formato nuevo solo tiene que
+consumir estos datos.
+"""
+
+import time
+from datetime import date, datetime, timedelta
+from functools import cached_property
+
+from django.db import models
+from django.db.models import Case, Count, F, Prefetch, Q, Sum, Value, When, Window
+from django.db.models.functions import Coalesce, RowNumber, TruncDay, TruncMonth
+from django.utils import timezone
+
+from api.condicional import versiones
+from dashboard.models import (
+    Fase,
+    Proyecto,
+    Recurso,
+    Requerimiento,
+    Tarea,
+    Tarearecurso,
+    TipoTarea,
+    Tiporecurso,
+)
+
+TAMANO_LOTE_TAREAS = 2000
+
+# Tablas cuyos datos aparecen en los reportes
+MODELOS_REPORTE = (
+    Tarea,
+    Tarearecurso,
+    Recurso,
+    Tiporecurso,
+    Proyecto,
+    Requerimiento,
+    TipoTarea,
+    Fase,
+)
+
+
+def _fecha(valor):
+    """Convierte ``YYYY-MM-DD`` a fecha; ``None`` si falta o no es válida"""
+    if isinstance(valor, date):
+        return valor
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d").date()
+    except (ValueError, TypeError):
+        return None
+
+
+def calculate_percentage(part, total):
+    """Calcula el porcentaje seguro (evitando división por cero)"""
+    return round((part / total) * 100, 2) if total > 0 else 0
+
+
+def _porcentaje_completado(tarea):
+    if tarea.estado == "Completada":
+        return 100
+    if tarea.estado == "Pendiente":
+        return 0
+    # En progreso
+    if tarea.duracionestimada and tarea.duracionactual:
+        return min(
+            round((tarea.duracionactual / tarea.duracionestimada) * 100, 1), 99.9
+        )
+    return 50  # Valor por defecto
+
+
+def calcular_estadisticas_basicas(tareas):
+    """Totales de tareas, horas y costo en una sola consulta agregada"""
+    decimal_field = models.DecimalField(max_digits=10, decimal_places=2)
+    totales = tareas.aggregate(
+        total_tareas=Count("idtarea"),
+        tareas_completadas=Count("idtarea", filter=Q(estado="Completada")),
+        tareas_en_progreso=Count("idtarea", filter=Q(estado="En Progreso")),
+        tareas_pendientes=Count("idtarea", filter=Q(estado="Pendiente")),
+        total_horas=Coalesce(
+            Sum("duracionactual", output_field=decimal_field),
+            0.0,
+            output_field=decimal_field,
+        ),
+        costo_total=Coalesce(
+            Sum("costoactual", output_field=decimal_field),
+            0.0,
+            output_field=decimal_field,
+        ),
+        costo_estimado=Coalesce(
+            Sum("costoestimado", output_field=decimal_field),
+            0.0,
+            output_field=decimal_field,
+        ),
+    )
+    totales["porcentaje_completadas"] = calculate_percentage(
+        totales["tareas_completadas"], totales["total_tareas"]
+    )
+    return totales
+
+
+def calcular_estadisticas_recursos(tareas):
+    """
+    Calcula estadísticas relacionadas con los recursos y su utilización.
+
+    Las horas se suman por recurso en la base de datos; las asignaciones se
+    filtran con una subconsulta sobre ``tareas`` en lugar de una lista de ids,
+    así que solo se transfiere una fila por recurso.
+    """
+    # Horas de cada asignación considerando la cantidad de recursos; una
+    # cantidad nula o 0 cuenta como 1 (``tr.cantidad or 1``)
+    cantidad = Case(When(cantidad__gt=0, then=F("cantidad")), default=Value(1))
+    horas_asignadas = Coalesce(F("idtarea__duracionestimada"), 0) * cantidad
+    horas_utilizadas = Coalesce(F("idtarea__duracionactual"), 0) * cantidad
+
+    filas = (
+        Tarearecurso.objects.filter(idtarea__in=tareas.values("idtarea"))
+        .values(
+            "idrecurso",
+            "idrecurso__nombrerecurso",
+            "idrecurso__idtiporecurso__nametiporecurso",
+        )
+        .annotate(
+            cantidad_recurso=models.Min(cantidad),
+            horas_asignadas=Coalesce(Sum(horas_asignadas), 0),
+            horas_utilizadas=Coalesce(Sum(horas_utilizadas), 0),
+        )
+        .order_by()
+    )
+
+    recursos_list = [
+        {
+            "id": fila["idrecurso"],
+            "nombre": fila["idrecurso__nombrerecurso"],
+            "tipo": fila["idrecurso__idtiporecurso__nametiporecurso"],
+            "horas_asignadas": fila["horas_asignadas"],
+            "horas_utilizadas": fila["horas_utilizadas"],
+            "cantidad": fila["cantidad_recurso"],
+            "eficiencia": round(
+                (
+                    (fila["horas_utilizadas"] / fila["horas_asignadas"] * 100)
+                    if fila["horas_asignadas"] > 0
+                    else 100
+                ),
+                2,
+            ),
+        }
+        for fila in filas
+    ]
+
+    # Ordenar por eficiencia descendente
+    recursos_list.sort(key=lambda x: x["eficiencia"], reverse=True)
+
+    return {
+        "total_horas_asignadas": sum(r["horas_asignadas"] for r in recursos_list),
+        "total_horas_utilizadas": sum(r["horas_utilizadas"] for r in recursos_list),
+        "recursos": recursos_list,
+    }
+
+
+def calcular_estadisticas_costos(tareas):
+    """Calcula estadísticas relacionadas con los costos y presupuestos"""
+    # Calcular totales con valores por defecto
+    totales = tareas.aggregate(
+        total_estimado=Coalesce(
+            Sum("costoestimado"),
+            0,
+            output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        ),
+        total_actual=Coalesce(
+            Sum("costoactual"),
+            0,
+            output_field=models.DecimalField(max_digits=15, decimal_places=2),
+        ),
+        fecha_min=models.Min("fechacreacion"),
+        fecha_max=models.Max("fechacreacion"),
+    )
+
+    total_estimado = totales["total_estimado"]
+    total_actual = totales["total_actual"]
+
+    # Calcular métricas
+    variacion_total = (
+        ((total_actual - total_estimado) / total_estimado * 100)
+        if total_estimado > 0
+        else 0
+    )
+
+    # Primero verificar rangos de fecha para agrupar adecuadamente
+    fecha_min = totales["fecha_min"]
+    fecha_max = totales["fecha_max"]
+
+    # Si no hay fechas o el rango es menor a 30 días, agrupar por día
+    if not fecha_min or not fecha_max or (fecha_max - fecha_min).days < 30:
+        # Agrupar por días
+        periodos = (
+            tareas.annotate(periodo=TruncDay("fechacreacion"))
+            .values("periodo")
+            .annotate(
+                estimado=Coalesce(
+                    Sum("costoestimado"),
+                    0,
+                    output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                ),
+                actual=Coalesce(
+                    Sum("costoactual"),
+                    0,
+                    output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                ),
+            )
+            .order_by("periodo")
+        )
+        periodo_str = "diario"
+    else:
+        # Agrupar por meses
+        periodos = (
+            tareas.annotate(periodo=TruncMonth("fechacreacion"))
+            .values("periodo")
+            .annotate(
+                estimado=Coalesce(
+                    Sum("costoestimado"),
+                    0,
+                    output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                ),
+                actual=Coalesce(
+                    Sum("costoactual"),
+                    0,
+                    output_field=models.DecimalField(max_digits=15, decimal_places=2),
+                ),
+            )
+            .order_by("periodo")
+        )
+        periodo_str = "mensual"
+
+    # Calcular presupuesto del proyecto si hay un proyecto específico
+    presupuesto_proyecto = 0
+    proyecto_relacionado = None
+
+    if tareas.exists():
+        # Intentar obtener el proyecto de la primera tarea
+        primera_tarea = tareas.first()
+        if primera_tarea:
+            proyecto_relacionado = primera_tarea.idrequerimiento.idproyecto
+            presupuesto_proyecto = proyecto_relacionado.presupuesto or 0
+
+    # Añadir valores pre-calculados para evitar filtros en la plantilla PDF
+    presupuesto_restante = (
+        presupuesto_proyecto - total_actual if presupuesto_proyecto > 0 else 0
+    )
+    porcentaje_restante = (
+        100 - round((total_actual / presupuesto_proyecto * 100), 2)
+        if presupuesto_proyecto > 0
+        else 0
+    )
+
+    return {
+        "total_estimado": total_estimado,
+        "total_actual": total_actual,
+        "variacion_total": round(variacion_total, 2),
+        "porcentaje_utilizado": round(
+            (
+                (total_actual / presupuesto_proyecto * 100)
+                if presupuesto_proyecto > 0
+                else (total_actual / total_estimado * 100) if total_estimado > 0 else 0
+            ),
+            2,
+        ),
+        "indice_eficiencia": round(
+            total_estimado / total_actual if total_actual > 0 else 0, 2
+        ),
+        "presupuesto_total": presupuesto_proyecto,
+        "presupuesto_restante": presupuesto_restante,  # Valor pre-calculado
+        "porcentaje_restante": porcentaje_restante,  # Valor pre-calculado
+        "periodo": periodo_str,
+        "proyecto": (
+            proyecto_relacionado.nombreproyecto
+            if proyecto_relacionado
+            else "Todos los proyectos"
+        ),
+        "periodos": [
+            {
+                "fecha": (
+                    p["periodo"].strftime("%d/%m/%Y")
+                    if periodo_str == "diario"
+                    else p["periodo"].strftime("%b %Y")
+                ),
+                "estimado": p["estimado"],
+                "actual": p["actual"],
+                "variacion": round(
+                    (
+                        ((p["actual"] - p["estimado"]) / p["estimado"] * 100)
+                        if p["estimado"] > 0
+                        else 0
+                    ),
+                    2,
+                ),
+            }
+            for p in periodos
+        ],
+    }
+
+
+def calcular_estadisticas_tareas(tareas):
+    """Calcula estadísticas generales del progreso de tareas por proyecto"""
+    # Estadísticas generales de tareas
+    totales = tareas.aggregate(
+        total_completadas=Count("idtarea", filter=Q(estado="Completada")),
+        total_en_progreso=Count("idtarea", filter=Q(estado="En Progreso")),
+        total_pendientes=Count("idtarea", filter=Q(estado="Pendiente")),
+    )
+
+    # Estadísticas por proyecto con optimización
+    proyectos = (
+        tareas.values(
+            "idrequerimiento__idproyecto__idproyecto",
+            "idrequerimiento__idproyecto__nombreproyecto",
+            "idrequerimiento__idproyecto__fechainicio",
+            "idrequerimiento__idproyecto__fechafin",
+        )
+        .annotate(
+            total=Count("idtarea"),
+            completadas=Count("idtarea", filter=Q(estado="Completada")),
+            en_progreso=Count("idtarea", filter=Q(estado="En Progreso")),
+            pendientes=Count("idtarea", filter=Q(estado="Pendiente")),
+        )
+        .filter(total__gt=0)
+        .order_by()
+    )
+    proyectos = list(proyectos)
+    hoy = datetime.now().date()
+
+    # Enriquecer datos con información adicional
+    for proyecto in proyectos:
+        # Calcular porcentaje de completitud
+        proyecto["porcentaje_completado"] = round(
+            (
+                (proyecto["completadas"] / proyecto["total"] * 100)
+                if proyecto["total"] > 0
+                else 0
+            ),
+            1,
+        )
+
+        # Calcular días restantes
+        if proyecto["idrequerimiento__idproyecto__fechafin"]:
+            dias_restantes = (
+                proyecto["idrequerimiento__idproyecto__fechafin"] - hoy
+            ).days
+            proyecto["dias_restantes"] = max(0, dias_restantes)
+        else:
+            proyecto["dias_restantes"] = None
+
+    return {
+        "total_completadas": totales["total_completadas"],
+        "total_en_progreso": totales["total_en_progreso"],
+        "total_pendientes": totales["total_pendientes"],
+        "proyectos": [
+            {
+                "id": p["idrequerimiento__idproyecto__idproyecto"],
+                "nombre": p["idrequerimiento__idproyecto__nombreproyecto"],
+                "completadas": p["completadas"],
+                "en_progreso": p["en_progreso"],
+                "pendientes": p["pendientes"],
+                "total": p["total"],
+                "porcentaje_completado": p["porcentaje_completado"],
+                "dias_restantes": p["dias_restantes"],
+            }
+            for p in proyectos
+        ],
+    }
+
+
+class ReportDataSource:
+    """Datos de un reporte con los filtros ya interpretados"""
+
+    def __init__(
+        self,
+        tipo_reporte="general",
+        fecha_inicio=None,
+        fecha_fin=None,
+        proyecto_id=None,
+    ):
+        self.tipo_reporte = tipo_reporte or "general"
+
+        # Asegurar que fecha_inicio <= fecha_fin
+        self.fechas_invertidas = bool(
+            fecha_inicio and fecha_fin and fecha_inicio > fecha_fin
+        )
+        if self.fechas_invertidas:
+            fecha_inicio, fecha_fin = fecha_fin, fecha_inicio
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+
+        self.proyecto_id = proyecto_id if proyecto_id not in ("", "None") else None
+        self.proyecto = None
+        self.proyecto_no_encontrado = False
+        if self.proyecto_id:
+            try:
+                self.proyecto = Proyecto.objects.get(idproyecto=self.proyecto_id)
+            except (Proyecto.DoesNotExist, ValueError):
+                self.proyecto_no_encontrado = True
+
+    @classmethod
+    def desde_parametros(cls, parametros, dias_por_defecto=None):
+        """
+        Crea la fuente a partir de ``request.GET`` o ``request.POST``.
+
+        Con ``dias_por_defecto`` las fechas ausentes o no válidas se sustituyen
+        por los últimos días hasta hoy (como en la página de reportes); sin él,
+        no se filtra por esa fecha.
+        """
+        fecha_inicio = _fecha(parametros.get("fecha_inicio"))
+        fecha_fin = _fecha(parametros.get("fecha_fin"))
+        if dias_por_defecto is not None:
+            fecha_fin = fecha_fin or timezone.now().date()
+            fecha_inicio = fecha_inicio or fecha_fin - timedelta(days=dias_por_defecto)
+        return cls(
+            parametros.get("tipo_reporte", "general"),
+            fecha_inicio,
+            fecha_fin,
+            parametros.get("proyecto"),
+        )
+
+    @cached_property
+    def rango_fechas(self):
+        """``(desde, hasta)`` como datetimes aware; ``None`` en los extremos abiertos"""
+        desde = hasta = None
+        if self.fecha_inicio:
+            desde = timezone.make_aware(
+                datetime.combine(self.fecha_inicio, datetime.min.time())
+            )
+        if self.fecha_fin:
+            hasta = timezone.make_aware(
+                datetime.combine(self.fecha_fin, datetime.max.time())
+            )
+        return desde, hasta
+
+    def filtrar_por_fecha(self, queryset, campo="fechacreacion"):
+        desde, hasta = self.rango_fechas
+        if desde:
+            queryset = queryset.filter(**{f"{campo}__gte": desde})
+        if hasta:
+            queryset = queryset.filter(**{f"{campo}__lte": hasta})
+        return queryset
+
+    @cached_property
+    def tareas(self):
+        """Queryset (sin evaluar) de las tareas del reporte"""
+        tareas = self.filtrar_por_fecha(
+            Tarea.objects.select_related(
+                "idrequerimiento__idproyecto", "tipo_tarea", "fase"
+            )
+        )
+        if self.proyecto:
+            tareas = tareas.filter(idrequerimiento__idproyecto=self.proyecto)
+        return tareas
+
+    def iterar_tareas(self, tamano=TAMANO_LOTE_TAREAS, con_recursos=True):
+        """
+        Recorre las tareas por bloques de ``tamano`` con ``iterator``. Cada
+        tarea trae ``porcentaje_completado`` y, con ``con_recursos``, la lista
+        ``recursos_asignados`` (una consulta por bloque).
+        """
+        tareas = self.tareas.order_by("idtarea")
+        if con_recursos:
+            tareas = tareas.prefetch_related(
+                Prefetch(
+                    "tarearecurso_set",
+                    queryset=Tarearecurso.objects.select_related("idrecurso").only(
+                        "idtarea", "cantidad", "idrecurso__nombrerecurso"
+                    ),
+                    to_attr="recursos_asignados",
+                )
+            )
+        for tarea in tareas.iterator(chunk_size=tamano):
+            tarea.porcentaje_completado = _porcentaje_completado(tarea)
+            yield tarea
+
+    def iterar_recursos(self):
+        """Recursos con sus horas agregadas, ordenados por eficiencia"""
+        yield from self.estadisticas_recursos["recursos"]
+
+    def iterar_costos(self):
+        """Costos estimado y real por período"""
+        yield from self.estadisticas_costos["periodos"]
+
+    def nombres_tareas_por_recurso(self, limite=20):
+        """
+        ``{idrecurso: [nombre de tarea, ...]}`` con hasta ``limite`` tareas por
+        recurso, en una sola consulta.
+        """
+        filas = (
+            Tarearecurso.objects.filter(idtarea__in=self.tareas.values("idtarea"))
+            .annotate(
+                posicion=Window(
+                    RowNumber(),
+                    partition_by=F("idrecurso"),
+                    order_by=F("idtarea").asc(),
+                )
+            )
+            .filter(posicion__lte=limite)
+            .values_list("idrecurso", "idtarea__nombretarea")
+        )
+        nombres = {}
+        for idrecurso, nombre in filas:
+            nombres.setdefault(idrecurso, []).append(nombre)
+        return nombres
+
+    @cached_property
+    def estadisticas_basicas(self):
+        return calcular_estadisticas_basicas(self.tareas)
+
+    @cached_property
+    def estadisticas_tareas(self):
+        return calcular_estadisticas_tareas(self.tareas)
+
+    @cached_property
+    def estadisticas_recursos(self):
+        return calcular_estadisticas_recursos(self.tareas)
+
+    @cached_property
+    def estadisticas_costos(self):
+        return calcular_estadisticas_costos(self.tareas)
+
+    @cached_property
+    def version_datos(self):
+        """
+        Versión de los datos del reporte: las versiones de la API (ver
+        ``api/condicional.py``) de las tablas que muestra, que cambian con
+        cualquier alta, baja o modificación, también desde la API. Sin caché
+        disponible devuelve un valor único, de modo que no se reutiliza nada.
+        """
+        return versiones(MODELOS_REPORTE) or [time.time_ns()]
@@ -0,0 +1,218 @@
+"""
+Generación de reportes PDF en segundo plano con caché en disco.
+
+La vista ``exportar_pdf`` no renderiza el PDF: calcula una clave con los
+filtros del reporte, la versión de los datos y el usuario (``clave_reporte``)
+y lo solicita con ``solicitar_reporte``. Si ya existe un PDF con esa clave se reutiliza; si
+no, un hilo del pool genera el HTML (consultas y plantilla) y un proceso del
+pool de procesos lo convierte a PDF con WeasyPrint, sin ocupar al worker web.
+
+El estado de cada reporte (con el usuario que lo solicitó, el único que puede
+consultarlo) se guarda en la caché compartida y el PDF en
+``REPORTES_PDF_DIR``; la interfaz consulta ``estado_reporte`` hasta que está
+listo y lo descarga. El trabajo ``limpiar_reportes_pdf`` del scheduler borra
+los archivos más antiguos que ``REPORTES_PDF_MAX_EDAD``.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from reporte.renderizado import renderizar_pdf
+
+logger = logging.getLogger(__name__)
+
+CLAVE_ESTADO = "reportes:pdf:{}"
+PENDIENTE = "pendiente"
+LISTO = "listo"
+ERROR = "error"
+
+# Un reporte pendiente que no termina en este tiempo (p. ej. porque el
+# proceso web se reinició) puede volver a solicitarse
+TIEMPO_MAXIMO_GENERACION = 15 * 60
+
+_bloqueo = threading.Lock()
+_hilos = None
+_procesos = None
+
+
+def _trabajadores():
+    return max(getattr(settings, "REPORTES_PDF_WORKERS", 2), 1)
+
+
+def _max_edad():
+    return getattr(settings, "REPORTES_PDF_MAX_EDAD", 24 * 3600)
+
+
+def _pool_hilos():
+    global _hilos
+    with _bloqueo:
+        if _hilos is None:
+            _hilos = ThreadPoolExecutor(
+                max_workers=_trabajadores(), thread_name_prefix="reporte-pdf"
+            )
+        return _hilos
+
+
+def _pool_procesos(reiniciar=False):
+    global _procesos
+    with _bloqueo:
+        if reiniciar and _procesos is not None:
+            _procesos.shutdown(wait=False)
+            _procesos = None
+        if _procesos is None:
+            # "spawn": los procesos no heredan conexiones ni hilos del worker web
+            _procesos = ProcessPoolExecutor(
+                max_workers=_trabajadores(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _procesos
+
+
+def directorio_reportes():
+    directorio = str(settings.REPORTES_PDF_DIR)
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+
+def ruta_reporte(clave):
+    return os.path.join(directorio_reportes(), f"{clave}.pdf")
+
+
+def clave_reporte(tipo_reporte, fecha_inicio, fecha_fin, proyecto, version, usuario):
+    """
+    Hash de los filtros del reporte, de la versión de los datos y del usuario
+    (el pie del PDF indica quién lo generó, así que no se comparte entre
+    usuarios).
+    """
+    datos = json.dumps(
+        [tipo_reporte, fecha_inicio, fecha_fin, proyecto, version, usuario],
+        default=str,
+    )
+    return hashlib.sha256(datos.encode()).hexdigest()[:40]
+
+
+def _estado(clave):
+    estado = cache.get(CLAVE_ESTADO.format(clave))
+    if os.path.exists(ruta_reporte(clave)):
+        return {**(estado or {}), "estado": LISTO}
+    if estado and estado["estado"] == LISTO:
+        return None
+    return estado
+
+
+def estado_reporte(clave, usuario):
+    """
+    Estado del reporte: ``{"estado": ..., "nombre_archivo": ..., ...}`` o
+    ``None`` si nunca se solicitó, su PDF ya se eliminó o lo solicitó otro
+    usuario.
+    """
+    estado = _estado(clave)
+    if not estado or estado.get("usuario") != usuario:
+        return None
+    return estado
+
+
+def solicitar_reporte(clave, usuario, generar_html, base_url, nombre_archivo):
+    """
+    Encola la generación del reporte ``clave`` del usuario ``usuario`` (su pk)
+    si no está listo ni en curso.
+
+    ``generar_html`` se llama en un hilo del pool y debe devolver el HTML del
+    reporte. Devuelve el estado actual del reporte.
+    """
+    clave_estado = CLAVE_ESTADO.format(clave)
+    estado = _estado(clave)
+    if estado and estado["estado"] in (PENDIENTE, LISTO):
+        if estado.get("usuario") != usuario:
+            # El PDF sigue en disco pero su estado ya salió de la caché; la
+            # clave incluye al usuario, así que es suyo
+            estado = {
+                "nombre_archivo": nombre_archivo,
+                **estado,
+                "usuario": usuario,
+            }
+            cache.set(clave_estado, estado, _max_edad())
+        return estado
+
+    nuevo = {
+        "estado": PENDIENTE,
+        "nombre_archivo": nombre_archivo,
+        "solicitado": timezone.now().isoformat(),
+        "usuario": usuario,
+    }
+    if estado is None:
+        # Otra petición idéntica puede haberlo encolado a la vez
+        if not cache.add(clave_estado, nuevo, TIEMPO_MAXIMO_GENERACION):
+            return cache.get(clave_estado) or nuevo
+    else:
+        # Reintento tras un error
+        cache.set(clave_estado, nuevo, TIEMPO_MAXIMO_GENERACION)
+
+    _pool_hilos().submit(_generar, clave, generar_html, base_url, nuevo)
+    return nuevo
+
+
+def _generar(clave, generar_html, base_url, estado):
+    clave_estado = CLAVE_ESTADO.format(clave)
+    inicio = time.monotonic()
+    try:
+        close_old_connections()
+        try:
+            html = generar_html()
+        finally:
+            close_old_connections()
+
+        ruta = ruta_reporte(clave)
+        try:
+            _pool_procesos().submit(renderizar_pdf, html, base_url, ruta).result()
+        except BrokenProcessPool:
+            # Un proceso murió (p. ej. por memoria): se recrea el pool y se reintenta
+            _pool_procesos(reiniciar=True).submit(
+                renderizar_pdf, html, base_url, ruta
+            ).result()
+    except Exception as e:
+        logger.exception(f"Error al generar el reporte PDF {clave}")
+        cache.set(
+            clave_estado,
+            {**estado, "estado": ERROR, "error": str(e)},
+            TIEMPO_MAXIMO_GENERACION,
+        )
+        return
+
+    duracion = time.monotonic() - inicio
+    cache.set(
+        clave_estado,
+        {**estado, "estado": LISTO, "duracion": round(duracion, 2)},
+        _max_edad(),
+    )
+    logger.info(f"Reporte PDF {clave} generado en {duracion:.2f}s")
+
+
+def limpiar_reportes_pdf(max_edad=None):
+    """Elimina los PDF generados hace más de ``max_edad`` segundos"""
+    max_edad = _max_edad() if max_edad is None else max_edad
+    limite = time.time() - max_edad
+    eliminados = 0
+    directorio = directorio_reportes()
+    for nombre in os.listdir(directorio):
+        ruta = os.path.join(directorio, nombre)
+        try:
+            if os.path.getmtime(ruta) < limite:
+                os.remove(ruta)
+                eliminados += 1
+        except OSError:
+            # Otro proceso lo eliminó o lo está reemplazando
+            continue
+    return eliminados
@@ -0,0 +1,26 @@
+"""
+Renderizado de reportes PDF con WeasyPrint.
+
+Se ejecuta dentro de los procesos del pool de ``reporte.pdf``, por eso no
+importa Django: recibe el HTML ya generado y escribe el PDF en disco.
+"""
+
+import os
+
+from weasyprint import HTML
+
+
+def renderizar_pdf(html, base_url, ruta):
+    """Escribe el PDF en ``ruta`` de forma atómica (archivo temporal + rename)"""
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        HTML(string=html, base_url=base_url).write_pdf(
+            temporal,
+            stylesheets=[],
+            presentational_hints=True,
+        )
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return ruta
@@ -1,3 +1,546 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import math
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from auditoria.signals import set_current_user
+from dashboard.models import (
+    Proyecto,
+    Recurso,
+    Requerimiento,
+    Tarea,
+    Tarearecurso,
+    Tiporecurso,
+    Usuario,
+)
+
+from . import columnar
+from .datos import ReportDataSource, calcular_estadisticas_recursos
+from .pdf import CLAVE_ESTADO, LISTO, ruta_reporte, solicitar_reporte
+
+
+class ReporteTestCase(TestCase):
+    """Datos comunes: un proyecto con tareas, recursos y dos usuarios"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create: sin señales de auditoría
+        (cls.usuario, cls.otro_usuario, _) = Usuario.objects.bulk_create(
+            [
+                Usuario(
+                    nombreusuario="reporte-test",
+                    username="reporte-test",
+                    email="reporte-test@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                ),
+                Usuario(
+                    nombreusuario="reporte-otro",
+                    username="reporte-otro",
+                    email="reporte-otro@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                ),
+                # Autor de la auditoría de las operaciones sin usuario en curso
+                Usuario(
+                    nombreusuario="reporte-admin",
+                    username="reporte-admin",
+                    email="reporte-admin@example.com",
+                    contrasena="",
+                    rol="Administrador",
+                    is_superuser=True,
+                ),
+            ]
+        )
+        (cls.proyecto,) = Proyecto.objects.bulk_create(
+            [Proyecto(nombreproyecto="Proyecto Reporte", presupuesto=Decimal("1000"))]
+        )
+        (cls.requerimiento,) = Requerimiento.objects.bulk_create(
+            [Requerimiento(descripcion="Requerimiento", idproyecto=cls.proyecto)]
+        )
+        (cls.tipo,) = Tiporecurso.objects.bulk_create(
+            [Tiporecurso(nametiporecurso="Humano")]
+        )
+        cls.recursos = Recurso.objects.bulk_create(
+            [
+                Recurso(nombrerecurso=nombre, idtiporecurso=cls.tipo)
+                for nombre in (
+                    "Analista",
+                    "Desarrollador",
+                    "Tester",
+                    "Diseñador",
+                    "Arquitecto de datos",
+                )
+            ]
+        )
+        cls.recurso = cls.recursos[0]
+        (cls.tarea,) = Tarea.objects.bulk_create(
+            [
+                Tarea(
+                    nombretarea="Tarea Reporte",
+                    estado="Pendiente",
+                    fechacreacion=timezone.now(),
+                    idrequerimiento=cls.requerimiento,
+                )
+            ]
+        )
+        (cls.asignacion,) = Tarearecurso.objects.bulk_create(
+            [Tarearecurso(idtarea=cls.tarea, idrecurso=cls.recurso, cantidad=1)]
+        )
+
+    # Cantidades de las asignaciones: nula y 0 cuentan como 1
+    CANTIDADES = (None, 0, 1, 3)
+
+    def _crear_tareas(self, total, asignaciones=1):
+        """
+        ``total`` tareas del proyecto, con duraciones variadas (algunas nulas) y
+        ``asignaciones`` recursos cada una con las cantidades de ``CANTIDADES``
+        """
+        # bulk_create: sin señales de auditoría ni del snapshot
+        inicio = Tarea.objects.count()
+        tareas = Tarea.objects.bulk_create(
+            [
+                Tarea(
+                    nombretarea=f"Tarea {inicio + i}",
+                    estado=("Pendiente", "En Progreso", "Completada")[i % 3],
+                    duracionestimada=None if i % 5 == 4 else 8 + i % 4,
+                    duracionactual=None if i % 4 == 3 else 6 + i % 5,
+                    costoestimado=Decimal("100"),
+                    costoactual=Decimal(80 + i),
+                    fechacreacion=timezone.now(),
+                    idrequerimiento=self.requerimiento,
+                )
+                for i in range(total)
+            ]
+        )
+        Tarearecurso.objects.bulk_create(
+            [
+                Tarearecurso(
+                    idtarea=tarea,
+                    idrecurso=self.recursos[(i + j) % len(self.recursos)],
+                    cantidad=self.CANTIDADES[(i + j) % len(self.CANTIDADES)],
+                )
+                for i, tarea in enumerate(tareas)
+                for j in range(asignaciones)
+            ]
+        )
+        return tareas
+
+
+class VersionDatosTest(ReporteTestCase):
+    """``version_datos`` cambia con cualquier modificación de los datos mostrados"""
+
+    def _version(self):
+        return ReportDataSource.desde_parametros({}).version_datos
+
+    def test_cambia_con_save(self):
+        cambios = [
+            (self.asignacion, "cantidad", 3),
+            (self.recurso, "nombrerecurso", "Arquitecto"),
+            (self.proyecto, "presupuesto", Decimal("2000")),
+        ]
+        for objeto, campo, valor in cambios:
+            with self.subTest(modelo=type(objeto).__name__):
+                version = self._version()
+                self.assertEqual(self._version(), version)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    setattr(objeto, campo, valor)
+                    objeto.save()
+
+                self.assertNotEqual(self._version(), version)
+
+
+# Auditoría de navegación síncrona: el hilo del buffer no ve los datos del test
+@override_settings(AUDITORIA_BUFFER_HABILITADO=False)
+class ReporteVistasTestCase(ReporteTestCase):
+    """Peticiones a las vistas de reportes con ``usuario`` autenticado"""
+
+    def setUp(self):
+        # El login deja al usuario como autor de la auditoría del hilo
+        self.addCleanup(set_current_user, None)
+        self.client.force_login(self.usuario)
+
+
+class EstadoPdfTest(ReporteVistasTestCase):
+    """Solo el usuario que solicitó un reporte PDF puede consultarlo"""
+
+    CLAVE = "reporte-de-prueba"
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(REPORTES_PDF_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.addCleanup(cache.delete, CLAVE_ESTADO.format(self.CLAVE))
+
+        # PDF ya generado
+        with open(ruta_reporte(self.CLAVE), "wb") as archivo:
+            archivo.write(b"%PDF-1.4")
+
+    def _get(self, usuario, vista):
+        self.client.force_login(usuario)
+        return self.client.get(reverse(f"reportes:{vista}", args=[self.CLAVE]))
+
+    def test_solo_el_solicitante(self):
+        estado = solicitar_reporte(self.CLAVE, self.usuario.pk, None, "", "reporte.pdf")
+        self.assertEqual(estado["estado"], LISTO)
+
+        self.assertEqual(self._get(self.usuario, "estado_pdf").status_code, 200)
+        respuesta = self._get(self.usuario, "descargar_pdf")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(b"".join(respuesta.streaming_content), b"%PDF-1.4")
+
+        self.assertEqual(self._get(self.otro_usuario, "estado_pdf").status_code, 404)
+        self.assertEqual(self._get(self.otro_usuario, "descargar_pdf").status_code, 404)
+
+    def test_sin_estado_en_cache(self):
+        # El PDF sigue en disco pero nadie lo ha solicitado con esta clave
+        self.assertEqual(self._get(self.usuario, "estado_pdf").status_code, 404)
+        self.assertEqual(self._get(self.usuario, "descargar_pdf").status_code, 404)
+
+
+def _recursos_por_bucle(tareas):
+    """Estadísticas de recursos calculadas como antes, asignación a asignación"""
+    asignaciones = Tarearecurso.objects.filter(
+        idtarea__in=list(tareas.values_list("idtarea", flat=True))
+    ).select_related("idrecurso", "idtarea")
+    recursos = {}
+    for tr in asignaciones:
+        recurso = recursos.setdefault(
+            tr.idrecurso.idrecurso,
+            {"nombre": tr.idrecurso.nombrerecurso, "asignadas": 0, "utilizadas": 0},
+        )
+        recurso["asignadas"] += (tr.idtarea.duracionestimada or 0) * (tr.cantidad or 1)
+        recurso["utilizadas"] += (tr.idtarea.duracionactual or 0) * (tr.cantidad or 1)
+    return recursos
+
+
+class EstadisticasRecursosTest(ReporteTestCase):
+    """``calcular_estadisticas_recursos`` agrega en la base de datos"""
+
+    def _estadisticas(self):
+        tareas = Tarea.objects.all()
+        with CaptureQueriesContext(connection) as consultas:
+            estadisticas = calcular_estadisticas_recursos(tareas)
+        return len(consultas), estadisticas
+
+    def _comprobar_totales(self, estadisticas):
+        esperadas = _recursos_por_bucle(Tarea.objects.all())
+        self.assertEqual(
+            {
+                r["id"]: (r["nombre"], r["horas_asignadas"], r["horas_utilizadas"])
+                for r in estadisticas["recursos"]
+            },
+            {
+                idrecurso: (r["nombre"], r["asignadas"], r["utilizadas"])
+                for idrecurso, r in esperadas.items()
+            },
+        )
+        self.assertEqual(
+            estadisticas["total_horas_asignadas"],
+            sum(r["asignadas"] for r in esperadas.values()),
+        )
+        self.assertEqual(
+            estadisticas["total_horas_utilizadas"],
+            sum(r["utilizadas"] for r in esperadas.values()),
+        )
+
+    def test_consultas_constantes(self):
+        self._crear_tareas(2)
+        consultas_pequena, estadisticas = self._estadisticas()
+        self._comprobar_totales(estadisticas)
+
+        self._crear_tareas(40, asignaciones=3)
+        consultas_grande, estadisticas = self._estadisticas()
+        self._comprobar_totales(estadisticas)
+        self.assertEqual(consultas_pequena, consultas_grande)
+
+    def test_cantidad_nula_o_cero_cuenta_como_uno(self):
+        tareas = self._crear_tareas(len(self.CANTIDADES))
+        Tarea.objects.update(duracionestimada=10, duracionactual=5)
+        Tarearecurso.objects.filter(idtarea__in=tareas).update(idrecurso=self.recurso)
+
+        _, estadisticas = self._estadisticas()
+
+        (recurso,) = [r for r in estadisticas["recursos"] if r["id"] == self.recurso.pk]
+        # La asignación del fixture (1) y las de CANTIDADES: 1 + 1 + 1 + 3
+        self.assertEqual(recurso["horas_asignadas"], 10 * (1 + 6))
+        self.assertEqual(recurso["horas_utilizadas"], 5 * (1 + 6))
+        self.assertEqual(recurso["cantidad"], 1)
+        self._comprobar_totales(estadisticas)
+
+
+class ExportarCsvTest(ReporteVistasTestCase):
+    """Contenido de ``exportar_csv`` y consultas por bloque de tareas"""
+
+    CABECERAS = {
+        "general": ["ID", "Tarea", "Proyecto"],
+        "tareas": ["ID", "Tarea", "Proyecto"],
+        "recursos": ["Recurso", "Tipo", "Asignado a"],
+        "costos": ["Período", "Costo Estimado", "Costo Real"],
+    }
+
+    def _csv(self, **parametros):
+        respuesta = self.client.post(reverse("reportes:exportar_csv"), parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        contenido = b"".join(respuesta.streaming_content).decode()
+        return list(csv.reader(io.StringIO(contenido), delimiter=";"))
+
+    def _fila(self, filas, etiqueta):
+        return next(fila for fila in filas if fila and fila[0] == etiqueta)
+
+    def test_cabecera_y_resumen_por_tipo(self):
+        self._crear_tareas(6, asignaciones=2)
+        for tipo_reporte, cabecera in self.CABECERAS.items():
+            with self.subTest(tipo_reporte=tipo_reporte):
+                filas = self._csv(tipo_reporte=tipo_reporte)
+
+                self.assertEqual(filas[0], ["REPORTE DE TAREAS"])
+                self.assertEqual(filas[3], ["Proyecto: Todos"])
+                self.assertEqual(
+                    filas[4], [f"Tipo de reporte: {tipo_reporte.capitalize()}"]
+                )
+                self.assertEqual(filas[6][: len(cabecera)], cabecera)
+
+                if tipo_reporte in ("general", "tareas"):
+                    # Una fila por tarea entre la cabecera y el resumen
+                    self.assertEqual(filas[7 + Tarea.objects.count()], [])
+                    self.assertEqual(
+                        self._fila(filas, "Total tareas"),
+                        ["Total tareas", str(Tarea.objects.count())],
+                    )
+                    self.assertEqual(
+                        self._fila(filas, "Completadas")[1],
+                        str(Tarea.objects.filter(estado="Completada").count()),
+                    )
+                elif tipo_reporte == "recursos":
+                    estadisticas = ReportDataSource.desde_parametros(
+                        {}
+                    ).estadisticas_recursos
+                    self.assertEqual(
+                        self._fila(filas, "TOTAL")[3:5],
+                        [
+                            str(estadisticas["total_horas_asignadas"]),
+                            str(estadisticas["total_horas_utilizadas"]),
+                        ],
+                    )
+                else:
+                    costo_real = sum(
+                        Tarea.objects.exclude(costoactual=None).values_list(
+                            "costoactual", flat=True
+                        )
+                    )
+                    self.assertEqual(
+                        self._fila(filas, "TOTAL")[2], f"${costo_real:.2f}"
+                    )
+
+    def test_recursos_de_cada_tarea(self):
+        filas = self._csv(tipo_reporte="tareas")
+        fila = next(fila for fila in filas if fila[:1] == [str(self.tarea.pk)])
+        self.assertEqual(fila[14], "Analista (1)")
+
+    def _consultas_iterar_tareas(self, tamano):
+        datos = ReportDataSource.desde_parametros({})
+        with CaptureQueriesContext(connection) as consultas:
+            tareas = list(datos.iterar_tareas(tamano=tamano))
+        self.assertEqual(len(tareas), Tarea.objects.count())
+        return len(consultas)
+
+    def test_consultas_por_bloque(self):
+        tamano = 5
+        self._crear_tareas(2 * tamano - 1, asignaciones=2)
+        # Tareas más el prefetch de los recursos de cada bloque
+        self.assertEqual(self._consultas_iterar_tareas(tamano), 1 + 2)
+
+        self._crear_tareas(2 * tamano, asignaciones=3)
+        self.assertEqual(self._consultas_iterar_tareas(tamano), 1 + 4)
+
+    def test_consultas_csv_constantes(self):
+        def consultas():
+            with CaptureQueriesContext(connection) as capturadas:
+                self._csv(tipo_reporte="tareas")
+            return len(capturadas)
+
+        self._crear_tareas(2)
+        consultas_pequena = consultas()
+        self._crear_tareas(30, asignaciones=3)
+        self.assertEqual(consultas(), consultas_pequena)
+
+
+class ReportDataSourceTest(ReporteTestCase):
+    """Interpretación de los filtros y agregados calculados una vez"""
+
+    HOY = datetime.date(2026, 5, 20)
+
+    def test_fechas_invertidas(self):
+        datos = ReportDataSource.desde_parametros(
+            {"fecha_inicio": "2026-05-31", "fecha_fin": "2026-05-01"}
+        )
+        self.assertTrue(datos.fechas_invertidas)
+        self.assertEqual(datos.fecha_inicio, datetime.date(2026, 5, 1))
+        self.assertEqual(datos.fecha_fin, datetime.date(2026, 5, 31))
+
+    def test_fechas_no_validas_o_ausentes(self):
+        datos = ReportDataSource.desde_parametros(
+            {"fecha_inicio": "31/05/2026", "fecha_fin": ""}
+        )
+        self.assertFalse(datos.fechas_invertidas)
+        self.assertEqual(datos.rango_fechas, (None, None))
+        self.assertEqual(datos.tareas.count(), Tarea.objects.count())
+
+    def test_dias_por_defecto(self):
+        ahora = timezone.make_aware(
+            datetime.datetime.combine(self.HOY, datetime.time(12))
+        )
+        with mock.patch("django.utils.timezone.now", return_value=ahora):
+            datos = ReportDataSource.desde_parametros(
+                {"fecha_inicio": "no-es-fecha"}, dias_por_defecto=30
+            )
+            self.assertEqual(datos.fecha_fin, self.HOY)
+            self.assertEqual(datos.fecha_inicio, datetime.date(2026, 4, 20))
+
+            # Solo se sustituyen las fechas que faltan
+            datos = ReportDataSource.desde_parametros(
+                {"fecha_inicio": "2026-01-01"}, dias_por_defecto=30
+            )
+            self.assertEqual(datos.fecha_inicio, datetime.date(2026, 1, 1))
+            self.assertEqual(datos.fecha_fin, self.HOY)
+
+    def test_proyecto(self):
+        for valor in (None, "", "None"):
+            with self.subTest(proyecto=valor):
+                datos = ReportDataSource.desde_parametros({"proyecto": valor})
+                self.assertIsNone(datos.proyecto)
+                self.assertFalse(datos.proyecto_no_encontrado)
+
+        for valor in ("abc", str(self.proyecto.pk + 1000)):
+            with self.subTest(proyecto=valor):
+                datos = ReportDataSource.desde_parametros({"proyecto": valor})
+                self.assertIsNone(datos.proyecto)
+                self.assertTrue(datos.proyecto_no_encontrado)
+
+        (otro,) = Proyecto.objects.bulk_create([Proyecto(nombreproyecto="Otro")])
+        (requerimiento,) = Requerimiento.objects.bulk_create(
+            [Requerimiento(descripcion="Otro", idproyecto=otro)]
+        )
+        Tarea.objects.bulk_create(
+            [Tarea(nombretarea="Tarea de otro", idrequerimiento=requerimiento)]
+        )
+        datos = ReportDataSource.desde_parametros({"proyecto": str(self.proyecto.pk)})
+        self.assertEqual(datos.proyecto, self.proyecto)
+        self.assertEqual(list(datos.tareas), [self.tarea])
+
+    def test_tipo_reporte_por_defecto(self):
+        self.assertEqual(ReportDataSource.desde_parametros({}).tipo_reporte, "general")
+        self.assertEqual(
+            ReportDataSource.desde_parametros({"tipo_reporte": ""}).tipo_reporte,
+            "general",
+        )
+
+    def test_agregados_una_vez_por_instancia(self):
+        self._crear_tareas(4, asignaciones=2)
+        datos = ReportDataSource.desde_parametros({})
+        for agregado in (
+            "estadisticas_basicas",
+            "estadisticas_tareas",
+            "estadisticas_recursos",
+            "estadisticas_costos",
+            "version_datos",
+        ):
+            with self.subTest(agregado=agregado):
+                primero = getattr(datos, agregado)
+                with self.assertNumQueries(0):
+                    self.assertIs(getattr(datos, agregado), primero)
+
+
+class ExportacionColumnarTest(ReporteVistasTestCase):
+    """Las exportaciones Parquet / Arrow se leen de vuelta con pyarrow"""
+
+    def _leer(self, contenido, formato):
+        if formato == columnar.PARQUET:
+            return pq.read_table(pa.BufferReader(contenido))
+        return pa.ipc.open_stream(contenido).read_all()
+
+    def _comprobar_tabla(self, tabla):
+        tareas = list(Tarea.objects.order_by("idtarea"))
+        self.assertEqual(tabla.schema, columnar.ESQUEMA)
+        self.assertEqual(tabla.column("idtarea").to_pylist(), [t.pk for t in tareas])
+
+        asignaciones = {}
+        for tr in Tarearecurso.objects.order_by("idtarearecurso"):
+            asignaciones.setdefault(tr.idtarea_id, []).append(
+                (tr.idrecurso_id, tr.idrecurso.nombrerecurso, tr.cantidad)
+            )
+        recursos = [
+            [(r["idrecurso"], r["nombrerecurso"], r["cantidad"]) for r in fila]
+            for fila in tabla.column("recursos").to_pylist()
+        ]
+        self.assertEqual(recursos, [asignaciones.get(t.pk, []) for t in tareas])
+        self.assertEqual(
+            tabla.column("cantidad_recursos").to_pylist(), [len(r) for r in recursos]
+        )
+
+    def test_exportar_datos(self):
+        self._crear_tareas(7, asignaciones=3)
+        # Una tarea sin recursos
+        Tarea.objects.bulk_create(
+            [Tarea(nombretarea="Sin recursos", idrequerimiento=self.requerimiento)]
+        )
+        for formato in columnar.FORMATOS:
+            with self.subTest(formato=formato):
+                respuesta = self.client.get(
+                    reverse("reportes:exportar_datos"), {"formato": formato}
+                )
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertEqual(
+                    respuesta["Content-Type"],
+                    columnar.FORMATOS[formato]["content_type"],
+                )
+                contenido = b"".join(respuesta.streaming_content)
+                self._comprobar_tabla(self._leer(contenido, formato))
+
+    def test_formato_no_soportado(self):
+        respuesta = self.client.get(
+            reverse("reportes:exportar_datos"), {"formato": "xlsx"}
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_comando_exportar_tareas_por_lotes(self):
+        self._crear_tareas(10, asignaciones=2)
+        with tempfile.TemporaryDirectory() as directorio:
+            for formato in columnar.FORMATOS:
+                with self.subTest(formato=formato):
+                    salida = os.path.join(directorio, f"tareas.{formato}")
+                    call_command(
+                        "exportar_tareas",
+                        salida,
+                        format=formato,
+                        batch_size=3,
+                        stdout=io.StringIO(),
+                    )
+                    with open(salida, "rb") as archivo:
+                        tabla = self._leer(archivo.read(), formato)
+                    self._comprobar_tabla(tabla)
+                    if formato == columnar.PARQUET:
+                        # Un row group por lote
+                        self.assertEqual(
+                            pq.ParquetFile(salida).num_row_groups,
+                            math.ceil(Tarea.objects.count() / 3),
+                        )
@@ -0,0 +1,12 @@
+from apscheduler.triggers.interval import IntervalTrigger
+
+from notificaciones.scheduler import registrar_trabajo
+from reporte.pdf import limpiar_reportes_pdf
+
+# Borrado de reportes PDF caducados (cada hora)
+registrar_trabajo(
+    "limpiar_reportes_pdf",
+    limpiar_reportes_pdf,
+    IntervalTrigger(hours=1),
+    nombre="Eliminar reportes PDF antiguos",
+)
@@ -5,5 +5,12 @@ app_name = "reportes"
 urlpatterns = [
     path("", views.index, name="index"),
     path("exportar-csv/", views.exportar_csv, name="exportar_csv"),
+    path("exportar-datos/", views.exportar_datos, name="exportar_datos"),
     path("exportar-pdf/", views.exportar_pdf, name="exportar_pdf"),
+    path("exportar-pdf/<slug:clave>/", views.estado_pdf, name="estado_pdf"),
+    path(
+        "exportar-pdf/<slug:clave>/descargar/",
+        views.descargar_pdf,
+        name="descargar_pdf",
+    ),
 ]
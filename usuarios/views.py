@@ -26,6 +26,7 @@ from dashboard.models import (
     Actividad,
 )
 from auditoria.middleware import AuditoriaMiddleware
+from notificaciones.correo import encolar_correo
 
 
 # Vista para la página de inicio
@@ -347,7 +348,8 @@ def enviar_correo_confirmacion(email, token):
     remitente = settings.EMAIL_HOST_USER
     correo = EmailMultiAlternatives(asunto, mensaje_texto, remitente, [email])
     correo.attach_alternative(mensaje_html, "text/html")
-    correo.send()
+    # Se envía desde la bandeja de salida sin esperar al servidor SMTP
+    encolar_correo(correo)
 
 
 # Función para enviar correo de recuperación de contraseña
@@ -368,4 +370,5 @@ def enviar_correo_recuperacion(email, token):
     remitente = settings.EMAIL_HOST_USER
     correo = EmailMultiAlternatives(asunto, mensaje_texto, remitente, [email])
     correo.attach_alternative(mensaje_html, "text/html")
-    correo.send()
+    # Se envía desde la bandeja de salida sin esperar al servidor SMTP
+    encolar_correo(correo)
@@ -221,7 +221,12 @@ LOGGING = {
 
 
 # Email configuration
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# En local puede usarse django.core.mail.backends.locmem.EmailBackend o
+# django.core.mail.backends.filebased.EmailBackend (con EMAIL_FILE_PATH)
+EMAIL_BACKEND = os.getenv(
+    "EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend"
+)
+EMAIL_FILE_PATH = os.getenv("EMAIL_FILE_PATH", os.path.join(BASE_DIR, "logs/correos"))
 EMAIL_HOST = os.getenv("EMAIL_HOST")
 EMAIL_PORT = os.getenv("EMAIL_PORT")
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
@@ -229,6 +234,55 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS") == "True"
 DEFAULT_FROM_EMAIL = "WebApp-PM <" + os.getenv("EMAIL_HOST_USER") + ">"
 
+# Envío de la bandeja de salida (python manage.py procesar_correos).
+# Máximo de correos por minuto; 0 sin límite.
+NOTIFICACIONES_CORREO_POR_MINUTO = int(
+    os.getenv("NOTIFICACIONES_CORREO_POR_MINUTO", "120")
+)
+
+# Snapshot materializado de KPIs del dashboard.
+# Al activarlo, ejecutar "python manage.py rebuild_kpi_snapshot" una vez.
+DASHBOARD_KPI_SNAPSHOT = os.getenv("DASHBOARD_KPI_SNAPSHOT") == "True"
+
+# Escritura asíncrona por lotes de la auditoría de navegación.
+# AUDITORIA_BUFFER_MODO: "drop" descarta con la cola llena, "block" espera.
+AUDITORIA_BUFFER_HABILITADO = os.getenv("AUDITORIA_BUFFER_HABILITADO", "True") == "True"
+AUDITORIA_BUFFER_CAPACIDAD = int(os.getenv("AUDITORIA_BUFFER_CAPACIDAD", "10000"))
+AUDITORIA_BUFFER_LOTE = int(os.getenv("AUDITORIA_BUFFER_LOTE", "100"))
+AUDITORIA_BUFFER_INTERVALO_MS = int(os.getenv("AUDITORIA_BUFFER_INTERVALO_MS", "1000"))
+AUDITORIA_BUFFER_MODO = os.getenv("AUDITORIA_BUFFER_MODO", "drop")
+AUDITORIA_BUFFER_TIMEOUT_BLOQUEO_MS = int(
+    os.getenv("AUDITORIA_BUFFER_TIMEOUT_BLOQUEO_MS", "100")
+)
+
+# Segundos entre comprobaciones de la versión de la configuración de auditoría
+# en caché (se recarga en cuanto otro proceso la modifica).
+AUDITORIA_CONFIG_INTERVALO_VERSION = int(
+    os.getenv("AUDITORIA_CONFIG_INTERVALO_VERSION", "5")
+)
+
+# Estadísticas de auditoría desde el resumen diario (actividad_resumen_diario).
+# Se mantiene con "python manage.py cleanup_redundant_activities --rollup".
+AUDITORIA_RESUMEN_DIARIO = os.getenv("AUDITORIA_RESUMEN_DIARIO") == "True"
+
+# Meses de actividades que conserva el mantenimiento diario de auditoría
+# (trabajo "mantenimiento_auditoria" de run_scheduler); 0 conserva todo.
+AUDITORIA_RETENCION_MESES = int(os.getenv("AUDITORIA_RETENCION_MESES", "0"))
+
+# Reportes PDF generados en segundo plano: directorio donde se guardan (debe
+# ser compartido por las réplicas web y por run_scheduler, que borra los
+# antiguos; en k8s es el volumen reportes-pdf-pvc), procesos de renderizado
+# por worker y segundos que se conserva cada PDF para reutilizarlo.
+REPORTES_PDF_DIR = os.getenv(
+    "REPORTES_PDF_DIR", str(BASE_DIR / "media" / "reportes_pdf")
+)
+REPORTES_PDF_WORKERS = int(os.getenv("REPORTES_PDF_WORKERS", "2"))
+REPORTES_PDF_MAX_EDAD = int(os.getenv("REPORTES_PDF_MAX_EDAD", "86400"))
+
+# Caducidad en segundos del bloqueo de líder de run_scheduler (solo se usa
+# la caché cuando la base de datos no es PostgreSQL).
+SCHEDULER_BLOQUEO_TTL = int(os.getenv("SCHEDULER_BLOQUEO_TTL", "60"))
+
 # Configuración específica para django_apscheduler
 APSCHEDULER_DATETIME_FORMAT = "N j, Y, f:s a"  # Formato de fecha para los logs
 APSCHEDULER_RUN_NOW_TIMEOUT = 25  # Segundos para timeout